@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AssetMetadata
+from .models import AssetMetadata, AssetGroup, AssetJob
 
 # View and edit metadata in the Admin panel
 '''
@@ -18,5 +18,19 @@ class AssetMetadataAdmin(admin.ModelAdmin):
     list_display = (
         "file_name", "file_type", "file_size",
         "polygon_count", "duration", "no_of_versions",
-        "created_at","modified_at", "modified_by"
-    )
\ No newline at end of file
+        "processing_status", "created_at","modified_at", "modified_by"
+    )
+
+
+@admin.register(AssetJob)
+class AssetJobAdmin(admin.ModelAdmin):
+    list_display = ("kind", "asset", "status", "attempts", "run_after", "modified_at")
+    list_filter = ("kind", "status")
+    readonly_fields = ("last_error",)
+
+
+@admin.register(AssetGroup)
+class AssetGroupAdmin(admin.ModelAdmin):
+    list_display = ("name", "version_counter", "latest_version", "modified_at")
+    search_fields = ("name",)
+    readonly_fields = ("version_counter", "latest_version")
@@ -7,6 +7,10 @@ class AssetMetadataConfig(AppConfig):
     name = "asset_metadata"
 
     def ready(self):
+        import asset_metadata.blobs  # releases blob references when assets are deleted
+        import asset_metadata.search  # pg_trgm before migrations, below
+        from django.db.models.signals import pre_migrate
+        pre_migrate.connect(asset_metadata.search.create_extensions, sender=self)
         from django.db.utils import OperationalError, ProgrammingError
         from asset_metadata.models import AssetMetadata
 
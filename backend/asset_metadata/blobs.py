@@ -0,0 +1,187 @@
+# backend/asset_metadata/blobs.py
+"""
+Content-addressed blob store (sha256) behind the versioned media layout.
+
+Every distinct content is stored once at MEDIA_ROOT/blobs/<aa>/<bb>/<sha256>.
+The <type>/<N>/<file_name> path an AssetMetadata points at is a hard link to
+that blob, so file_location, downloads and previews work as before while an
+identical re-upload costs no extra disk space and no extra write.
+Blob.ref_count tracks how many AssetMetadata rows use each content; the last
+one to go deletes the blob.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import AssetMetadata, Blob
+
+HASH_BLOCK = 1024 * 1024
+
+
+def blob_path(sha256):
+    return os.path.join(settings.MEDIA_ROOT, "blobs", sha256[:2], sha256[2:4], sha256)
+
+
+def has_blob(sha256):
+    """
+    True if the server already holds this content (row and file).
+    """
+    if not sha256 or len(sha256) != 64:
+        return False
+    return Blob.objects.filter(sha256=sha256).exists() and os.path.exists(blob_path(sha256))
+
+
+def user_has_blob(user, sha256):
+    """
+    has_blob() scoped to what the user may already read: content behind one of
+    their own assets (modified_by), or any content for staff. Answering for
+    everyone would tell any client whether a given file is stored here.
+    """
+    if not (user and user.is_authenticated) or not has_blob(sha256):
+        return False
+    return user.is_staff or AssetMetadata.objects.filter(content_hash=sha256, modified_by=user).exists()
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_upload(upfile):
+    """
+    sha256 of a Django UploadedFile (reads its temp file / memory buffer).
+    """
+    h = hashlib.sha256()
+    for chunk in upfile.chunks(HASH_BLOCK):
+        h.update(chunk)
+    upfile.seek(0)
+    return h.hexdigest()
+
+
+def link_file(src, dst):
+    """
+    Hard-link src to dst; copy when the filesystem cannot link.
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError:  # e.g. FAT or another device: no sharing, but still correct
+        shutil.copyfile(src, dst)
+
+
+def store(sha256, target_dir, file_name, *, src_path=None, upfile=None):
+    """
+    Put content `sha256` at target_dir/<available file_name> and return the
+    saved name. If the blob already exists the new path is just a link to it
+    (and src_path / upfile are not written at all); otherwise the bytes are
+    written once to the target and that file is linked into the store.
+    """
+    storage = FileSystemStorage(location=target_dir)
+    name = storage.get_available_name(file_name)
+    dest = os.path.join(target_dir, name)
+
+    if has_blob(sha256):
+        link_file(blob_path(sha256), dest)
+        if src_path:
+            os.remove(src_path)
+        return name
+
+    if src_path:
+        os.replace(src_path, dest)
+    else:
+        name = storage.save(name, upfile)
+        dest = os.path.join(target_dir, name)
+    try:
+        link_file(dest, blob_path(sha256))
+    except FileExistsError:
+        pass  # a concurrent upload of the same content got there first
+    Blob.objects.get_or_create(sha256=sha256, defaults={"size": os.path.getsize(dest)})
+    return name
+
+
+def store_stream(fh, target_dir, file_name):
+    """
+    Write a readable stream (e.g. an archive member) once into target_dir,
+    hashing it on the way, then file it like store().
+    Returns (saved_name, sha256, size).
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    tmp = os.path.join(target_dir, f".{uuid.uuid4().hex}.tmp")
+    h, size = hashlib.sha256(), 0
+    try:
+        with open(tmp, "wb") as out:
+            for block in iter(lambda: fh.read(HASH_BLOCK), b""):
+                out.write(block)
+                h.update(block)
+                size += len(block)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    sha256 = h.hexdigest()
+    return store(sha256, target_dir, file_name, src_path=tmp), sha256, size
+
+
+def acquire(sha256, count=1):
+    if sha256:
+        Blob.objects.filter(sha256=sha256).update(ref_count=F("ref_count") + count)
+
+
+def release(sha256):
+    """
+    Drop one reference; delete the blob file when nobody uses it any more.
+    """
+    if not sha256:
+        return
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is None:
+            return
+        blob.ref_count -= 1
+        if blob.ref_count > 0:
+            blob.save(update_fields=["ref_count"])
+            return
+        blob.delete()
+    try:
+        os.remove(blob_path(sha256))
+    except OSError:
+        pass
+
+
+def discard(sha256, path):
+    """
+    Undo a store() whose AssetMetadata row was never created: remove the
+    file at path, and the blob too if no row references it.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(sha256=sha256, ref_count=0).first()
+        if blob is None or AssetMetadata.objects.filter(content_hash=sha256).exists():
+            return
+        blob.delete()
+    try:
+        os.remove(blob_path(sha256))
+    except OSError:
+        pass
+
+
+@receiver(post_delete)
+def release_blob_on_delete(sender, instance, **kwargs):
+    # no sender filter: admin deletes go through the proxy models too
+    if isinstance(instance, AssetMetadata):
+        release(instance.content_hash)
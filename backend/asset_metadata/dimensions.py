@@ -0,0 +1,62 @@
+# backend/asset_metadata/dimensions.py
+"""
+Typed copies of the free-text size fields, so they can be range-filtered
+through B-tree indexes (see filters.filter_by_ranges).
+
+    resolution "1920x1080"        -> width 1920, height 1080              (pixels)
+    resolution "148.0x5.6x140.5"  -> width 148.0, height 5.6, depth 140.5,
+                                     bbox_extent 148.0 (longest side)     (model units, glTF is Y-up)
+    duration                      -> duration_seconds
+
+resolution / duration stay the source of truth; AssetMetadata.save() keeps
+these in step and backfill_dimensions fills rows written before they existed.
+"""
+import re
+
+DIMENSION_FIELDS = ("width", "height", "depth", "bbox_extent", "duration_seconds")
+
+_SPLIT = re.compile(r"\s*[x×X*]\s*")
+
+
+def parse_resolution(text):
+    """
+    (width, height, depth) from "WxH" or "XxYxZ"; None for parts that are
+    missing and all None if the text is not of that shape.
+    """
+    parts = _SPLIT.split((text or "").strip())
+    if len(parts) not in (2, 3):
+        return None, None, None
+    try:
+        values = [float(p) for p in parts]
+    except ValueError:
+        return None, None, None
+    if any(v < 0 or v != v or v == float("inf") for v in values):
+        return None, None, None
+    return tuple(values) + (None,) * (3 - len(values))
+
+
+def derived_dimensions(resolution, duration):
+    """
+    Values of DIMENSION_FIELDS for the given resolution text and duration.
+    """
+    width, height, depth = parse_resolution(resolution)
+    return {
+        "width": width,
+        "height": height,
+        "depth": depth,
+        "bbox_extent": max(width, height, depth) if depth is not None else None,
+        "duration_seconds": duration.total_seconds() if duration is not None else None,
+    }
+
+
+def fill_dimensions(asset):
+    """
+    Set the typed columns on asset from its resolution / duration.
+    Returns the list of changed fields.
+    """
+    changed = []
+    for name, value in derived_dimensions(asset.resolution, asset.duration).items():
+        if getattr(asset, name) != value:
+            setattr(asset, name, value)
+            changed.append(name)
+    return changed
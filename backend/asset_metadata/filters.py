@@ -0,0 +1,96 @@
+# backend/asset_metadata/filters.py
+"""
+Query-string filters shared by the asset list endpoints.
+
+    ?tags=a,b         all of (JSONB containment, served by the tags GIN index)
+    ?tags_any=a,b     any of
+    ?tags_none=a,b    none of
+
+Each parameter may also repeat (?tags=a&tags=b). tag_counts() aggregates
+the tags of a filtered queryset for the facet sidebar.
+
+Numeric ranges on the typed dimension columns (dimensions.py), inclusive:
+
+    ?min_width=3840&max_polygons=50000&min_height=1&max_height=2
+    ?duration__lt=30          also __gt / __gte / __lte on any of the names below
+
+width / height / depth / extent are pixels for images and videos, model
+units for GLBs; duration is in seconds.
+"""
+import math
+
+from django.db.models import CharField, Count, F, Func, Q
+from rest_framework.exceptions import ValidationError
+
+# query-string name -> column
+RANGE_FIELDS = {
+    "width": "width",
+    "height": "height",
+    "depth": "depth",
+    "extent": "bbox_extent",
+    "polygons": "polygon_count",
+    "duration": "duration_seconds",
+}
+_RANGE_PARAMS = {}
+for _name, _column in RANGE_FIELDS.items():
+    _RANGE_PARAMS[f"min_{_name}"] = f"{_column}__gte"
+    _RANGE_PARAMS[f"max_{_name}"] = f"{_column}__lte"
+    for _op in ("gt", "gte", "lt", "lte"):
+        _RANGE_PARAMS[f"{_name}__{_op}"] = f"{_column}__{_op}"
+
+
+def tag_list(params, name):
+    values = []
+    for value in params.getlist(name):
+        values += [t.strip() for t in value.split(",") if t.strip()]
+    return values
+
+
+def filter_by_tags(qs, params):
+    all_of = tag_list(params, "tags")
+    if all_of:
+        qs = qs.filter(tags__contains=all_of)  # one @> probe for the whole set
+
+    any_of = tag_list(params, "tags_any")
+    if any_of:
+        match = Q()
+        for t in any_of:
+            match |= Q(tags__contains=[t])   # OR of index scans (jsonb_path_ops has no ?|)
+        qs = qs.filter(match)
+
+    for t in tag_list(params, "tags_none"):
+        qs = qs.exclude(tags__contains=[t])
+    return qs
+
+
+def filter_by_ranges(qs, params):
+    """
+    Apply the min_/max_/__lt-style range parameters present in params.
+    A value that is not a number is a 400.
+    """
+    lookups = {}
+    for param, lookup in _RANGE_PARAMS.items():
+        raw = params.get(param)
+        if raw in (None, ""):
+            continue
+        try:
+            value = float(raw)
+        except ValueError:
+            value = math.nan
+        if not math.isfinite(value):
+            raise ValidationError({param: "Must be a number."})
+        lookups[lookup] = value
+    return qs.filter(**lookups) if lookups else qs
+
+
+def tag_counts(qs, limit=100):
+    """
+    [{"tag": ..., "count": ...}] over the rows of qs, most used first.
+    """
+    return list(
+        qs.order_by()
+        .annotate(tag=Func(F("tags"), function="jsonb_array_elements_text", output_field=CharField()))
+        .values("tag")
+        .annotate(count=Count("*"))
+        .order_by("-count", "tag")[:limit]
+    )
@@ -0,0 +1,194 @@
+# backend/asset_metadata/jobs.py
+"""
+DB-backed job queue for post-upload processing.
+
+Apps register handlers by name:
+
+    @jobs.register("extract")
+    def extract(asset): ...
+
+upload enqueues jobs for a new asset and `manage.py run_asset_workers` runs
+them in child processes with memory/time limits. No external broker is used:
+AssetJob rows are the queue.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AssetMetadata, AssetJob, CatalogVersion
+
+# Jobs queued for every new upload. The rest are chained from THEN below.
+INGEST_JOBS = ("extract",)
+
+# kind -> jobs queued when it succeeds. previews needs the duration and
+# dimensions extract stores, so it must not race it; sidecars goes last so
+# the jobs of one upload run one after the other.
+THEN = {"extract": ("previews",), "previews": ("sidecars",)}
+
+RETRY_BASE_SECONDS = 30  # 30s, 60s, 120s, ...
+
+_handlers = {}
+
+
+def register(kind):
+    """
+    Decorator registering `fn(asset)` as the handler for jobs of `kind`.
+    """
+    def deco(fn):
+        _handlers[kind] = fn
+        return fn
+    return deco
+
+
+def handler_for(kind):
+    return _handlers.get(kind)
+
+
+def enqueue(asset, *kinds):
+    """
+    Queue jobs for an asset and mark it pending.
+    """
+    _queue([asset.pk], kinds)
+    if asset.processing_status != AssetMetadata.ProcessingStatus.PENDING:
+        asset.processing_status = AssetMetadata.ProcessingStatus.PENDING
+        asset.save(update_fields=["processing_status"])
+
+
+def _queue(asset_ids, kinds):
+    max_attempts = getattr(settings, "ASSET_JOB_MAX_ATTEMPTS", 3)
+    AssetJob.objects.bulk_create(
+        [AssetJob(asset_id=a, kind=k, max_attempts=max_attempts) for a in asset_ids for k in kinds]
+    )
+
+
+def enqueue_many(assets, *kinds):
+    """
+    Queue the same jobs for many assets in one INSERT. The caller sets
+    processing_status (e.g. when bulk-creating the rows as pending).
+    """
+    _queue([a.pk for a in assets], kinds)
+
+
+def claim_next():
+    """
+    Atomically take the oldest runnable job, or return None.
+    SKIP LOCKED lets several workers poll the same table without blocking.
+    """
+    with transaction.atomic():
+        job = (
+            AssetJob.objects.select_for_update(skip_locked=True)
+            .filter(status=AssetJob.Status.QUEUED, run_after__lte=timezone.now())
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = AssetJob.Status.RUNNING
+        job.attempts += 1
+        job.locked_at = timezone.now()
+        job.save(update_fields=["status", "attempts", "locked_at", "modified_at"])
+        changed = AssetMetadata.objects.filter(pk=job.asset_id).exclude(
+            processing_status=AssetMetadata.ProcessingStatus.PROCESSING
+        ).update(processing_status=AssetMetadata.ProcessingStatus.PROCESSING, modified_at=timezone.now())
+        if changed:
+            transaction.on_commit(CatalogVersion.bump)  # status shows in list responses
+    return job
+
+
+def run_job(job_id):
+    """
+    Execute one claimed job in the current process and record the outcome.
+    """
+    job = AssetJob.objects.select_related("asset").get(pk=job_id)
+    handler = handler_for(job.kind)
+    if handler is None:
+        fail_job(job.pk, f"No handler registered for job kind '{job.kind}'.", retry=False)
+        return
+    try:
+        handler(job.asset)
+    except Exception:
+        fail_job(job.pk, traceback.format_exc())
+    else:
+        complete_job(job.pk)
+
+
+def complete_job(job_id):
+    with transaction.atomic():
+        job = AssetJob.objects.select_for_update().get(pk=job_id)
+        job.status = AssetJob.Status.DONE
+        job.last_error = ""
+        job.save(update_fields=["status", "last_error", "modified_at"])
+        if THEN.get(job.kind):
+            _queue([job.asset_id], THEN[job.kind])  # before the refresh, so the asset stays pending
+        _refresh_asset_status(job.asset_id)
+
+
+def fail_job(job_id, error, retry=True):
+    """
+    Record a failure. The job is re-queued with exponential backoff until it
+    runs out of attempts. Does nothing if the job is no longer running
+    (e.g. the child already recorded its own result).
+    """
+    with transaction.atomic():
+        job = AssetJob.objects.select_for_update().filter(pk=job_id).first()
+        if job is None or job.status != AssetJob.Status.RUNNING:
+            return
+        job.last_error = error[-4000:]
+        if retry and job.attempts < job.max_attempts:
+            job.status = AssetJob.Status.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+        else:
+            job.status = AssetJob.Status.FAILED
+        job.save(update_fields=["status", "last_error", "run_after", "modified_at"])
+        _refresh_asset_status(job.asset_id)
+
+
+def release_job(job_id):
+    """
+    Put a running job back in the queue without counting the attempt
+    (the worker is shutting down, the job did not fail).
+    """
+    with transaction.atomic():
+        job = AssetJob.objects.select_for_update().filter(pk=job_id).first()
+        if job is None or job.status != AssetJob.Status.RUNNING:
+            return
+        job.status = AssetJob.Status.QUEUED
+        job.attempts = max(0, job.attempts - 1)
+        job.run_after = timezone.now()
+        job.locked_at = None
+        job.save(update_fields=["status", "attempts", "run_after", "locked_at", "modified_at"])
+        _refresh_asset_status(job.asset_id)
+
+
+def requeue_stale(older_than):
+    """
+    Put RUNNING jobs locked before now - older_than back in the queue
+    (their worker died without reporting). Returns the number re-queued.
+    """
+    cutoff = timezone.now() - older_than
+    return AssetJob.objects.filter(status=AssetJob.Status.RUNNING, locked_at__lt=cutoff).update(
+        status=AssetJob.Status.QUEUED, run_after=timezone.now()
+    )
+
+
+def _refresh_asset_status(asset_id):
+    """
+    Derive AssetMetadata.processing_status from its jobs.
+    """
+    statuses = set(AssetJob.objects.filter(asset_id=asset_id).values_list("status", flat=True))
+    if AssetJob.Status.RUNNING in statuses:
+        new = AssetMetadata.ProcessingStatus.PROCESSING
+    elif AssetJob.Status.QUEUED in statuses:
+        new = AssetMetadata.ProcessingStatus.PENDING
+    elif AssetJob.Status.FAILED in statuses:
+        new = AssetMetadata.ProcessingStatus.FAILED
+    else:
+        new = AssetMetadata.ProcessingStatus.READY
+    changed = AssetMetadata.objects.filter(pk=asset_id).exclude(processing_status=new).update(
+        processing_status=new, modified_at=timezone.now()
+    )
+    if changed:
+        transaction.on_commit(CatalogVersion.bump)
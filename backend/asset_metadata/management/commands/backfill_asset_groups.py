@@ -0,0 +1,44 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from asset_metadata.models import AssetMetadata, AssetGroup, CatalogVersion
+
+# <type>/<N>/<file_name> as written by upload
+_VERSION_DIR = re.compile(r"^[^/]+/(\d+)/")
+
+
+class Command(BaseCommand):
+    help = "Create AssetGroup rows for existing assets and number their versions"
+
+    def handle(self, *args, **kwargs):
+        names = (
+            AssetMetadata.objects.filter(group__isnull=True)
+            .values_list("file_name", flat=True).distinct()
+        )
+        for name in list(names):
+            with transaction.atomic():
+                group, _ = AssetGroup.objects.get_or_create(name=name)
+                group = AssetGroup.objects.select_for_update().get(pk=group.pk)
+                taken = set(group.versions.exclude(version__isnull=True).values_list("version", flat=True))
+                rows = AssetMetadata.objects.filter(file_name=name, group__isnull=True).order_by("created_at", "id")
+
+                for a in rows:
+                    # keep the number from the folder name when it is free, else append
+                    m = _VERSION_DIR.match((a.file_location or "").replace("\\", "/"))
+                    version = int(m.group(1)) if m else None
+                    if version is None or version in taken:
+                        version = max(taken | {group.version_counter}) + 1
+                    taken.add(version)
+                    AssetMetadata.objects.filter(pk=a.pk).update(group=group, version=version, modified_at=timezone.now())
+
+                group.version_counter = max(taken | {group.version_counter})
+                group.save(update_fields=["version_counter", "modified_at"])
+                group.repoint_latest()
+                group.refresh_version_count()
+                transaction.on_commit(CatalogVersion.bump)  # group / version are in list responses
+            self.stdout.write(f"{name}: {len(taken)} version(s)")
+
+        self.stdout.write("Backfill completed.")
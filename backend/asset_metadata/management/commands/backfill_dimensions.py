@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from asset_metadata.dimensions import DIMENSION_FIELDS, fill_dimensions
+from asset_metadata.models import AssetMetadata, CatalogVersion
+
+
+class Command(BaseCommand):
+    help = "Fill width/height/depth/bbox_extent/duration_seconds from resolution and duration on existing assets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        size = options["batch_size"]
+        last, done = 0, 0
+        while True:
+            # pk-ordered batches; only() keeps the read to the columns involved
+            rows = list(
+                AssetMetadata.objects.filter(pk__gt=last).order_by("pk")
+                .only("resolution", "duration", "modified_at", *DIMENSION_FIELDS)[:size]
+            )
+            if not rows:
+                break
+            changed = [a for a in rows if fill_dimensions(a)]
+            now = timezone.now()
+            for a in changed:
+                a.modified_at = now  # exported columns changed: sync clients must see these rows again
+            AssetMetadata.objects.bulk_update(changed, [*DIMENSION_FIELDS, "modified_at"])
+            done += len(changed)
+            last = rows[-1].pk
+        if done:
+            CatalogVersion.bump()  # bulk_update skips save() and its signal
+        self.stdout.write(f"Updated {done} asset(s).")
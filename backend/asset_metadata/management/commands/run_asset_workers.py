@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from asset_metadata import jobs
+from asset_metadata.worker import run_in_child
+
+
+class Command(BaseCommand):
+    help = "Run queued asset processing jobs (metadata extraction, previews) in a pool of child processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 2,
+                            help="Number of jobs run at the same time.")
+        parser.add_argument("--memory-mb", type=int, default=getattr(settings, "ASSET_JOB_MEMORY_MB", 2048),
+                            help="Address-space limit per job process (POSIX only).")
+        parser.add_argument("--timeout", type=int, default=getattr(settings, "ASSET_JOB_TIMEOUT", 300),
+                            help="Seconds before a job process is killed and the job retried.")
+        parser.add_argument("--poll", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit when the queue is drained instead of polling forever.")
+
+    def handle(self, *args, **opts):
+        concurrency = max(1, opts["concurrency"])
+        timeout = opts["timeout"]
+        # fork is cheap and reuses the loaded Django; Windows only has spawn
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+        self._requeue_stale(timeout)
+        self.stdout.write(f"Asset workers started (concurrency={concurrency}, timeout={timeout}s).")
+
+        running = {}  # job_id -> (process, started_at)
+        last_sweep = time.monotonic()
+        try:
+            while True:
+                self._reap(running, timeout)
+                # another worker may have died meanwhile; its jobs would stay RUNNING forever
+                if time.monotonic() - last_sweep >= timeout:
+                    self._requeue_stale(timeout)
+                    last_sweep = time.monotonic()
+
+                claimed = False
+                while len(running) < concurrency:
+                    job = jobs.claim_next()
+                    if job is None:
+                        break
+                    claimed = True
+                    # children must not share the parent's DB socket
+                    connections.close_all()
+                    proc = ctx.Process(
+                        target=run_in_child, args=(job.pk, opts["memory_mb"], timeout), daemon=True
+                    )
+                    proc.start()
+                    running[job.pk] = (proc, time.monotonic())
+                    self.stdout.write(f"Started {job.kind} job #{job.pk} for asset {job.asset_id}")
+
+                if opts["once"] and not running and not claimed:
+                    break
+                if not claimed:
+                    time.sleep(opts["poll"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; re-queueing running jobs.")
+            for job_id, (proc, _) in running.items():
+                proc.kill()
+                proc.join()
+                jobs.release_job(job_id)
+
+    def _requeue_stale(self, timeout):
+        # twice the timeout: a live worker kills and reports its jobs well before that
+        requeued = jobs.requeue_stale(timedelta(seconds=timeout * 2))
+        if requeued:
+            self.stdout.write(f"Re-queued {requeued} stale job(s).")
+
+    def _reap(self, running, timeout):
+        for job_id, (proc, started) in list(running.items()):
+            if proc.is_alive():
+                if time.monotonic() - started <= timeout:
+                    continue
+                proc.kill()
+                proc.join()
+                jobs.fail_job(job_id, f"Timed out after {timeout}s.")
+                self.stdout.write(f"Job #{job_id} timed out")
+            else:
+                proc.join()
+                if proc.exitcode != 0:
+                    # killed by the OS (OOM, SIGXCPU) before it could record anything
+                    jobs.fail_job(job_id, f"Worker process exited with code {proc.exitcode}.")
+                    self.stdout.write(f"Job #{job_id} crashed (exit code {proc.exitcode})")
+            del running[job_id]
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from asset_metadata.models import AssetMetadata
+from asset_metadata.search import refresh_search_vectors
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search vectors of existing assets (after upgrading or raw imports)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        size = options["batch_size"]
+        last, done = 0, 0
+        while True:
+            # pk ranges keep each UPDATE short, so writers are never blocked for long
+            ids = list(
+                AssetMetadata.objects.filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:size]
+            )
+            if not ids:
+                break
+            done += refresh_search_vectors(AssetMetadata.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]))
+            last = ids[-1]
+        self.stdout.write(f"Updated {done} asset(s).")
@@ -1,12 +1,95 @@
 
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 #from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.models import User  # to reference "Modified By" user
-from django.db.models.signals import post_save
+from django.db import connections, router, transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
+from django.utils import timezone
+
+from .dimensions import fill_dimensions
+from .search import SEARCH_FIELDS, search_vector_of
+
+class AssetGroup(models.Model):
+    """
+    One logical asset: every uploaded version of the same file_name.
+    version_counter is bumped under a row lock, so concurrent uploads of the
+    same name always get distinct version numbers. It is a high-water mark:
+    deleted versions leave gaps and are not reused. The number of versions
+    that exist is kept in AssetMetadata.no_of_versions.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    version_counter = models.IntegerField(default=0)   # last version number handed out
+    latest_version = models.ForeignKey(
+        "AssetMetadata",
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def allocate_version(cls, name):
+        """
+        Return (group, version) for the next upload of `name`. Numbers are
+        never reused; an upload that fails after this leaves a gap.
+        """
+        with transaction.atomic():
+            group, _ = cls.objects.get_or_create(name=name)
+            group = cls.objects.select_for_update().get(pk=group.pk)
+            group.version_counter += 1
+            group.save(update_fields=["version_counter", "modified_at"])
+        return group, group.version_counter
+
+    def set_latest(self, asset):
+        """
+        Point latest_version at `asset` unless a newer version already won.
+        """
+        with transaction.atomic():
+            group = AssetGroup.objects.select_for_update(of=("self",)).select_related("latest_version").get(pk=self.pk)
+            current = group.latest_version
+            if current is None or (current.version or 0) < (asset.version or 0):
+                group.latest_version = asset
+                group.save(update_fields=["latest_version", "modified_at"])
+                transaction.on_commit(CatalogVersion.bump)  # ?latest=1 lists follow the pointer
+
+    def refresh_version_count(self):
+        """
+        Store the number of existing versions in no_of_versions on each of
+        them, and return it.
+        """
+        with transaction.atomic():
+            # same lock as allocate_version: counts of concurrent uploads see each other
+            AssetGroup.objects.select_for_update().filter(pk=self.pk).first()
+            count = self.versions.count()
+            changed = self.versions.exclude(no_of_versions=count).update(no_of_versions=count, modified_at=timezone.now())
+            if changed:
+                transaction.on_commit(CatalogVersion.bump)
+        return count
+
+    def repoint_latest(self):
+        """
+        Re-derive latest_version from the remaining versions (after a delete).
+        """
+        latest = self.versions.order_by("-version").first()
+        if AssetGroup.objects.filter(pk=self.pk).exclude(latest_version=latest).update(latest_version=latest):
+            transaction.on_commit(CatalogVersion.bump)
+
 
 class AssetMetadata(models.Model):
+    class ProcessingStatus(models.TextChoices):
+        PENDING = "pending", "Pending"          # queued for background extraction
+        PROCESSING = "processing", "Processing"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
     file_name = models.CharField(max_length=255)
     file_type = models.CharField(max_length=50, blank=True)
     file_size = models.FloatField(null=True, blank=True)   # store in MB
@@ -16,9 +99,29 @@ class AssetMetadata(models.Model):
     tags = models.JSONField(default=list, blank=True)       # example: ["car", "3d", "black"]
 
     resolution = models.CharField(max_length=20, blank=True, null=True) # for images/videos (1080 x 1920)
-    polygon_count = models.IntegerField(null=True, blank=True) # for 3D model
+    polygon_count = models.IntegerField(null=True, blank=True, db_index=True) # for 3D model
     duration = models.DurationField(null=True, blank=True)  # for videos
-    no_of_versions = models.IntegerField(default=1)
+    # typed copies of resolution / duration for range filters, kept in step by save() (dimensions.py)
+    width = models.FloatField(null=True, blank=True, editable=False, db_index=True)    # px, or bbox X for models
+    height = models.FloatField(null=True, blank=True, editable=False, db_index=True)   # px, or bbox Y (up)
+    depth = models.FloatField(null=True, blank=True, editable=False, db_index=True)    # bbox Z, models only
+    bbox_extent = models.FloatField(null=True, blank=True, editable=False, db_index=True)  # longest bbox side
+    duration_seconds = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    no_of_versions = models.IntegerField(default=1)   # versions of this asset that exist (same on every row of the group)
+    group = models.ForeignKey(
+        AssetGroup,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="versions"
+    )
+    version = models.IntegerField(null=True, blank=True)   # 1, 2, 3 ... within the group
+    media_info = models.JSONField(default=dict, blank=True)  # probe results, e.g. {"vertex_count": 1200, "material_count": 3}
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # sha256, key into Blob
+    placeholder = models.CharField(max_length=64, blank=True)  # BlurHash of the thumbnail, set by the "previews" job
+    search_vector = SearchVectorField(null=True, editable=False)  # file_name + tags + description, see search.py
+    processing_status = models.CharField(
+        max_length=10, choices=ProcessingStatus.choices, default=ProcessingStatus.READY
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
@@ -30,9 +133,154 @@ class AssetMetadata(models.Model):
     )
 
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["group", "-version"]),
+            # metadata export / sync order (asset_metadata/views.py), and read backwards
+            # the keyset pages of the asset lists (asset_metadata/pagination.py)
+            models.Index(fields=["modified_at", "created_at", "id"], name="asset_modified_export_idx"),
+            models.Index(fields=["created_at", "id"], name="asset_created_keyset_idx"),
+            models.Index(fields=["file_name"], name="asset_file_name_idx"),
+            # search (asset_metadata/search.py)
+            GinIndex(fields=["search_vector"], name="asset_search_vector_idx"),
+            GinIndex(fields=["file_name"], name="asset_file_name_trgm_idx", opclasses=["gin_trgm_ops"]),
+            # tag filters: tags @> '["a", "b"]' (asset_metadata/filters.py)
+            GinIndex(fields=["tags"], name="asset_tags_gin_idx", opclasses=["jsonb_path_ops"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["group", "version"], name="unique_asset_group_version"),
+        ]
+
     def __str__(self):
         return self.file_name
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            fill_dimensions(self)
+        elif update_fields:
+            # auto_now is only written when listed; every change must move the
+            # metadata export cursor (modified_since), worker writes included
+            kwargs["update_fields"] = set(update_fields).union({"modified_at"})
+            if {"resolution", "duration"}.intersection(update_fields):
+                kwargs["update_fields"].update(fill_dimensions(self))
+        # search_vector goes out in the same statement as the text it is built from
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        vector = (update_fields is None or SEARCH_FIELDS.intersection(update_fields)) \
+            and connections[using].vendor == "postgresql"
+        if vector:
+            self.search_vector = search_vector_of(self)
+            if update_fields is not None:
+                kwargs["update_fields"] = set(kwargs["update_fields"]).union({"search_vector"})
+        super().save(*args, **kwargs)
+        if vector:
+            # drop the expression; the stored tsvector loads on access like a deferred field
+            del self.__dict__["search_vector"]
+
+    def save_media_info(self, values, update_fields=()):
+        """
+        Merge values into the stored media_info (row locked) and save it with
+        update_fields. Jobs for the same asset may run at the same time; each
+        adds its own keys without dropping the others'.
+        """
+        with transaction.atomic():
+            stored = AssetMetadata.objects.select_for_update().values_list("media_info", flat=True).get(pk=self.pk)
+            self.media_info = {**(stored or {}), **values}
+            self.save(update_fields=["media_info", *update_fields])
+
+
+@receiver(post_delete)
+def repoint_group_on_delete(sender, instance, **kwargs):
+    # no sender filter: admin deletes go through the proxy models too
+    if isinstance(instance, AssetMetadata) and instance.group_id:
+        group = AssetGroup.objects.filter(pk=instance.group_id).first()
+        if group is not None:
+            if group.latest_version_id in (None, instance.pk):
+                group.repoint_latest()
+            group.refresh_version_count()
+
+
+class CatalogVersion(models.Model):
+    """
+    Single-row counter bumped after every committed asset write. Cached
+    aggregates over the catalog (tag facets) and list ETags are keyed on it,
+    so they are reused until something changes and never served stale after.
+    Writes that bypass save() (queryset.update) bump it themselves.
+    """
+    version = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField(default=timezone.now)   # time of the last bump
+
+    @classmethod
+    def state(cls):
+        """
+        (version, modified_at) in one primary-key read; (0, None) before any write.
+        """
+        return cls.objects.filter(pk=1).values_list("version", "modified_at").first() or (0, None)
+
+    @classmethod
+    def current(cls):
+        return cls.state()[0]
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=1).update(version=models.F("version") + 1, modified_at=timezone.now()):
+            cls.objects.get_or_create(pk=1, defaults={"version": 1})
+
+    def __str__(self):
+        return f"catalog v{self.version}"
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_catalog_version(sender, instance, **kwargs):
+    if isinstance(instance, AssetMetadata):
+        # after commit: the counter row is not held locked for the whole write
+        transaction.on_commit(CatalogVersion.bump)
+
+
+class Blob(models.Model):
+    """
+    One stored content, shared by every AssetMetadata row with the same sha256.
+    Bytes live at MEDIA_ROOT/blobs/<aa>/<bb>/<sha256> and are hard-linked into
+    the versioned <type>/<N>/<file_name> paths (see blobs.py).
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()                  # bytes
+    ref_count = models.IntegerField(default=0)       # AssetMetadata rows using this content
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} x{self.ref_count}"
+
+
+class AssetJob(models.Model):
+    """
+    One unit of background work on an asset (see jobs.py / run_asset_workers).
+    The table itself is the queue: workers claim rows with SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    asset = models.ForeignKey(AssetMetadata, on_delete=models.CASCADE, related_name="jobs")
+    kind = models.CharField(max_length=30)      # handler name, e.g. "extract", "previews"
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)  # pushed back on retry
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self):
+        return f"{self.kind} #{self.asset_id} ({self.status})"
+
 
     # Delete the record in database if user delete the file directly from the media folder
     #def delete(self, *args, **kwargs):
@@ -0,0 +1,108 @@
+# backend/asset_metadata/pagination.py
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class AssetCursorPagination(CursorPagination):
+    """
+    Keyset pagination for asset lists, most recently changed first. The
+    cursor carries the whole (modified_at, created_at, id) key of the last
+    row and the next page is the rows strictly after it, so page N is an
+    index range scan like page 1 (no OFFSET, no COUNT(*)), and rows sharing
+    a timestamp are neither skipped nor repeated. asset_modified_export_idx
+    serves it, read backwards.
+
+    DRF's CursorPagination positions on the first ordering field only and
+    steps over equal values with an OFFSET; this class keeps its cursor
+    encoding and response shape but compares on every ordering field.
+    A row modified while a client pages through moves to the front of the
+    list: that client will not see it again on later pages.
+    """
+    ordering = ("-modified_at", "-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        # walking backwards: read the other way round, then flip the page
+        order = [_flip(f) for f in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*order)
+        if self.cursor and self.cursor.position is not None:
+            queryset = queryset.filter(_after(order, self._decode_key(queryset.model, self.cursor.position)))
+
+        rows = list(queryset[:self.page_size + 1])
+        more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+        # coming from a cursor means there are rows on the side we came from
+        came_from = self.cursor is not None and self.cursor.position is not None
+        self.has_next, self.has_previous = (came_from, more) if reverse else (more, came_from)
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._encode_key(self.page[-1])))
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._encode_key(self.page[0])))
+
+    def _encode_key(self, row):
+        names = [f.lstrip("-") for f in self.ordering]
+        values = [row[n] if isinstance(row, dict) else getattr(row, n) for n in names]
+        return json.dumps([v.isoformat() if hasattr(v, "isoformat") else v for v in values])
+
+    def _decode_key(self, model, position):
+        names = [f.lstrip("-") for f in self.ordering]
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(names):
+                raise ValueError(position)
+            return [model._meta.get_field(n).to_python(v) for n, v in zip(names, values)]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class CreatedCursorPagination(AssetCursorPagination):
+    """
+    Newest upload first, keyed on (created_at, id) (asset_created_keyset_idx).
+    """
+    ordering = ("-created_at", "-id")
+
+
+def _flip(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def _after(order, key):
+    """
+    Rows strictly after `key` in `order`, as
+        a < x  OR  (a = x AND b < y)  OR  (a = x AND b = y AND c < z)
+    plus a redundant a <= x, which lets the planner use the index range.
+    """
+    names = [f.lstrip("-") for f in order]
+    ops = ["lt" if f.startswith("-") else "gt" for f in order]
+    branches = [
+        Q(**{f"{names[i]}__{ops[i]}": key[i]}, **dict(zip(names[:i], key[:i])))
+        for i in range(len(order))
+    ]
+    return Q(**{f"{names[0]}__{ops[0]}e": key[0]}) & reduce(or_, branches)
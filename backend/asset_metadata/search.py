@@ -0,0 +1,90 @@
+# backend/asset_metadata/search.py
+"""
+Full-text and typo-tolerant search over assets (PostgreSQL).
+
+    search_vector  tsvector of file_name (weight A), tags (B) and description (C),
+                   GIN-indexed; written by AssetMetadata.save() in the same
+                   INSERT / UPDATE, and rebuilt after bulk inserts
+    file_name      pg_trgm GIN index (gin_trgm_ops) for word similarity, so a
+                   misspelt "chaer_v2" still finds "red_chair_v2.glb"
+
+search() matches either index and ranks by ts_rank plus trigram word similarity.
+Other databases have no search_vector contents; save() skips them.
+"""
+import json
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, Func, Q, TextField, Value
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = "english"
+SEARCH_FIELDS = {"file_name", "description", "tags"}
+WORD_BREAKS = r"[_.\-]+"
+
+
+def _words(expression):
+    # "red_car-v2.glb" -> "red car v2 glb": the text parser keeps such names as one token
+    return Func(expression, Value(WORD_BREAKS), Value(" "), Value("g"), function="regexp_replace",
+                output_field=TextField())
+
+
+def search_vector():
+    return (
+        SearchVector(_words(F("file_name")), weight="A", config=SEARCH_CONFIG)
+        + SearchVector(_words(Cast("tags", TextField())), weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def search_vector_of(asset):
+    """
+    search_vector() built from the instance's own values instead of its
+    columns, so it can go into the INSERT / UPDATE that writes them.
+    """
+    tags = json.dumps(asset.tags, ensure_ascii=False) if asset.tags is not None else ""  # as jsonb::text
+    return (
+        SearchVector(Value(re.sub(WORD_BREAKS, " ", asset.file_name or "")), weight="A", config=SEARCH_CONFIG)
+        + SearchVector(Value(re.sub(WORD_BREAKS, " ", tags)), weight="B", config=SEARCH_CONFIG)
+        + SearchVector(Value(asset.description or ""), weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(queryset):
+    """
+    Recompute search_vector in the database for every row of queryset
+    (one UPDATE). Call after writes that skip save(), e.g. bulk_create.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return 0
+    return queryset.update(search_vector=search_vector())
+
+
+def search(queryset, q):
+    """
+    Rows of queryset matching q, best first. q uses web search syntax:
+    words, "quoted phrases", -excluded, or.
+    """
+    query = SearchQuery(q, search_type="websearch", config=SEARCH_CONFIG)
+    return (
+        queryset.filter(Q(search_vector=query) | Q(file_name__trigram_word_similar=q))
+        .annotate(rank=SearchRank(F("search_vector"), query) + TrigramWordSimilarity(q, "file_name"))
+        .order_by("-rank", "-id")
+    )
+
+
+def create_extensions(using="default", **kwargs):
+    """
+    pre_migrate: pg_trgm has to exist before the gin_trgm_ops index is created.
+    """
+    conn = connections[using]
+    if conn.vendor != "postgresql":
+        return
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except Exception as e:
+        # needs a superuser or a trusted extension (PostgreSQL 13+); have a DBA run it
+        print("Could not create extension pg_trgm:", e)
+
@@ -4,4 +4,4 @@ from .models import AssetMetadata
 class AssetMetadataSerializer(serializers.ModelSerializer):
     class Meta:
         model = AssetMetadata
-        fields = "__all__"
+        exclude = ["search_vector"]
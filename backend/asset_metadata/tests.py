@@ -1,3 +1,219 @@
-from django.test import TestCase
+# backend/asset_metadata/tests.py
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from upload_download.extract import extract_metadata
+
+from . import jobs
+from .dimensions import derived_dimensions, fill_dimensions, parse_resolution
+from .filters import filter_by_ranges
+from .models import AssetGroup, AssetJob, AssetMetadata
+
+
+class DimensionsTests(SimpleTestCase):
+    def test_parse_resolution(self):
+        self.assertEqual(parse_resolution("1920x1080"), (1920.0, 1080.0, None))
+        self.assertEqual(parse_resolution(" 148.0 × 5.6 X 140.5 "), (148.0, 5.6, 140.5))
+        self.assertEqual(parse_resolution("640*360"), (640.0, 360.0, None))
+
+    def test_parse_resolution_rejects_other_shapes(self):
+        for text in (None, "", "1080", "1x2x3x4", "wide x tall", "-1x5", "nanx3", "infx3"):
+            self.assertEqual(parse_resolution(text), (None, None, None), text)
+
+    def test_derived_dimensions(self):
+        self.assertEqual(
+            derived_dimensions("148.0x5.6x140.5", timedelta(seconds=90, milliseconds=500)),
+            {"width": 148.0, "height": 5.6, "depth": 140.5, "bbox_extent": 148.0, "duration_seconds": 90.5},
+        )
+        # images / videos have no depth, so no bounding box extent
+        self.assertEqual(derived_dimensions("1920x1080", None)["bbox_extent"], None)
+
+    def test_fill_dimensions_reports_changed_fields(self):
+        asset = AssetMetadata(file_name="a.mp4", resolution="640x360", duration=timedelta(seconds=4))
+        self.assertEqual(sorted(fill_dimensions(asset)), ["duration_seconds", "height", "width"])
+        self.assertEqual((asset.width, asset.height, asset.duration_seconds), (640.0, 360.0, 4.0))
+        self.assertEqual(fill_dimensions(asset), [])
+
+        asset.resolution = "garbage"
+        self.assertEqual(sorted(fill_dimensions(asset)), ["height", "width"])
+        self.assertIsNone(asset.width)
+
+    def test_save_with_update_fields_includes_derived_columns(self):
+        asset = AssetMetadata(pk=3, file_name="a.png", resolution="10x20")
+        with mock.patch("django.db.models.Model.save") as save:
+            asset.save(update_fields=["resolution"])
+        self.assertEqual(set(save.call_args.kwargs["update_fields"]), {"resolution", "width", "height", "modified_at"})
+
+
+class RangeFilterTests(SimpleTestCase):
+    def filtered(self, query):
+        qs = mock.Mock()
+        filter_by_ranges(qs, QueryDict(query))
+        return qs
+
+    def test_min_max_and_operators(self):
+        qs = self.filtered("min_width=3840&max_polygons=50000&duration__lt=30&extent__gte=1.5&tags=a")
+        qs.filter.assert_called_once_with(
+            width__gte=3840.0, polygon_count__lte=50000.0, duration_seconds__lt=30.0, bbox_extent__gte=1.5
+        )
+
+    def test_no_range_params_leaves_queryset_alone(self):
+        qs = self.filtered("tags=a&min_width=")
+        qs.filter.assert_not_called()
+
+    def test_non_numbers_are_rejected(self):
+        for query in ("min_width=wide", "max_height=nan", "depth__gt=inf"):
+            with self.assertRaises(ValidationError, msg=query) as ctx:
+                self.filtered(query)
+            self.assertIn(query.split("=")[0], ctx.exception.detail)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.asset = AssetMetadata.objects.create(file_name="a.glb", file_location="a.glb", tags=[])
+        self.ran = []
+        handlers = {kind: (lambda a, kind=kind: self.ran.append(kind)) for kind in ("extract", "previews", "sidecars")}
+        patcher = mock.patch.dict(jobs._handlers, handlers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def drain(self):
+        while (job := jobs.claim_next()) is not None:
+            jobs.run_job(job.pk)
+
+    def test_chain_runs_one_job_at_a_time(self):
+        jobs.enqueue(self.asset, *jobs.INGEST_JOBS)
+        job = jobs.claim_next()
+        jobs.run_job(job.pk)
+        # only the next step is queued, so previews and sidecars never overlap
+        self.assertEqual(list(self.asset.jobs.filter(status=AssetJob.Status.QUEUED).values_list("kind", flat=True)), ["previews"])
+        self.drain()
+        self.assertEqual(self.ran, ["extract", "previews", "sidecars"])
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.processing_status, AssetMetadata.ProcessingStatus.READY)
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        jobs._handlers["extract"] = mock.Mock(side_effect=RuntimeError("boom"))
+        jobs.enqueue(self.asset, "extract")
+        for attempt in range(1, 4):
+            job = jobs.claim_next()
+            self.assertEqual(job.attempts, attempt)
+            jobs.run_job(job.pk)
+            AssetJob.objects.filter(pk=job.pk).update(run_after=timezone.now())  # skip the backoff
+        job.refresh_from_db()
+        self.assertEqual(job.status, AssetJob.Status.FAILED)
+        self.assertIn("boom", job.last_error)
+        self.assertFalse(self.asset.jobs.filter(kind="previews").exists())  # nothing chained from a failure
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.processing_status, AssetMetadata.ProcessingStatus.FAILED)
+
+    def test_release_does_not_count_the_attempt(self):
+        jobs.enqueue(self.asset, "extract")
+        job = jobs.claim_next()
+        jobs.release_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (AssetJob.Status.QUEUED, 0))
+
+    def test_requeue_stale(self):
+        jobs.enqueue(self.asset, "extract")
+        job = jobs.claim_next()
+        self.assertEqual(jobs.requeue_stale(timedelta(minutes=5)), 0)
+        AssetJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(jobs.requeue_stale(timedelta(minutes=5)), 1)
+        self.assertEqual(jobs.claim_next().pk, job.pk)
+
+    def test_save_media_info_keeps_keys_written_meanwhile(self):
+        stale = AssetMetadata.objects.get(pk=self.asset.pk)
+        AssetMetadata.objects.filter(pk=self.asset.pk).update(media_info={"vertex_count": 12})
+        stale.save_media_info({"sidecars": ["br"]})
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.media_info, {"vertex_count": 12, "sidecars": ["br"]})
+
+
+class MetadataExportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        os.makedirs(os.path.join(self.media_root, "image", "1"))
+        Image.new("RGB", (40, 30)).save(os.path.join(self.media_root, "image", "1", "a.png"))
+        self.asset = AssetMetadata.objects.create(
+            file_name="a.png", file_type="image/png", file_location="image/1/a.png", tags=[]
+        )
+        # uploaded an hour ago; the sync client's cursor is a minute ago
+        AssetMetadata.objects.filter(pk=self.asset.pk).update(modified_at=timezone.now() - timedelta(hours=1))
+        self.since = (timezone.now() - timedelta(minutes=1)).isoformat()
+
+    def export_ids(self, **params):
+        r = self.client.get("/asset_metadata/", {"format": "ndjson", **params})
+        return [json.loads(line)["id"] for line in b"".join(r.streaming_content).decode().splitlines()]
+
+    def test_modified_since_is_inclusive(self):
+        stamp = AssetMetadata.objects.get(pk=self.asset.pk).modified_at.isoformat()
+        self.assertEqual(self.export_ids(modified_since=stamp), [self.asset.pk])
+        self.assertEqual(self.export_ids(modified_since=self.since), [])
+
+    def test_worker_writes_show_up_in_the_next_export(self):
+        extract_metadata(AssetMetadata.objects.get(pk=self.asset.pk))
+        self.assertEqual(AssetMetadata.objects.get(pk=self.asset.pk).resolution, "40x30")
+        self.assertEqual(self.export_ids(modified_since=self.since), [self.asset.pk])
+
+    def test_job_status_and_version_counts_move_the_cursor(self):
+        group = AssetGroup.objects.create(name="a.png")
+        AssetMetadata.objects.filter(pk=self.asset.pk).update(group=group, no_of_versions=3)
+        for write in (
+            lambda: jobs.enqueue(AssetMetadata.objects.get(pk=self.asset.pk), "extract"),
+            jobs.claim_next,   # pending -> processing
+            group.refresh_version_count,
+        ):
+            AssetMetadata.objects.filter(pk=self.asset.pk).update(modified_at=timezone.now() - timedelta(hours=1))
+            write()
+            self.assertEqual(self.export_ids(modified_since=self.since), [self.asset.pk])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        AssetMetadata.objects.bulk_create([AssetMetadata(file_name=f"{i}.png", tags=[]) for i in range(7)])
+        ids = list(AssetMetadata.objects.order_by("id").values_list("id", flat=True))
+        now = timezone.now()
+        # ties on modified_at (and on created_at) across page boundaries
+        AssetMetadata.objects.filter(id__in=ids[:5]).update(modified_at=now, created_at=now)
+        AssetMetadata.objects.filter(id__in=ids[5:]).update(modified_at=now - timedelta(hours=1))
+        self.expected = ids[:5][::-1] + ids[5:][::-1]
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append([row["id"] for row in data["results"]])
+            url = data[link]
+        return pages
+
+    def test_pages_cover_every_row_once_in_both_directions(self):
+        forward = self.walk("/api/preview/assets/?fields=id&page_size=3", "next")
+        self.assertEqual(forward, [self.expected[:3], self.expected[3:6], self.expected[6:]])
+
+        last = self.client.get("/api/preview/assets/?fields=id&page_size=3").json()["next"]
+        last = self.client.get(last).json()["next"]
+        self.assertEqual(self.walk(last, "previous"), forward[::-1])
+
+    def test_edited_row_moves_to_the_front(self):
+        AssetMetadata.objects.get(pk=self.expected[-1]).save(update_fields=["tags"])
+        self.assertEqual(self.walk("/api/preview/assets/?fields=id&page_size=10", "next")[0][0], self.expected[-1])
+
+    def test_bad_cursor(self):
+        self.assertEqual(self.client.get("/api/preview/assets/?cursor=cD1bMV0=").status_code, 404)   # p=[1]
+        self.assertEqual(self.client.get("/api/preview/assets/?cursor=garbage").status_code, 404)
@@ -1,20 +1,98 @@
+import json
+
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from .models import AssetMetadata
 from asset_metadata import views
 
+EXPORT_CHUNK = 2000   # rows per server-side cursor fetch (and per yielded block)
+
+
+def _export_blocks(rows, ndjson):
+    """
+    Encode rows as they come off the cursor; one yielded string per chunk.
+    The JSON array matches what JsonResponse(list(...)) used to send.
+    """
+    encode = DjangoJSONEncoder().encode
+    block, first = [], True
+    if not ndjson:
+        block.append("[")
+    for row in rows:
+        if ndjson:
+            block.append(encode(row) + "\n")
+        else:
+            block.append(encode(row) if first else ", " + encode(row))
+        first = False
+        if len(block) >= EXPORT_CHUNK:
+            yield "".join(block)
+            block = []
+    if not ndjson:
+        block.append("]")
+    yield "".join(block)
+
+
 def metadata_list(request):
-    data = list(AssetMetadata.objects.values())  # get all metadata rows
-    return JsonResponse(data, safe=False)
+    """
+    Every asset row, streamed at constant memory for sync jobs.
+        ?format=ndjson                one JSON object per line (or Accept: application/x-ndjson)
+        ?format=json                  one JSON array (default)
+        ?modified_since=<ISO date/time>   only rows modified at or after it
+    Rows come oldest change first, so a sync can resume from the last modified_at it saw;
+    rows with exactly that timestamp come again, so none written in the same instant are missed.
+    """
+    fmt = request.GET.get("format") or (
+        "ndjson" if "application/x-ndjson" in request.headers.get("Accept", "") else "json"
+    )
+    if fmt not in ("json", "ndjson"):
+        return JsonResponse({"detail": "format must be 'json' or 'ndjson'."}, status=400)
 
+    columns = [f.attname for f in AssetMetadata._meta.concrete_fields if f.name != "search_vector"]
+    qs = AssetMetadata.objects.values(*columns).order_by("modified_at", "created_at", "id")
+
+    since = request.GET.get("modified_since")
+    if since:
+        when = parse_datetime(since)
+        if when is None and parse_date(since) is not None:
+            when = parse_datetime(since + "T00:00:00")
+        if when is None:
+            return JsonResponse({"detail": "modified_since must be an ISO 8601 date or datetime."}, status=400)
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        qs = qs.filter(modified_at__gte=when)
+
+    ndjson = fmt == "ndjson"
+    response = StreamingHttpResponse(
+        _export_blocks(qs.iterator(chunk_size=EXPORT_CHUNK), ndjson),
+        content_type="application/x-ndjson" if ndjson else "application/json",
+    )
+    response["X-Accel-Buffering"] = "no"  # nginx: pass blocks through as they are produced
+    return response
+
+from django.db.models import F
 from rest_framework import viewsets, permissions
 from .models import AssetMetadata
 from .serializers import AssetMetadataSerializer
+from .pagination import CreatedCursorPagination
+from .filters import filter_by_ranges, filter_by_tags
 
 class AssetMetadataViewSet(viewsets.ModelViewSet):
-    queryset = AssetMetadata.objects.all().order_by("-created_at")
+    queryset = AssetMetadata.objects.all().order_by("-created_at", "-id")
     serializer_class = AssetMetadataSerializer
     permission_classes = [permissions.AllowAny]  # or IsAuthenticated if you have auth
+    pagination_class = CreatedCursorPagination
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        # ?latest=1 -> one row per asset group (its newest version)
+        if self.request.query_params.get("latest") in ("1", "true"):
+            qs = qs.filter(group__latest_version=F("pk"))
+        # ?min_width= / ?max_polygons= / ?duration__lt= ... (typed, indexed columns)
+        qs = filter_by_ranges(qs, self.request.query_params)
+        # ?tags= / ?tags_any= / ?tags_none=
+        return filter_by_tags(qs, self.request.query_params)
 
     def perform_create(self, serializer):
         # If you want to track who modified it (optional, requires auth)
@@ -0,0 +1,43 @@
+# backend/asset_metadata/worker.py
+"""
+Entry point of the child process that runs one job for run_asset_workers.
+
+Kept free of Django imports at module level so it can be the target of a
+"spawn" process (Windows), which starts from a fresh interpreter.
+"""
+import os
+
+
+def _apply_limits(memory_mb, timeout):
+    """
+    Cap address space and CPU time of this process (POSIX only). A GLB that
+    blows past the limit raises MemoryError / gets SIGXCPU here instead of
+    taking the web or worker process down with it.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows: the parent still enforces the wall-clock timeout
+        return
+    if memory_mb:
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if timeout:
+        resource.setrlimit(resource.RLIMIT_CPU, (int(timeout), int(timeout) + 5))
+
+
+def run_in_child(job_id, memory_mb, timeout):
+    _apply_limits(memory_mb, timeout)
+
+    import django
+    from django.apps import apps
+    if not apps.ready:  # spawned interpreter; forked children inherit a set-up Django
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+        django.setup()
+
+    from django.db import connections
+    from asset_metadata import jobs
+
+    try:
+        jobs.run_job(job_id)
+    finally:
+        connections.close_all()
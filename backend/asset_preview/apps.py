@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class AssetPreviewConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "asset_preview"
-    verbose_name = "Asset Preview"
\ No newline at end of file
+    verbose_name = "Asset Preview"
+
+    def ready(self):
+        import asset_preview.tasks  # registers background job handlers
+        import asset_preview.signals  # drops cached previews of deleted assets
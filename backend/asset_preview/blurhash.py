@@ -0,0 +1,77 @@
+# backend/asset_preview/blurhash.py
+"""
+BlurHash encoder (https://blurha.sh), vectorised with numpy.
+
+A ~30 character string that clients decode into a blurred stand-in for an
+image, so the asset grid can paint every card before its thumbnail loads.
+The DCT components are computed in one einsum over a copy of the thumbnail
+downscaled to SAMPLE_PX. Images that already fit give the same string as the
+reference implementation; larger ones hash their downscaled copy, so the
+last characters can differ from a full-resolution reference hash.
+"""
+from __future__ import annotations
+
+import numpy as np
+from PIL import Image
+
+_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+SAMPLE_PX = 64   # the hash only holds a few components; more pixels change nothing visible
+
+
+def _base83(value: int, length: int) -> str:
+    return "".join(_ALPHABET[(value // 83 ** (length - 1 - i)) % 83] for i in range(length))
+
+
+def _srgb_to_linear(v):
+    v = v / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(v) -> int:
+    v = min(max(float(v), 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def encode(im: Image.Image, x_components: int = 4, y_components: int = 3) -> str:
+    """
+    BlurHash of a PIL image with x_components x y_components (1..9 each).
+    """
+    im = im.convert("RGB")
+    im.thumbnail((SAMPLE_PX, SAMPLE_PX))
+    rgb = _srgb_to_linear(np.asarray(im, dtype=np.float64))   # (h, w, 3)
+    h, w = rgb.shape[:2]
+
+    # factors[j, i] = norm / (w*h) * sum cos(pi*i*x/w) cos(pi*j*y/h) * rgb[y, x]
+    cos_x = np.cos(np.pi * np.arange(x_components)[:, None] * np.arange(w)[None, :] / w)
+    cos_y = np.cos(np.pi * np.arange(y_components)[:, None] * np.arange(h)[None, :] / h)
+    factors = np.einsum("jy,ix,yxc->jic", cos_y, cos_x, rgb) * (2.0 / (w * h))
+    factors[0, 0] /= 2.0
+    factors = factors.reshape(-1, 3)
+    dc, ac = factors[0], factors[1:]
+
+    parts = [_base83((x_components - 1) + (y_components - 1) * 9, 1)]
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        parts.append(_base83(quantised_max, 1))
+    else:
+        max_value = 1.0
+        parts.append(_base83(0, 1))
+
+    r, g, b = (_linear_to_srgb(c) for c in dc)
+    parts.append(_base83((r << 16) + (g << 8) + b, 4))
+
+    scaled = ac / max_value
+    q = np.clip(np.floor(np.sign(scaled) * np.abs(scaled) ** 0.5 * 9 + 9.5), 0, 18).astype(int)
+    parts.extend(_base83(int(qr * 361 + qg * 19 + qb), 2) for qr, qg, qb in q)
+    return "".join(parts)
+
+
+def encode_file(path, x_components: int = 4, y_components: int = 3) -> str:
+    with Image.open(path) as im:
+        # keep the component grid roughly square in image space
+        if im.height > im.width:
+            x_components, y_components = y_components, x_components
+        return encode(im, x_components, y_components)
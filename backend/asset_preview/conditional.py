@@ -0,0 +1,65 @@
+# backend/asset_preview/conditional.py
+"""
+Validators for conditional GET on the asset list / detail endpoints, so
+polling clients get 304 Not Modified without the query or serializer running.
+
+    list    W/"c<catalog version>-<query digest>"   Last-Modified = last catalog write
+    detail  W/"a<id>-<row digest>"                  Last-Modified = row modified_at
+
+Both digests include the signed-URL epoch: responses carry signed links, so
+they change when new links are minted even if no row did.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from asset_metadata.models import AssetMetadata, CatalogVersion
+from upload_download.signed_urls import url_epoch
+
+
+def _digest(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+def collection_validators(request):
+    version, changed_at = CatalogVersion.state()
+    query = sorted((k, sorted(v)) for k, v in request.query_params.lists())
+    etag = f'W/"c{version}-{_digest(query, request.accepted_media_type, url_epoch())}"'
+    return etag, changed_at
+
+
+def detail_validators(request, pk):
+    """
+    (etag, last_modified) from the row's modified_at, or (None, None) if it
+    does not exist (the normal 404 path handles that). Every write to a
+    serialized column moves modified_at, including save(update_fields=...)
+    (see AssetMetadata.save) and the queryset updates of workers and
+    version bookkeeping.
+    """
+    try:
+        row = AssetMetadata.objects.filter(pk=pk).values_list("modified_at").first()
+    except (TypeError, ValueError):   # not an id; let retrieve() 404
+        return None, None
+    if row is None:
+        return None, None
+    etag = f'W/"a{pk}-{_digest(row, request.accepted_media_type, url_epoch())}"'
+    return etag, row[0]
+
+
+def not_modified(request, etag, last_modified):
+    """
+    The 304 response if the client's copy is current, else None.
+    """
+    ts = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=ts)
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response["ETag"] = quote_etag(etag)
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # revalidate every time (no heuristic freshness from Last-Modified)
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,127 @@
+# backend/asset_preview/lod.py
+"""
+Lighter GLB variants of a model for progressive loading in the viewer:
+
+    previews/<id>/<key>/lod_25.glb    ~25% of the triangles, textures <= 1024 px
+    previews/<id>/<key>/lod_5.glb     ~5%  of the triangles, textures <= 256 px
+    previews/<id>/<key>/lods.json     [{"ratio", "faces", "file"}], 100% = the original
+
+Every mesh of the scene is decimated on its own with vertex clustering
+(mesh.cluster_decimate; UVs take part in the cluster key so texture seams
+hold), so node transforms, materials and the scene graph are kept as they
+are. Textures are downscaled once per material and re-embedded by the GLB
+exporter. Made by the "previews" job next to the rendered thumbnails.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+from .mesh import cluster_decimate
+
+# (ratio of the original face count, file name, max texture edge in px)
+LEVELS = [
+    (0.25, "lod_25.glb", 1024),
+    (0.05, "lod_5.glb", 256),
+]
+MIN_FACES = 20_000       # below this the original is light enough on its own
+MIN_LEVEL_FACES = 500    # don't go coarser than this per scene
+MANIFEST = "lods.json"
+
+TEXTURE_ATTRS = ("baseColorTexture", "metallicRoughnessTexture", "normalTexture",
+                 "occlusionTexture", "emissiveTexture", "image")
+
+
+def _face_count(scene) -> int:
+    return sum(len(g.faces) for g in scene.geometry.values() if hasattr(g, "faces"))
+
+
+def _downscale_material(mat, max_px: int, cache: Dict[int, object]):
+    if mat is None:
+        return None
+    if id(mat) in cache:  # materials are shared between meshes; scale each once
+        return cache[id(mat)]
+    small = copy.copy(mat)
+    for attr in TEXTURE_ATTRS:
+        im = getattr(small, attr, None)
+        if isinstance(im, Image.Image) and max(im.size) > max_px:
+            im = im.copy()
+            im.thumbnail((max_px, max_px), Image.LANCZOS)
+            setattr(small, attr, im)
+    cache[id(mat)] = small
+    return small
+
+
+def _decimate_geometry(g, ratio: float, max_px: int, materials: Dict[int, object]):
+    import trimesh
+    from trimesh.visual import ColorVisuals, TextureVisuals
+
+    if not isinstance(g, trimesh.Trimesh) or len(g.faces) == 0:
+        return g
+    vis = g.visual
+    uv = vertex_colors = face_colors = None
+    if vis.kind == "texture" and getattr(vis, "uv", None) is not None:
+        uv = np.asarray(vis.uv, dtype=np.float64)
+    elif vis.kind == "vertex":
+        vertex_colors = np.asarray(vis.vertex_colors, dtype=np.float64)
+    elif vis.kind == "face":
+        face_colors = np.asarray(vis.face_colors)
+
+    target = max(int(len(g.faces) * ratio), 4)
+    d = cluster_decimate(np.asarray(g.vertices, dtype=np.float64), np.asarray(g.faces, dtype=np.int64),
+                         target, face_colors=face_colors, uv=uv, vertex_colors=vertex_colors)
+
+    if uv is not None:
+        visual = TextureVisuals(uv=d["uv"], material=_downscale_material(vis.material, max_px, materials))
+    elif vertex_colors is not None:
+        visual = ColorVisuals(vertex_colors=np.clip(np.rint(d["vertex_colors"]), 0, 255).astype(np.uint8))
+    elif face_colors is not None:
+        visual = ColorVisuals(face_colors=d["face_colors"])
+    else:
+        material = getattr(vis, "material", None)
+        visual = TextureVisuals(material=_downscale_material(material, max_px, materials)) if material else None
+    return trimesh.Trimesh(vertices=d["vertices"], faces=d["faces"], visual=visual, process=False)
+
+
+def build_lods(src: Path, out_dir: Path) -> List[dict]:
+    """
+    Write the LOD files and lods.json into out_dir; returns the manifest.
+    The manifest is written last, so its presence means the set is complete.
+    """
+    import trimesh
+
+    scene = trimesh.load(str(src), force="scene")
+    total = _face_count(scene)
+    manifest = [{"ratio": 1.0, "faces": total, "file": None}]
+
+    if total >= MIN_FACES:
+        for ratio, name, max_px in LEVELS:
+            if total * ratio < MIN_LEVEL_FACES:
+                break
+            level = scene.copy()
+            materials: Dict[int, object] = {}
+            for geom_name, g in list(level.geometry.items()):
+                level.geometry[geom_name] = _decimate_geometry(g, ratio, max_px, materials)
+            data = level.export(file_type="glb")
+            tmp = out_dir / f".{name}.{os.getpid()}.tmp"
+            tmp.write_bytes(data)
+            os.replace(tmp, out_dir / name)
+            manifest.append({"ratio": ratio, "faces": _face_count(level), "file": name})
+
+    tmp = out_dir / f".{MANIFEST}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, out_dir / MANIFEST)
+    return manifest
+
+
+def read_manifest(out_dir: Path) -> List[dict]:
+    try:
+        return json.loads((out_dir / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
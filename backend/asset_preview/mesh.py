@@ -0,0 +1,128 @@
+# backend/asset_preview/mesh.py
+"""
+Triangle soup helpers shared by the thumbnail renderer (render.py) and the
+LOD builder (lod.py): loading a GLB as flat (vertices, faces, face_colors)
+arrays and vertex-clustering decimation, all vectorised with numpy.
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+DEFAULT_COLOR = np.array([180, 180, 180], dtype=np.uint8)
+
+
+def load_mesh(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    All triangles of a glTF/GLB scene in world space.
+    Returns vertices (V,3) float64, faces (F,3) int64, face_colors (F,3) uint8.
+    Texture colours are sampled per vertex (uv lookup) and averaged per face.
+    """
+    import trimesh
+
+    scene = trimesh.load(path, force="scene")
+    verts, faces, colors = [], [], []
+    offset = 0
+    for g in scene.dump():  # copies with node transforms applied
+        if not isinstance(g, trimesh.Trimesh) or len(g.faces) == 0:
+            continue
+        verts.append(np.asarray(g.vertices, dtype=np.float64))
+        faces.append(np.asarray(g.faces, dtype=np.int64) + offset)
+        colors.append(_face_colors(g))
+        offset += len(g.vertices)
+    if not faces:
+        raise ValueError("no triangles in scene")
+    return np.concatenate(verts), np.concatenate(faces), np.concatenate(colors)
+
+
+def _face_colors(g) -> np.ndarray:
+    try:
+        vis = g.visual
+        if vis.kind == "texture":
+            vis = vis.to_color()
+        if vis.kind == "face":
+            return np.asarray(vis.face_colors)[:, :3].astype(np.uint8)
+        vc = np.asarray(vis.vertex_colors)[:, :3].astype(np.float32)
+        return vc[g.faces].mean(axis=1).astype(np.uint8)
+    except Exception:
+        return np.tile(DEFAULT_COLOR, (len(g.faces), 1))
+
+
+def cluster_decimate(vertices, faces, target_faces, face_colors=None, uv=None, vertex_colors=None):
+    """
+    Vertex clustering: snap vertices to a uniform grid over the bounding box,
+    merge each occupied cell into its mean vertex, and drop faces that
+    collapse. The grid is refined / coarsened until the face count is at or
+    under target_faces.
+
+    uv (V,2) takes part in the cell key, so texture seams are not merged
+    across, and is averaged like positions; vertex_colors (V,C) are averaged.
+    Returns a dict: vertices, faces, face_colors, uv, vertex_colors, kept
+    (indices of the surviving input faces).
+    """
+    n = len(faces)
+    if n <= target_faces:
+        return {"vertices": vertices, "faces": faces, "face_colors": face_colors,
+                "uv": uv, "vertex_colors": vertex_colors, "kept": np.arange(n)}
+
+    lo = vertices.min(axis=0)
+    span = np.maximum(vertices.max(axis=0) - lo, 1e-12)
+
+    # faces ~ 2 * occupied surface cells ~ 2 * k * res^2 -> start near the answer
+    res = max(2, int(np.sqrt(target_faces / 2.0)))
+    best = None
+    for _ in range(12):
+        result = _cluster(vertices, faces, lo, span, res, uv, vertex_colors)
+        if len(result["faces"]) <= target_faces:
+            best = result
+            if len(result["faces"]) > 0.8 * target_faces:
+                break
+            res = int(res * 1.3) + 1
+        else:
+            if best is not None:
+                break
+            res = max(2, int(res / 1.4))
+    if best is None:
+        best = _cluster(vertices, faces, lo, span, 2, uv, vertex_colors)
+
+    best["face_colors"] = face_colors[best["kept"]] if face_colors is not None else None
+    return best
+
+
+def _cluster(vertices, faces, lo, span, res, uv=None, vertex_colors=None):
+    cells = np.minimum(((vertices - lo) / span * res).astype(np.int64), res - 1)
+    key = (cells[:, 0] * (res + 1) + cells[:, 1]) * (res + 1) + cells[:, 2]
+    if uv is not None:
+        uv_cells = np.floor(uv * res).astype(np.int64)
+        key = np.stack([key, uv_cells[:, 0], uv_cells[:, 1]], axis=1)
+        uniq, remap = np.unique(key, axis=0, return_inverse=True)
+    else:
+        uniq, remap = np.unique(key, return_inverse=True)
+    remap = remap.ravel()
+    m = len(uniq)
+
+    counts = np.bincount(remap, minlength=m)
+
+    def mean(values):
+        values = np.asarray(values, dtype=np.float64)
+        return np.stack(
+            [np.bincount(remap, weights=values[:, i], minlength=m) for i in range(values.shape[1])], axis=1
+        ) / counts[:, None]
+
+    f = remap[faces]
+    ok = (f[:, 0] != f[:, 1]) & (f[:, 1] != f[:, 2]) & (f[:, 0] != f[:, 2])
+    kept = np.nonzero(ok)[0]
+    f = f[kept]
+
+    # drop duplicates (same three cells, any winding start)
+    canon = np.sort(f, axis=1)
+    _, first = np.unique(canon, axis=0, return_index=True)
+    first.sort()
+    return {
+        "vertices": mean(vertices),
+        "faces": f[first],
+        "uv": mean(uv) if uv is not None else None,
+        "vertex_colors": mean(vertex_colors) if vertex_colors is not None else None,
+        "kept": kept[first],
+    }
@@ -0,0 +1,54 @@
+# backend/asset_preview/pagination.py
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class VersionCursorPagination(CursorPagination):
+    """
+    Version history of one asset, newest first. Keyset on version, which the
+    (group, -version) index serves directly: every page is one index range
+    scan, however far back it goes.
+    """
+    ordering = ("-version",)
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class SearchPagination(BasePagination):
+    """
+    Numbered pages for ranked search results (rank is computed, so there is
+    no keyset to resume from). One extra row tells whether a next page
+    exists, so there is no COUNT(*); MAX_PAGE bounds the OFFSET.
+    """
+    page_size = 20
+    max_page_size = 100
+    MAX_PAGE = 50
+
+    def _int_param(self, request, name, default, upper):
+        try:
+            value = int(request.query_params.get(name, default))
+        except (TypeError, ValueError):
+            value = default
+        return min(max(value, 1), upper)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = self._int_param(request, "page", 1, self.MAX_PAGE)
+        size = self._int_param(request, "page_size", self.page_size, self.max_page_size)
+        offset = (self.page - 1) * size
+        rows = list(queryset[offset:offset + size + 1])
+        self.has_next = len(rows) > size and self.page < self.MAX_PAGE
+        return rows[:size]
+
+    def _link(self, page):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, "page") if page == 1 else replace_query_param(url, "page", page)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self._link(self.page + 1) if self.has_next else None,
+            "previous": self._link(self.page - 1) if self.page > 1 else None,
+            "results": data,
+        })
@@ -0,0 +1,144 @@
+# backend/asset_preview/render.py
+"""
+Pure-CPU thumbnail renderer for 3D models (no GPU, no OpenGL).
+
+A fixed three-quarter camera looks at the model's bounding box through an
+orthographic projection. Faces get flat Lambert shading from a key light plus
+ambient, and a numpy z-buffer rasteriser draws them: triangles are grouped by
+screen-space bounding-box size, each group is expanded into candidate pixels in
+one array op, barycentric tests keep the covered ones, and the nearest depth
+per pixel wins. Very dense meshes are decimated first (mesh.cluster_decimate)
+and the whole render is bounded by a time budget.
+"""
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from .mesh import cluster_decimate, load_mesh
+
+MAX_RENDER_FACES = 250_000
+BACKGROUND = (240, 240, 240)
+CHUNK_ELEMENTS = 4_000_000  # candidate pixels evaluated per array op (bounds memory)
+
+# yaw 35 deg, pitch 25 deg: the usual "product shot" angle
+_YAW, _PITCH = np.radians(35.0), np.radians(25.0)
+LIGHT_DIR = np.array([0.4, 0.6, 0.7]) / np.linalg.norm([0.4, 0.6, 0.7])
+AMBIENT = 0.35
+
+
+class RenderTimeout(RuntimeError):
+    pass
+
+
+def _view_matrix():
+    cy, sy = np.cos(_YAW), np.sin(_YAW)
+    cp, sp = np.cos(_PITCH), np.sin(_PITCH)
+    yaw = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    pitch = np.array([[1, 0, 0], [0, cp, -sp], [0, sp, cp]])
+    return pitch @ yaw
+
+
+def render(vertices, faces, face_colors, size=1024, deadline: Optional[float] = None) -> Image.Image:
+    """
+    Rasterise a triangle mesh to a size x size RGB image.
+    Raises RenderTimeout once time.monotonic() passes `deadline`.
+    """
+    # camera space: x right, y up, z towards the viewer (bigger z = closer)
+    v = (vertices - (vertices.min(axis=0) + vertices.max(axis=0)) / 2) @ _view_matrix().T
+    extent = max(np.abs(v[:, :2]).max(), 1e-12)
+    scale = (size / 2) * 0.9 / extent
+    px = np.empty_like(v)
+    px[:, 0] = size / 2 + v[:, 0] * scale
+    px[:, 1] = size / 2 - v[:, 1] * scale
+    px[:, 2] = v[:, 2]
+
+    # flat shading from camera-space face normals (two-sided)
+    tri = v[faces]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    keep = lengths > 0
+    faces, normals, face_colors = faces[keep], normals[keep] / lengths[keep, None], face_colors[keep]
+    shade = AMBIENT + (1 - AMBIENT) * np.abs(normals @ LIGHT_DIR)
+    colors = np.clip(face_colors[:, :3] * shade[:, None], 0, 255).astype(np.uint8)
+
+    zbuf = np.full(size * size, -np.inf)
+    cbuf = np.empty((size * size, 3), dtype=np.uint8)
+    cbuf[:] = BACKGROUND
+
+    t = px[faces]  # (F, 3, 3)
+    x0 = np.floor(t[:, :, 0].min(axis=1)).astype(np.int64)
+    y0 = np.floor(t[:, :, 1].min(axis=1)).astype(np.int64)
+    span = np.maximum(
+        np.ceil(t[:, :, 0].max(axis=1)).astype(np.int64) - x0,
+        np.ceil(t[:, :, 1].max(axis=1)).astype(np.int64) - y0,
+    ) + 1
+    # bucket by power-of-two window so each group is one dense (n, k*k) array
+    bucket = np.ceil(np.log2(np.maximum(span, 1))).astype(np.int64)
+
+    for b in np.unique(bucket):
+        k = int(2 ** b)
+        ids = np.nonzero(bucket == b)[0]
+        per_chunk = max(1, CHUNK_ELEMENTS // (k * k))
+        for start in range(0, len(ids), per_chunk):
+            if deadline is not None and time.monotonic() > deadline:
+                raise RenderTimeout("render budget exceeded")
+            _raster_chunk(ids[start:start + per_chunk], k, t, x0, y0, colors, zbuf, cbuf, size)
+
+    return Image.fromarray(cbuf.reshape(size, size, 3), "RGB")
+
+
+def _raster_chunk(ids, k, t, x0, y0, colors, zbuf, cbuf, size):
+    oy, ox = np.divmod(np.arange(k * k), k)
+    xs = x0[ids, None] + ox[None, :]          # (n, k*k) candidate pixels
+    ys = y0[ids, None] + oy[None, :]
+    cx, cy = xs + 0.5, ys + 0.5               # sample at pixel centres
+
+    a, b, c = t[ids, 0], t[ids, 1], t[ids, 2]
+    area = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    ok_area = np.abs(area) > 1e-12
+    inv = np.where(ok_area, 1.0 / np.where(ok_area, area, 1.0), 0.0)[:, None]
+    w0 = ((b[:, 0, None] - cx) * (c[:, 1, None] - cy) - (b[:, 1, None] - cy) * (c[:, 0, None] - cx)) * inv
+    w1 = ((c[:, 0, None] - cx) * (a[:, 1, None] - cy) - (c[:, 1, None] - cy) * (a[:, 0, None] - cx)) * inv
+    w2 = 1.0 - w0 - w1
+
+    inside = (w0 >= 0) & (w1 >= 0) & (w2 >= 0) & ok_area[:, None]
+    inside &= (xs >= 0) & (xs < size) & (ys >= 0) & (ys < size)
+    if not inside.any():
+        return
+    depth = w0 * a[:, 2, None] + w1 * b[:, 2, None] + w2 * c[:, 2, None]
+
+    rows, _ = np.nonzero(inside)
+    pix = (ys * size + xs)[inside]
+    depth = depth[inside]
+    face = ids[rows]
+
+    # nearest fragment per pixel within the chunk, then against the z-buffer
+    order = np.lexsort((-depth, pix))
+    pix, depth, face = pix[order], depth[order], face[order]
+    first = np.ones(len(pix), dtype=bool)
+    first[1:] = pix[1:] != pix[:-1]
+    pix, depth, face = pix[first], depth[first], face[first]
+
+    closer = depth > zbuf[pix]
+    pix, depth, face = pix[closer], depth[closer], face[closer]
+    zbuf[pix] = depth
+    cbuf[pix] = colors[face]
+
+
+def render_thumbnail(path: str, size: int = 1024, budget_seconds: float = 20.0,
+                     max_faces: int = MAX_RENDER_FACES) -> Image.Image:
+    """
+    Load, decimate to max_faces if needed, and render a model file within budget_seconds.
+    """
+    deadline = time.monotonic() + budget_seconds
+    vertices, faces, face_colors = load_mesh(path)
+    if len(faces) > max_faces:
+        d = cluster_decimate(vertices, faces, max_faces, face_colors)
+        vertices, faces, face_colors = d["vertices"], d["faces"], d["face_colors"]
+    if time.monotonic() > deadline:
+        raise RenderTimeout("budget spent loading / decimating")
+    return render(vertices, faces, face_colors, size=size, deadline=deadline)
@@ -1,6 +1,17 @@
 # backend/asset_preview/serializers.py
 from rest_framework import serializers
 from asset_metadata.models import AssetMetadata
+from upload_download.signed_urls import asset_download_url, media_url
+
+
+def normalize_tags(raw):
+    # list as stored, or a legacy "a, b; c" string
+    if raw is None:
+        return []
+    if isinstance(raw, (list, tuple)):
+        return list(raw)
+    parts = [p.strip() for p in str(raw).replace(";", ",").split(",")]
+    return [p for p in parts if p]
 
 
 class AssetMetadataLiteSerializer(serializers.ModelSerializer):
@@ -10,13 +21,13 @@ class AssetMetadataLiteSerializer(serializers.ModelSerializer):
     )
 
     def get_tags(self, obj):
-        raw = getattr(obj, "tags", None)
-        if raw is None:
-            return []
-        if isinstance(raw, (list, tuple)):
-            return list(raw)
-        parts = [p.strip() for p in str(raw).replace(";", ",").split(",")]
-        return [p for p in parts if p]
+        return normalize_tags(getattr(obj, "tags", None))
+
+    download_url = serializers.SerializerMethodField()
+
+    def get_download_url(self, obj):
+        # signed, expiring link served without a DB lookup
+        return asset_download_url(obj)
 
     class Meta:
         model = AssetMetadata
@@ -29,6 +40,8 @@ class AssetMetadataLiteSerializer(serializers.ModelSerializer):
             "description",
             "tags",
             "no_of_versions",
+            "group",
+            "version",
             "created_at",
             "modified_at",
             "resolution",
@@ -36,4 +49,43 @@ class AssetMetadataLiteSerializer(serializers.ModelSerializer):
             "duration",
             "modified_by_id",
             "modified_by_username",
+            "processing_status",
+            "placeholder",
+            "download_url",
+        ]
+
+
+class AssetVersionSerializer(serializers.ModelSerializer):
+    """
+    One row of an asset's version history; built from the DB row alone.
+    """
+    size = serializers.IntegerField(read_only=True)   # bytes, from Blob (annotated)
+    modified_by_username = serializers.CharField(
+        source="modified_by.username", read_only=True, default=None
+    )
+    download_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+
+    def get_download_url(self, obj):
+        return asset_download_url(obj)
+
+    def get_preview_url(self, obj):
+        return media_url(obj.file_location)
+
+    class Meta:
+        model = AssetMetadata
+        fields = [
+            "id",
+            "version",
+            "file_name",
+            "file_type",
+            "file_size",
+            "size",
+            "content_hash",
+            "created_at",
+            "modified_by_id",
+            "modified_by_username",
+            "processing_status",
+            "download_url",
+            "preview_url",
         ]
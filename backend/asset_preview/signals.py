@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from asset_metadata.models import AssetMetadata
+from .utils import invalidate_previews
+
+@receiver(post_delete)
+def drop_previews_on_delete(sender, instance, **kwargs):
+    # no sender filter: admin deletes go through the proxy models too
+    if isinstance(instance, AssetMetadata):
+        invalidate_previews(instance)
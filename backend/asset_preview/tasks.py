@@ -0,0 +1,18 @@
+# backend/asset_preview/tasks.py
+# Background job handlers (run by manage.py run_asset_workers)
+from django.db import transaction
+from django.utils import timezone
+
+from asset_metadata import jobs
+from asset_metadata.models import AssetMetadata, CatalogVersion
+from .utils import build_previews, compute_placeholder
+
+
+@jobs.register("previews")
+def previews(asset):
+    result = build_previews(asset, generate_slow=True)
+    placeholder = compute_placeholder(result)
+    if placeholder is not None and placeholder != asset.placeholder:
+        # modified_at moves too: placeholder is in list / export rows
+        AssetMetadata.objects.filter(pk=asset.pk).update(placeholder=placeholder, modified_at=timezone.now())
+        transaction.on_commit(CatalogVersion.bump)
@@ -0,0 +1,432 @@
+# backend/asset_preview/tests.py
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone as django_timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+
+from asset_metadata.models import AssetGroup, AssetJob, AssetMetadata
+from . import blurhash, fast_list, lod, mesh, render, utils
+from .serializers import AssetMetadataLiteSerializer
+
+
+class PreviewCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.out = self.root / "previews" / "7" / "abc-1"
+        self.calls = []
+
+    def generate(self, out_dir):
+        self.calls.append(out_dir)
+        time.sleep(0.05)   # long enough for the other threads to pile up on the lock
+        (out_dir / "thumb.jpg").write_bytes(b"x")
+
+    def test_generated_once_across_threads(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(utils.cached_derivatives(self.out, ["thumb.jpg"], self.generate)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [True] * 8)
+        self.assertEqual(len(self.calls), 1)
+        self.assertFalse(self.out.with_name("abc-1.lock").exists())
+
+    def test_hit_does_not_regenerate(self):
+        utils.cached_derivatives(self.out, ["thumb.jpg"], self.generate)
+        self.assertTrue(utils.cached_derivatives(self.out, ["thumb.jpg"], self.generate))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_new_key_prunes_old_ones(self):
+        utils.cached_derivatives(self.out, ["thumb.jpg"], self.generate)
+        newer = self.out.with_name("def-2")
+        utils.cached_derivatives(newer, ["thumb.jpg"], self.generate)
+        self.assertEqual(sorted(p.name for p in newer.parent.iterdir()), ["def-2"])
+
+    def test_stale_lock_is_taken_over(self):
+        lock = self.out.with_name("abc-1.lock")
+        lock.parent.mkdir(parents=True)
+        lock.write_text("12345")
+        old = time.time() - utils.LOCK_STALE_SECONDS - 10
+        os.utime(lock, (old, old))
+        self.assertTrue(utils.cached_derivatives(self.out, ["thumb.jpg"], self.generate))
+
+    def test_failed_generation_releases_lock(self):
+        def boom(out_dir):
+            raise RuntimeError("decoder crashed")
+
+        with self.assertRaises(RuntimeError):
+            utils.cached_derivatives(self.out, ["thumb.jpg"], boom)
+        self.assertFalse(self.out.with_name("abc-1.lock").exists())
+        self.assertTrue(utils.cached_derivatives(self.out, ["thumb.jpg"], self.generate))
+
+    def test_cache_key_follows_content(self):
+        src = self.root / "a.png"
+        src.write_bytes(b"png")
+        a = SimpleNamespace(pk=1, content_hash="1" * 64)
+        b = SimpleNamespace(pk=1, content_hash="2" * 64)
+        self.assertNotEqual(utils.preview_dir(a, src, self.root), utils.preview_dir(b, src, self.root))
+        self.assertEqual(utils.preview_dir(a, src, self.root).parent, self.root / "previews" / "1")
+
+
+class RenderTests(SimpleTestCase):
+    def cube(self):
+        import trimesh
+
+        box = trimesh.creation.box(extents=(1.0, 1.0, 1.0))
+        faces = np.asarray(box.faces, dtype=np.int64)
+        return np.asarray(box.vertices, dtype=np.float64), faces, np.tile([200, 60, 60], (len(faces), 1))
+
+    def test_cube_is_drawn_centred_on_background(self):
+        img = render.render(*self.cube(), size=64)
+        self.assertEqual(img.size, (64, 64))
+        px = np.asarray(img)
+        self.assertEqual(tuple(px[0, 0]), render.BACKGROUND)
+        self.assertEqual(tuple(px[63, 63]), render.BACKGROUND)
+        self.assertNotEqual(tuple(px[32, 32]), render.BACKGROUND)
+        # three visible sides, each flat-shaded differently
+        drawn = {tuple(c) for c in px.reshape(-1, 3)} - {render.BACKGROUND}
+        self.assertGreaterEqual(len(drawn), 3)
+
+    def test_fills_about_ninety_percent_of_the_frame(self):
+        px = np.asarray(render.render(*self.cube(), size=100))
+        cols = np.nonzero((px != render.BACKGROUND).any(axis=2).any(axis=0))[0]
+        rows = np.nonzero((px != render.BACKGROUND).any(axis=2).any(axis=1))[0]
+        self.assertAlmostEqual(max(np.ptp(cols), np.ptp(rows)), 90, delta=2)
+
+    def test_degenerate_faces_are_skipped(self):
+        vertices = np.array([[0, 0, 0], [1, 0, 0], [2, 0, 0]], dtype=np.float64)
+        img = render.render(vertices, np.array([[0, 1, 2]]), np.array([[255, 0, 0]]), size=16)
+        self.assertEqual({tuple(c) for c in np.asarray(img).reshape(-1, 3)}, {render.BACKGROUND})
+
+    def test_past_deadline_raises(self):
+        with self.assertRaises(render.RenderTimeout):
+            render.render(*self.cube(), size=32, deadline=time.monotonic() - 1)
+
+    def test_render_thumbnail_decimates_dense_models(self):
+        import trimesh
+
+        path = Path(tempfile.mkdtemp()) / "sphere.glb"
+        self.addCleanup(shutil.rmtree, path.parent, ignore_errors=True)
+        trimesh.creation.icosphere(subdivisions=4).export(path)  # 5120 faces
+        with mock.patch.object(render, "cluster_decimate", wraps=render.cluster_decimate) as decimate:
+            img = render.render_thumbnail(str(path), size=48, max_faces=1000)
+        self.assertEqual(decimate.call_args.args[2], 1000)
+        self.assertEqual(img.size, (48, 48))
+
+
+
+class ClusterDecimateTests(SimpleTestCase):
+    def sphere(self):
+        import trimesh
+
+        s = trimesh.creation.icosphere(subdivisions=5)  # 20480 faces
+        return np.asarray(s.vertices), np.asarray(s.faces, dtype=np.int64)
+
+    def test_under_target_is_returned_as_is(self):
+        vertices, faces = self.sphere()
+        out = mesh.cluster_decimate(vertices, faces, len(faces))
+        self.assertIs(out["faces"], faces)
+        self.assertEqual(out["kept"].tolist(), list(range(len(faces))))
+
+    def test_reduces_to_target(self):
+        vertices, faces = self.sphere()
+        colors = np.arange(len(faces) * 3, dtype=np.int64).reshape(-1, 3)
+        out = mesh.cluster_decimate(vertices, faces, 2000, colors)
+        self.assertLessEqual(len(out["faces"]), 2000)
+        self.assertGreater(len(out["faces"]), 500)
+        self.assertLess(out["faces"].max(), len(out["vertices"]))
+        # surviving faces keep their own colours
+        self.assertEqual(out["face_colors"].tolist(), colors[out["kept"]].tolist())
+        # merged vertices still lie near the unit sphere
+        radii = np.linalg.norm(out["vertices"], axis=1)
+        self.assertTrue(np.all(radii > 0.8) and np.all(radii <= 1.0 + 1e-9))
+
+    def test_uv_and_vertex_colors_are_averaged(self):
+        vertices, faces = self.sphere()
+        uv = np.zeros((len(vertices), 2))
+        vc = np.full((len(vertices), 4), 128.0)
+        out = mesh.cluster_decimate(vertices, faces, 2000, uv=uv, vertex_colors=vc)
+        self.assertEqual(out["uv"].shape, (len(out["vertices"]), 2))
+        self.assertTrue(np.allclose(out["vertex_colors"], 128.0))
+
+
+class LodTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def export(self, m, name="model.glb"):
+        path = self.dir / name
+        m.export(path)
+        return path
+
+    def textured_sphere(self, subdivisions):
+        import trimesh
+        from PIL import Image
+        from trimesh.visual import TextureVisuals
+
+        s = trimesh.creation.icosphere(subdivisions=subdivisions)
+        uv = (s.vertices[:, :2] + 1) / 2
+        s.visual = TextureVisuals(uv=uv, image=Image.new("RGB", (1200, 600), (10, 120, 200)))
+        return s
+
+    def test_light_model_gets_only_the_original(self):
+        import trimesh
+
+        src = self.export(trimesh.creation.box())
+        manifest = lod.build_lods(src, self.dir)
+        self.assertEqual(manifest, [{"ratio": 1.0, "faces": 12, "file": None}])
+        self.assertEqual(lod.read_manifest(self.dir), manifest)
+        self.assertFalse((self.dir / "lod_25.glb").exists())
+
+    def test_dense_model_gets_both_levels(self):
+        import trimesh
+
+        src = self.export(self.textured_sphere(subdivisions=6))  # 81920 faces
+        manifest = lod.build_lods(src, self.dir)
+        self.assertEqual([m["file"] for m in manifest], [None, "lod_25.glb", "lod_5.glb"])
+        total = manifest[0]["faces"]
+        self.assertEqual(total, 81920)
+        for entry, (ratio, name, max_px) in zip(manifest[1:], lod.LEVELS):
+            self.assertLessEqual(entry["faces"], total * ratio)
+            level = trimesh.load(self.dir / name, force="scene")
+            self.assertEqual(sum(len(g.faces) for g in level.geometry.values()), entry["faces"])
+            image = next(iter(level.geometry.values())).visual.material.baseColorTexture
+            self.assertLessEqual(max(image.size), max_px)
+        self.assertEqual(lod.read_manifest(self.dir), manifest)
+
+    def test_missing_or_broken_manifest_reads_empty(self):
+        self.assertEqual(lod.read_manifest(self.dir), [])
+        (self.dir / lod.MANIFEST).write_text("{not json", encoding="utf-8")
+        self.assertEqual(lod.read_manifest(self.dir), [])
+
+
+class BlurHashTests(SimpleTestCase):
+    # expected strings from the reference C encoder (blurhash-python) on the same pixels
+    def gradient(self, w, h):
+        y, x = np.mgrid[0:h, 0:w]
+        rgb = np.stack([x * 255 // (w - 1), y * 255 // (h - 1), (x + y) * 255 // (w + h - 2)], axis=-1)
+        return Image.fromarray(rgb.astype(np.uint8), "RGB")
+
+    def checker(self, w, h):
+        y, x = np.mgrid[0:h, 0:w]
+        on = ((x // 4 + y // 4) % 2).astype(bool)
+        return Image.fromarray(np.where(on[..., None], [230, 40, 90], [20, 160, 220]).astype(np.uint8), "RGB")
+
+    def test_matches_reference(self):
+        self.assertEqual(blurhash.encode(self.gradient(32, 24), 4, 3), "L$HewS2jwzX5l?WGjue;gKfkfQfj")
+        self.assertEqual(blurhash.encode(self.checker(20, 40), 3, 4), "T6JZG{}_fQt.j[GGfQfQfQpej[GG")
+        self.assertEqual(blurhash.encode(Image.new("RGB", (8, 8), (200, 100, 50)), 1, 1), "00M|T9")
+
+    def test_matches_reference_with_all_components(self):
+        self.assertEqual(
+            blurhash.encode(self.gradient(48, 48), 9, 9),
+            "|$HetK2k$7SxjskBa{oeWol?a%jtf7fRf6fRf6fRgefjfQfjfQfjfQfjfQnQa|jtfQfQfQfQfQfQfifRfQfQfQfQfQfQfQ"
+            "oLa{jtfQfQfQfQfQfQf6fRfQfQfQfQfQfQfQoea{jtfQfQfQfQfQfQe:fRfQfQfQfQfQfQfQ",
+        )
+
+    def test_large_images_hash_their_downscaled_copy(self):
+        big = self.gradient(256, 128)
+        small = big.copy()
+        small.thumbnail((blurhash.SAMPLE_PX, blurhash.SAMPLE_PX))
+        self.assertEqual(blurhash.encode(big), blurhash.encode(small))
+
+    def test_encode_file_turns_the_grid_for_portrait_images(self):
+        path = Path(tempfile.mkdtemp()) / "portrait.png"
+        self.addCleanup(shutil.rmtree, path.parent, ignore_errors=True)
+        self.checker(20, 40).save(path)
+        # default 4 x 3 becomes 3 x 4
+        self.assertEqual(blurhash.encode_file(path), "T6JZG{}_fQt.j[GGfQfQfQpej[GG")
+
+
+class FastListTests(SimpleTestCase):
+    def asset(self, **kwargs):
+        values = dict(
+            id=7, file_name="stuhl ü.glb", file_type="model/gltf-binary", file_size=12.5,
+            file_location="model/3/stuhl ü.glb", content_hash="ab" * 32, description="line\u2028break\u2029",
+            tags="a, b; c", no_of_versions=3, group_id=2, version=3, resolution="1x2x3", polygon_count=12,
+            duration=timedelta(seconds=83, microseconds=5), modified_by=User(id=4, username="zoë"),
+            processing_status="ready", placeholder="LKO2?U%2Tw=w",
+            created_at=datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+            modified_at=datetime(2025, 2, 3, 4, 5, 6, tzinfo=dt_timezone.utc),
+        )
+        values.update(kwargs)
+        return AssetMetadata(**values)
+
+    def row(self, asset):
+        # what the values() query returns for the asset
+        row = {}
+        for c in fast_list.columns_for(fast_list.FIELDS):
+            if c == "modified_by__username":
+                row[c] = asset.modified_by.username if asset.modified_by_id else None
+            else:
+                row[c] = getattr(asset, c)
+        return row
+
+    def assertSameBytes(self, assets):
+        rows = [self.row(a) for a in assets]
+        page = [fast_list.format_row(r, fast_list.FIELDS) for r in rows]
+        expected = JSONRenderer().render({"results": AssetMetadataLiteSerializer(assets, many=True).data})
+        self.assertEqual(fast_list.dumps({"results": page}, page), expected)
+
+    def test_matches_serializer_output(self):
+        self.assertSameBytes([self.asset()])
+
+    def test_matches_serializer_with_empty_values(self):
+        bare = AssetMetadata(id=8, file_name="x.png", tags=[], no_of_versions=1,
+                             created_at=datetime(2025, 1, 1, tzinfo=dt_timezone.utc),
+                             modified_at=datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertSameBytes([bare])
+
+    def test_matches_serializer_without_orjson(self):
+        with mock.patch.object(fast_list, "_HAS_ORJSON", False):
+            self.assertSameBytes([self.asset()])
+
+    def test_floats_orjson_writes_differently_use_json(self):
+        for size in (1e-05, 1e16, 3.5e20):
+            self.assertFalse(fast_list._orjson_safe([{"file_size": size}]))
+            self.assertSameBytes([self.asset(file_size=size)])
+        self.assertTrue(fast_list._orjson_safe([{"file_size": 0.0}, {"file_size": 1e-4}, {"file_size": None}]))
+
+    def test_parse_fields(self):
+        self.assertEqual(fast_list.parse_fields(""), fast_list.FIELDS)
+        self.assertEqual(fast_list.parse_fields("tags, id,,file_name"), ["id", "file_name", "tags"])
+        with self.assertRaisesMessage(ValueError, "bogus, nope"):
+            fast_list.parse_fields("id,nope,bogus")
+
+    def test_columns_for_adds_source_and_cursor_columns(self):
+        self.assertEqual(
+            fast_list.columns_for(["id", "download_url", "modified_by_username"], ("-id",)),
+            ["id", "file_location", "file_name", "content_hash", "modified_by_id", "modified_by__username"],
+        )
+        self.assertEqual(fast_list.columns_for(["file_name"], ("-created_at",)), ["file_name", "created_at"])
+
+
+class PreviewJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.path = Path(self.media_root) / "model" / "1" / "m.glb"
+        self.path.parent.mkdir(parents=True)
+        self.path.write_bytes(b"glTF")
+        self.asset = AssetMetadata.objects.create(file_name="m.glb", file_location="model/1/m.glb", tags=[])
+        self.client.force_login(User.objects.create_user("viewer"))
+        pending = mock.patch("asset_preview.views.build_previews", return_value={"kind": "model", "pending": True})
+        pending.start()
+        self.addCleanup(pending.stop)
+
+    def poll(self):
+        self.assertEqual(self.client.get(f"/api/asset_preview/assets/{self.asset.pk}/preview/").status_code, 200)
+        return self.asset.jobs.filter(kind="previews").count()
+
+    def test_polling_queues_one_job_per_file(self):
+        self.assertEqual(self.poll(), 1)
+        self.assertEqual(self.poll(), 1)   # still queued
+
+        # it ran on this file and still left the stills missing: do not loop
+        self.asset.jobs.update(status=AssetJob.Status.DONE, modified_at=django_timezone.now())
+        self.assertEqual(self.poll(), 1)
+
+        # the file changed after that run
+        later = time.time() + 60
+        os.utime(self.path, (later, later))
+        self.assertEqual(self.poll(), 2)
+
+    def test_failed_job_is_not_retried_by_polling(self):
+        self.poll()
+        self.asset.jobs.update(status=AssetJob.Status.FAILED)
+        self.assertEqual(self.poll(), 1)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("viewer"))
+        self.group = AssetGroup.objects.create(name="a.png")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.v1 = AssetMetadata.objects.create(file_name="a.png", file_type="image/png", group=self.group, version=1, tags=[])
+            self.v2 = AssetMetadata.objects.create(file_name="a.png", file_type="image/png", group=self.group, version=2, tags=[])
+
+    def etag(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        return first["ETag"]
+
+    def test_list_etag_follows_version_bookkeeping(self):
+        for write in (self.group.refresh_version_count, self.group.repoint_latest):
+            before = self.etag("/api/preview/assets/?latest=1")
+            with self.captureOnCommitCallbacks(execute=True):
+                write()   # queryset updates: no post_save signal
+            self.assertNotEqual(self.etag("/api/preview/assets/?latest=1"), before, write.__name__)
+
+    def test_detail_etag_follows_every_column(self):
+        url = f"/api/preview/assets/{self.v1.pk}/"
+        before = self.etag(url)
+        self.v1.file_type = "image"   # what ensure_basic_info() stores
+        self.v1.save(update_fields=["file_type"])
+        self.assertNotEqual(self.etag(url), before)
+
+
+class AssetFilterTests(TestCase):
+    def setUp(self):
+        self.ids = {
+            name: AssetMetadata.objects.create(file_name=name, tags=tags, description=text).pk
+            for name, tags, text in (
+                ("red_chair_v2.glb", ["furniture", "approved"], "a red lounge chair"),
+                ("blue_chair.glb", ["furniture", "draft"], ""),
+                ("oak_table.glb", ["furniture", "approved", "wood"], "dining table"),
+                ("sky.png", [], "evening sky"),
+            )
+        }
+
+    def ids_for(self, url):
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200, r.content)
+        return {row["id"] for row in r.json()["results"]}
+
+    def names(self, *names):
+        return {self.ids[n] for n in names}
+
+    def test_tag_filters(self):
+        base = "/api/asset_preview/assets/?fields=id&"
+        self.assertEqual(self.ids_for(base + "tags=furniture,approved"), self.names("red_chair_v2.glb", "oak_table.glb"))
+        self.assertEqual(self.ids_for(base + "tags=furniture&tags=wood"), self.names("oak_table.glb"))
+        self.assertEqual(self.ids_for(base + "tags_any=draft,wood"), self.names("blue_chair.glb", "oak_table.glb"))
+        self.assertEqual(
+            self.ids_for(base + "tags=furniture&tags_none=draft,wood"), self.names("red_chair_v2.glb")
+        )
+        self.assertEqual(self.ids_for(base + "tags=missing"), set())
+
+    def test_search(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                self.skipTest("pg_trgm is not installed")
+        search = "/api/asset_preview/assets/search/?q="
+        self.assertEqual(self.ids_for(search + "chair"), self.names("red_chair_v2.glb", "blue_chair.glb"))
+        self.assertEqual(self.ids_for(search + "chair -blue"), self.names("red_chair_v2.glb"))
+        self.assertEqual(self.ids_for(search + "dining"), self.names("oak_table.glb"))       # description
+        self.assertEqual(self.ids_for(search + "approved&tags_none=wood"), self.names("red_chair_v2.glb"))
+        self.assertIn(self.ids["red_chair_v2.glb"], self.ids_for(search + "chaer_v2"))       # typo, trigram
+        self.assertEqual(self.client.get(search).status_code, 400)
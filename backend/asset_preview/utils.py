@@ -2,10 +2,13 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Optional, Dict, Any
+from contextlib import contextmanager
 from django.conf import settings
 import mimetypes
 import os
 import re
+import shutil
+import time
 
 # Optional imaging support (thumbnails for images if available)
 try:
@@ -14,6 +17,9 @@ try:
 except Exception:
     _HAS_PIL = False
 
+if _HAS_PIL:
+    from . import video, render, lod, blurhash
+
 # -----------------------------
 # Helpers
 # -----------------------------
@@ -27,6 +33,92 @@ def _stem_safe(name: str) -> str:
     stem = Path(name).stem
     return re.sub(r'[^A-Za-z0-9._-]+', '_', stem) or "asset"
 
+# -----------------------------
+# Derivative cache
+# -----------------------------
+# MEDIA_ROOT/previews/<asset id>/<key>/thumb.jpg ...   key = content hash + mtime,
+# so a new version / replaced file gets a fresh dir and old ones are pruned.
+LOCK_WAIT_SECONDS = 60
+LOCK_STALE_SECONDS = 300   # a generator that crashed leaves its lock behind
+
+def _previews_root(meta, media_root: Path) -> Path:
+    return media_root / "previews" / str(meta.pk)
+
+def _cache_key(meta, src_abs: Path) -> str:
+    st = src_abs.stat()
+    digest = (getattr(meta, "content_hash", "") or "")[:16] or f"{st.st_size:x}"
+    return f"{digest}-{st.st_mtime_ns:x}"
+
+def preview_dir(meta, src_abs: Path, media_root: Optional[Path] = None) -> Path:
+    return _previews_root(meta, media_root or _media_root()) / _cache_key(meta, src_abs)
+
+def invalidate_previews(meta, media_root: Optional[Path] = None) -> None:
+    """
+    Drop every cached derivative of an asset (rename / replace / delete).
+    """
+    if getattr(meta, "pk", None) is None:
+        return
+    shutil.rmtree(_previews_root(meta, media_root or _media_root()), ignore_errors=True)
+
+@contextmanager
+def _generation_lock(out_dir: Path):
+    """
+    Cross-process lock for one cache dir (O_EXCL lock file). Yields True if
+    this process should generate, False if another one finished meanwhile.
+    """
+    lock = out_dir.with_name(out_dir.name + ".lock")
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > LOCK_STALE_SECONDS:
+                    lock.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"preview generation for {out_dir} is taking too long")
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        try:
+            lock.unlink()
+        except FileNotFoundError:
+            pass
+
+def cached_derivatives(out_dir: Path, names, generate) -> bool:
+    """
+    Make sure out_dir/<name> exists for every name, calling generate(out_dir)
+    at most once per key across threads and processes. The common case is
+    a stat per file. Returns True when all derivatives are present.
+    """
+    paths = [out_dir / n for n in names]
+    if all(p.exists() for p in paths):
+        return True
+    with _generation_lock(out_dir):
+        if all(p.exists() for p in paths):
+            return True  # someone else made them while we waited
+        out_dir.mkdir(parents=True, exist_ok=True)
+        generate(out_dir)
+        # older keys of this asset (previous content / mtime) are dead now
+        for sibling in out_dir.parent.iterdir():
+            if sibling.is_dir() and sibling != out_dir:
+                shutil.rmtree(sibling, ignore_errors=True)
+    return all(p.exists() for p in paths)
+
+def _save_atomic(im, path: Path, **kwargs) -> None:
+    # readers only ever see complete files
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    im.save(tmp, **kwargs)
+    os.replace(tmp, path)
+
 # -----------------------------
 # Public API used by views.py
 # -----------------------------
@@ -39,8 +131,10 @@ def guess_mime(path_or_str: str) -> str:
 
 def classify(path: Path) -> str:
     """
-    Classify the file into 'image' | 'video' | 'pdf' | 'other'.
+    Classify the file into 'image' | 'video' | 'model' | 'pdf' | 'other'.
     """
+    if str(path).lower().endswith((".glb", ".gltf")):
+        return "model"
     mime = guess_mime(str(path))
     if mime.startswith("image/"):
         return "image"
@@ -82,17 +176,90 @@ def ensure_basic_info(meta, media_root: Optional[Path] = None) -> None:
     if dirty_fields:
         meta.save(update_fields=dirty_fields)
 
-def build_previews(meta, media_root: Optional[Path] = None) -> Dict[str, Any]:
+def _duration_seconds(meta) -> Optional[float]:
+    # stored values only: this runs on the preview GET too, which must not probe the file
+    if getattr(meta, "duration", None):
+        return meta.duration.total_seconds()
+    duration_ms = (getattr(meta, "media_info", None) or {}).get("duration_ms")
+    if duration_ms:
+        return duration_ms / 1000
+    return None
+
+def _generate_video(src_abs: Path, out_dir: Path, duration: Optional[float]) -> None:
+    """
+    poster.jpg + thumb.jpg from one keyframe; sprite.jpg + thumbs.vtt
+    (scrubbing track) when the duration is known.
+    """
+    t = min(duration * 0.1, 10.0) if duration else 0.0
+    frame = video.grab_keyframe(src_abs, t, 1280, 1280) or video.grab_keyframe(src_abs, 0, 1280, 1280)
+    if frame is None:
+        raise RuntimeError(f"ffmpeg returned no frame for {src_abs.name}")
+    _save_atomic(frame, out_dir / "poster.jpg", format="JPEG", quality=85)
+    thumb = frame.copy()
+    thumb.thumbnail((384, 384))
+    _save_atomic(thumb, out_dir / "thumb.jpg", format="JPEG", quality=85)
+
+    if duration:
+        times = video.tile_times(duration)
+        sheet = video.sprite_sheet(video.grab_tiles(src_abs, times))
+        _save_atomic(sheet, out_dir / "sprite.jpg", format="JPEG", quality=75)
+        vtt = out_dir / "thumbs.vtt"
+        tmp = vtt.with_name(f".{vtt.name}.{os.getpid()}.tmp")
+        tmp.write_text(video.webvtt(times, duration, "sprite.jpg"), encoding="utf-8")
+        os.replace(tmp, vtt)
+
+def _generate_model(src_abs: Path, out_dir: Path) -> None:
+    """
+    CPU-rendered thumb.jpg / preview.jpg (render.py) within the time budget;
+    one retry on a much coarser mesh if the full one does not fit. Then the
+    decimated LOD variants (lod.py); a render kept from an earlier run is reused.
+    """
+    if not (out_dir / "thumb.jpg").exists():
+        _render_model(src_abs, out_dir)
+    lod.build_lods(src_abs, out_dir)
+
+def _render_model(src_abs: Path, out_dir: Path) -> None:
+    budget = getattr(settings, "ASSET_RENDER_BUDGET_SECONDS", 20)
+    try:
+        im = render.render_thumbnail(str(src_abs), size=1024, budget_seconds=budget)
+    except render.RenderTimeout:
+        im = render.render_thumbnail(
+            str(src_abs), size=1024, budget_seconds=budget, max_faces=render.MAX_RENDER_FACES // 10
+        )
+    _save_atomic(im, out_dir / "preview.jpg", format="JPEG", quality=85)
+    thumb = im.copy()
+    thumb.thumbnail((384, 384))  # downscale doubles as anti-aliasing
+    _save_atomic(thumb, out_dir / "thumb.jpg", format="JPEG", quality=85)
+
+def compute_placeholder(previews: Dict[str, Any]) -> Optional[str]:
+    """
+    BlurHash string for the grid (blurhash.py) from build_previews()' thumbnail,
+    or None when the asset has no raster thumbnail.
+    """
+    thumb = previews.get("thumbnail_path")
+    if not (_HAS_PIL and thumb and classify(Path(thumb)) == "image"):
+        return None
+    return blurhash.encode_file(thumb)
+
+def build_previews(meta, media_root: Optional[Path] = None, generate_slow: bool = False) -> Dict[str, Any]:
     """
     Build or locate preview artifacts for the asset.
     Returns dict with:
       - kind: str
       - thumbnail_path: Path | None
       - preview_path: Path | None
+      - poster_path / sprite_path / vtt_path: Path | None   (videos)
+      - lods: [{"ratio", "faces", "path"}]   (models; coarser variants after the original)
+      - pending: bool   (video stills / model renders not made yet; see generate_slow)
     Paths returned are ABSOLUTE Path objects under MEDIA_ROOT.
+    Video stills (ffmpeg) and model renders are only generated when
+    generate_slow=True (the "previews" job), never on the request path.
     """
     media_root = media_root or _media_root()
-    result = {"kind": None, "thumbnail_path": None, "preview_path": None}
+    result = {
+        "kind": None, "thumbnail_path": None, "preview_path": None,
+        "poster_path": None, "sprite_path": None, "vtt_path": None, "lods": [], "pending": False,
+    }
 
     if not getattr(meta, "file_location", None):
         return result
@@ -104,40 +271,63 @@ def build_previews(meta, media_root: Optional[Path] = None) -> Dict[str, Any]:
     kind = classify(src_abs)
     result["kind"] = kind
 
-    # Previews directory: MEDIA_ROOT/previews/<stem>/
-    stem = _stem_safe(getattr(meta, "file_name", None) or src_abs.name)
-    out_dir = media_root / "previews" / stem
+    # Previews directory: MEDIA_ROOT/previews/<asset id>/<content key>/
+    out_dir = preview_dir(meta, src_abs, media_root)
     thumb_path = out_dir / "thumb.jpg"
     preview_path = out_dir / "preview.jpg"
 
     if kind == "image":
         # Create thumb/preview if PIL is available; otherwise just point to original.
         if _HAS_PIL:
-            try:
-                _ensure_dir(thumb_path)
+            def generate(_out_dir):
                 with Image.open(src_abs) as im:
+                    if im.mode not in ("RGB", "L"):
+                        im = im.convert("RGB")
                     # Thumbnail
                     im_thumb = im.copy()
                     im_thumb.thumbnail((384, 384))
-                    im_thumb.save(thumb_path, format="JPEG", quality=85)
+                    _save_atomic(im_thumb, thumb_path, format="JPEG", quality=85)
 
                     # Larger preview
                     im_prev = im.copy()
                     im_prev.thumbnail((1280, 1280))
-                    im_prev.save(preview_path, format="JPEG", quality=85)
+                    _save_atomic(im_prev, preview_path, format="JPEG", quality=85)
 
-                result["thumbnail_path"] = thumb_path
-                result["preview_path"] = preview_path
-                return result
-            except Exception:
+            try:
+                if cached_derivatives(out_dir, ["thumb.jpg", "preview.jpg"], generate):
+                    result["thumbnail_path"] = thumb_path
+                    result["preview_path"] = preview_path
+                    return result
+            except Exception as e:
                 # Fallback to using original if processing fails
-                pass
+                print("Preview build error:", e)
 
         # Fallback: no PIL -> use original as "preview"
         result["thumbnail_path"] = src_abs
         result["preview_path"] = src_abs
         return result
 
+    elif kind == "model":
+        # Rendered on the CPU at ingest; the model file stays the preview (viewer)
+        result["preview_path"] = src_abs
+        if not _HAS_PIL:
+            return result
+        names = ["thumb.jpg", "preview.jpg", lod.MANIFEST]
+        ready = all((out_dir / n).exists() for n in names)
+        if not ready and generate_slow:
+            ready = cached_derivatives(out_dir, names, lambda d: _generate_model(src_abs, d))
+        if not ready:
+            result["pending"] = True
+            return result
+        result["thumbnail_path"] = out_dir / "thumb.jpg"
+        result["poster_path"] = out_dir / "preview.jpg"
+        # lightest last; the viewer loads from the end and swaps in detail
+        result["lods"] = [
+            {"ratio": e["ratio"], "faces": e["faces"], "path": out_dir / e["file"] if e["file"] else src_abs}
+            for e in lod.read_manifest(out_dir)
+        ]
+        return result
+
     elif kind == "pdf":
         # Without external tools we cannot rasterize a page here.
         # Return original file as "preview" so the client can at least link/open it.
@@ -146,10 +336,32 @@ def build_previews(meta, media_root: Optional[Path] = None) -> Dict[str, Any]:
         return result
 
     elif kind == "video":
-        # If you later add ffmpeg/ffprobe, generate a poster JPEG here.
-        # For now, return original as preview link.
-        result["thumbnail_path"] = None
+        # Poster + sprite sheet / WebVTT track from keyframes; the video itself
+        # stays the preview (served with Range support for playback).
         result["preview_path"] = src_abs
+        if not (_HAS_PIL and video.available()):
+            return result
+
+        duration = _duration_seconds(meta)
+        if duration is None and generate_slow and getattr(meta, "pk", None):
+            # previews job on a row extraction never filled in: probe and store it now
+            from upload_download.extract import extract_metadata
+            extract_metadata(meta)
+            duration = _duration_seconds(meta)
+        names = ["poster.jpg", "thumb.jpg"] + (["sprite.jpg", "thumbs.vtt"] if duration else [])
+        ready = all((out_dir / n).exists() for n in names)
+        if not ready and generate_slow:
+            # errors propagate so the job is retried with backoff
+            ready = cached_derivatives(out_dir, names, lambda d: _generate_video(src_abs, d, duration))
+        if not ready:
+            result["pending"] = True
+            return result
+
+        result["thumbnail_path"] = out_dir / "thumb.jpg"
+        result["poster_path"] = out_dir / "poster.jpg"
+        if duration:
+            result["sprite_path"] = out_dir / "sprite.jpg"
+            result["vtt_path"] = out_dir / "thumbs.vtt"
         return result
 
     # other: no previews; return original as preview to have *something* to click
@@ -0,0 +1,110 @@
+# backend/asset_preview/video.py
+"""
+Video stills via the ffmpeg binary bundled with imageio-ffmpeg.
+
+Every frame is taken with an input seek to the nearest keyframe
+(`-ss` before `-i`, `-noaccurate_seek`, `-skip_frame nokey`), so ffmpeg
+reads and decodes one GOP head per still instead of the whole stream.
+Used by utils.build_previews (poster + sprite sheet + WebVTT) from the
+"previews" background job, never on the request path.
+"""
+from __future__ import annotations
+
+import io
+import math
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from PIL import Image
+
+# Optional ffmpeg support
+try:
+    import imageio_ffmpeg  # type: ignore
+    _HAS_FFMPEG = True
+except Exception:
+    _HAS_FFMPEG = False
+
+TILE_W, TILE_H = 160, 90        # sprite cell (letterboxed)
+SPRITE_COLUMNS = 10
+MAX_TILES = 60
+MIN_INTERVAL = 2.0              # seconds between sprite cells at most this dense
+FRAME_TIMEOUT = 30              # seconds per ffmpeg call
+PARALLEL_GRABS = 4
+
+
+def available() -> bool:
+    return _HAS_FFMPEG
+
+
+def grab_keyframe(src, t: float, max_w: int, max_h: int) -> Optional[Image.Image]:
+    """
+    The keyframe at or before `t` seconds, scaled to fit max_w x max_h.
+    """
+    cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(), "-v", "error", "-nostdin",
+        "-skip_frame", "nokey", "-noaccurate_seek", "-ss", f"{max(t, 0):.3f}",
+        "-i", str(src),
+        "-an", "-sn", "-frames:v", "1",
+        "-vf", f"scale=w='min({max_w},iw)':h='min({max_h},ih)':force_original_aspect_ratio=decrease",
+        "-f", "image2pipe", "-vcodec", "ppm", "-",
+    ]
+    out = subprocess.run(cmd, capture_output=True, timeout=FRAME_TIMEOUT).stdout
+    if not out:
+        return None
+    return Image.open(io.BytesIO(out)).convert("RGB")
+
+
+def tile_times(duration: float) -> List[float]:
+    interval = max(MIN_INTERVAL, duration / MAX_TILES)
+    return [i * interval for i in range(max(1, math.ceil(duration / interval)))]
+
+
+def grab_tiles(src, times: List[float]) -> List[Optional[Image.Image]]:
+    with ThreadPoolExecutor(max_workers=PARALLEL_GRABS) as pool:
+        return list(pool.map(lambda t: grab_keyframe(src, t, TILE_W, TILE_H), times))
+
+
+def sprite_sheet(tiles: List[Optional[Image.Image]]) -> Image.Image:
+    """
+    Grid of TILE_W x TILE_H cells, row-major, SPRITE_COLUMNS wide.
+    A missing frame repeats the previous one so cue positions stay regular.
+    """
+    cols = min(SPRITE_COLUMNS, len(tiles))
+    rows = math.ceil(len(tiles) / cols)
+    sheet = Image.new("RGB", (cols * TILE_W, rows * TILE_H))
+    last = None
+    for i, tile in enumerate(tiles):
+        tile = tile or last
+        if tile is None:
+            continue
+        x, y = (i % cols) * TILE_W, (i // cols) * TILE_H
+        sheet.paste(tile, (x + (TILE_W - tile.width) // 2, y + (TILE_H - tile.height) // 2))
+        last = tile
+    return sheet
+
+
+def _vtt_time(seconds: float) -> str:
+    ms = int(round(seconds * 1000))
+    h, rem = divmod(ms, 3_600_000)
+    m, rem = divmod(rem, 60_000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+def webvtt(times: List[float], duration: float, sprite_name: str) -> str:
+    """
+    Thumbnail track: one cue per sprite cell, pointing at it with a media
+    fragment (#xywh=), relative to the VTT's own URL.
+    """
+    cols = min(SPRITE_COLUMNS, len(times))
+    lines = ["WEBVTT", ""]
+    for i, start in enumerate(times):
+        end = times[i + 1] if i + 1 < len(times) else max(duration, start + 0.001)
+        x, y = (i % cols) * TILE_W, (i // cols) * TILE_H
+        lines += [
+            f"{_vtt_time(start)} --> {_vtt_time(end)}",
+            f"{sprite_name}#xywh={x},{y},{TILE_W},{TILE_H}",
+            "",
+        ]
+    return "\n".join(lines)
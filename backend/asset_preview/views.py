@@ -1,34 +1,32 @@
 # backend/asset_preview/views.py
+from datetime import datetime, timezone as dt_timezone
 from pathlib import Path
-from urllib.parse import urljoin
+import hashlib
 import mimetypes
 
 from django.conf import settings
-from django.http import FileResponse, Http404
+from django.core.cache import cache
+from django.http import FileResponse, Http404, HttpResponse
+from django.db.models import F, OuterRef, Q, Subquery
 from django.utils import timezone
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from asset_metadata.models import AssetMetadata
-from .serializers import AssetMetadataLiteSerializer
+from asset_metadata import jobs
+from asset_metadata.filters import filter_by_ranges, filter_by_tags, tag_counts
+from asset_metadata.models import AssetMetadata, AssetJob, Blob, CatalogVersion
+from asset_metadata.pagination import AssetCursorPagination
+from asset_metadata.search import search as search_assets
+from . import conditional, fast_list
+from .pagination import SearchPagination, VersionCursorPagination
+from .serializers import AssetMetadataLiteSerializer, AssetVersionSerializer
+from upload_download.signed_urls import media_url
 from .utils import ensure_basic_info, build_previews
 
-def _to_media_url(abs_or_rel_path: Path) -> str | None:
-    """
-    Convert absolute/relative filesystem path under MEDIA_ROOT to a public MEDIA_URL.
-    Returns None if path is falsy.
-    """
-    if not abs_or_rel_path:
-        return None
-    media_root = Path(settings.MEDIA_ROOT).resolve()
-    p = Path(abs_or_rel_path)
-    rel = p.relative_to(media_root) if p.is_absolute() else Path(p)
-    return urljoin(settings.MEDIA_URL, rel.as_posix())
-
-
 # class AssetPreviewViewSet(viewsets.ModelViewSet):
 #     """
 #     API for listing/retrieving AssetMetadata, and performing preview/download/version actions.
@@ -44,18 +42,132 @@ def _to_media_url(abs_or_rel_path: Path) -> str | None:
 #             ensure_basic_info(meta, media_root)
 #         return super().list(request, *args, **kwargs)
 
+def _previews_job_covers(meta, media_root):
+    """
+    True if a "previews" job is queued or running, has failed for good, or has
+    already run on the current file. A finished job can leave stills missing
+    (nothing decodable, renderer unavailable); polling must not queue it again
+    and again. Renames / re-uploads queue their own job.
+    """
+    try:
+        mtime = (media_root / meta.file_location).stat().st_mtime
+    except OSError:
+        return True  # no file, nothing to build
+    return meta.jobs.filter(kind="previews").filter(
+        Q(status__in=[AssetJob.Status.QUEUED, AssetJob.Status.RUNNING, AssetJob.Status.FAILED])
+        | Q(status=AssetJob.Status.DONE, modified_at__gte=datetime.fromtimestamp(mtime, tz=dt_timezone.utc))
+    ).exists()
+
+
 class AssetPreviewViewSet(viewsets.ModelViewSet):
-    queryset = AssetMetadata.objects.all().order_by("-modified_at", "-created_at")
+    queryset = AssetMetadata.objects.select_related("modified_by").order_by("-modified_at", "-created_at", "-id")
     serializer_class = AssetMetadataLiteSerializer
     permission_classes = [IsAuthenticated]  # default: protect everything
+    pagination_class = AssetCursorPagination
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        # ?latest=1 -> one row per asset group (its newest version), via the indexed pointer
+        if self.request.query_params.get("latest") in ("1", "true"):
+            qs = qs.filter(group__latest_version=F("pk"))
+        # ?file_name=<exact> -> every row with that name (indexed)
+        file_name = self.request.query_params.get("file_name")
+        if file_name:
+            qs = qs.filter(file_name=file_name)
+        # ?min_width= / ?max_polygons= / ?duration__lt= ... (typed, indexed columns)
+        qs = filter_by_ranges(qs, self.request.query_params)
+        # ?tags= / ?tags_any= / ?tags_none=
+        return filter_by_tags(qs, self.request.query_params)
+
+    # GET /api/asset_preview/assets/?fields=id,file_name,tags&cursor=...
+    def list(self, request, *args, **kwargs):
+        """
+        The same page the serializer would produce, built from one values()
+        query (fast_list.py); ?fields= trims both the keys and the columns.
+        A repeat request with If-None-Match gets 304 before any of that runs
+        (conditional.py).
+        """
+        try:
+            fields = fast_list.parse_fields(request.query_params.get("fields"))
+        except ValueError as e:
+            return Response({"detail": f"Unknown fields: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag, last_modified = conditional.collection_validators(request)
+        not_modified = conditional.not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return conditional.set_validators(not_modified, etag, last_modified)
+
+        paginator = self.paginator
+        rows = self.filter_queryset(self.get_queryset()).values(
+            *fast_list.columns_for(fields, paginator.ordering)
+        )
+        page = paginator.paginate_queryset(rows, request, view=self)
+        results = [fast_list.format_row(r, fields) for r in page]
+        response = paginator.get_paginated_response(results)
+
+        # JSON clients get the bytes encoded in one go; the browsable API renders as usual
+        if isinstance(request.accepted_renderer, JSONRenderer) and "indent" not in (request.accepted_media_type or ""):
+            response = HttpResponse(fast_list.dumps(response.data, results), content_type="application/json")
+        return conditional.set_validators(response, etag, last_modified)
+
+    # GET /api/asset_preview/assets/<id>/  (If-None-Match -> 304)
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = conditional.detail_validators(request, kwargs.get(self.lookup_field))
+        if etag is None:
+            return super().retrieve(request, *args, **kwargs)
+        not_modified = conditional.not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return conditional.set_validators(not_modified, etag, last_modified)
+        return conditional.set_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
 
     # ⬇ Public reads, private writes
     def get_permissions(self):
-        public_actions = {"list", "retrieve", "preview", "download", "versions"}
+        public_actions = {"list", "retrieve", "preview", "download", "versions", "search", "facets"}
         if getattr(self, "action", None) in public_actions:
             return [AllowAny()]
         return [IsAuthenticated()]
     
+    # GET /api/asset_preview/assets/search/?q=red chair -draft&page=2
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """
+        Ranked full-text search over file_name, tags and description, with
+        trigram matching on file_name for typos (asset_metadata/search.py).
+        Other list filters (?latest=1, ...) apply as usual.
+        """
+        q = (request.query_params.get("q") or "").strip()
+        if not q:
+            return Response({"detail": "Pass q=..."}, status=status.HTTP_400_BAD_REQUEST)
+        qs = search_assets(self.get_queryset(), q)
+
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    # GET /api/asset_preview/assets/facets/?tags=approved&q=chair
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        Tag counts over the rows the same filters (and q) would return, for
+        the tag sidebar. Cached per catalog version, so repeated requests are
+        a cache hit until an asset is written.
+        """
+        params = request.query_params
+        relevant = sorted((k, sorted(v)) for k, v in params.lists() if k not in ("cursor", "page", "page_size"))
+        digest = hashlib.sha1(repr(relevant).encode()).hexdigest()
+        key = f"asset-facets:{CatalogVersion.current()}:{digest}"
+
+        data = cache.get(key)
+        if data is None:
+            qs = self.get_queryset()
+            q = (params.get("q") or "").strip()
+            if q:
+                qs = search_assets(qs, q)
+            data = {"tags": tag_counts(qs)}
+            cache.set(key, data, getattr(settings, "ASSET_FACET_CACHE_SECONDS", 300))
+        return Response(data, status=status.HTTP_200_OK)
+
     # GET /api/asset_preview/assets/{pk}/preview/
     @action(detail=True, methods=["get"])
     def preview(self, request, pk=None):
@@ -64,8 +176,19 @@ class AssetPreviewViewSet(viewsets.ModelViewSet):
         ensure_basic_info(meta, media_root)
         previews = build_previews(meta, media_root)  # returns dict with absolute Paths
 
-        thumb_url = _to_media_url(previews.get("thumbnail_path"))
-        prev_url  = _to_media_url(previews.get("preview_path"))
+        # signed, expiring URLs (see upload_download/signed_urls.py); derivatives
+        # share one token for their preview dir so thumbs.vtt -> sprite.jpg resolves
+        def url(p):
+            in_cache = p and Path(p).resolve().is_relative_to((media_root / "previews").resolve())
+            return media_url(p, dir_scoped=bool(in_cache))
+
+        thumb_url = url(previews.get("thumbnail_path"))
+        prev_url  = url(previews.get("preview_path"))
+
+        # video stills / model renders are made by the "previews" job; queue one
+        # for assets uploaded before it existed
+        if previews.get("pending") and not _previews_job_covers(meta, media_root):
+            jobs.enqueue(meta, "previews")
 
         # 🔹 extra: serialize the asset itself
         asset_data = AssetMetadataLiteSerializer(
@@ -79,33 +202,39 @@ class AssetPreviewViewSet(viewsets.ModelViewSet):
                     "kind": previews.get("kind"),
                     "thumbnail_url": thumb_url,
                     "preview_url": prev_url,
+                    "poster_url": url(previews.get("poster_path")),
+                    "sprite_url": url(previews.get("sprite_path")),
+                    "thumbnails_vtt_url": url(previews.get("vtt_path")),
+                    "lods": [
+                        {"ratio": l["ratio"], "faces": l["faces"], "url": url(l["path"])}
+                        for l in previews.get("lods", [])
+                    ],
+                    "pending": previews.get("pending", False),
                 },
             },
             status=status.HTTP_200_OK,
         )
 
 
-    # GET /api/asset_preview/assets/{pk}/versions/
+    # GET /api/asset_preview/assets/{pk}/versions/?cursor=...&page_size=50
     @action(detail=True, methods=["get"])
     def versions(self, request, pk=None):
         """
-        Example convention: MEDIA_ROOT/versions/<stem>/vN/<filename>
+        Every version of this asset's group, newest first, cursor-paginated
+        over the (group, -version) index. Nothing here touches the disk.
         """
         meta = self.get_object()
-        media_root = Path(settings.MEDIA_ROOT)
+        if meta.group_id is None:
+            qs = AssetMetadata.objects.filter(pk=meta.pk)   # uploaded before groups existed
+        else:
+            qs = AssetMetadata.objects.filter(group_id=meta.group_id)
+        qs = qs.select_related("modified_by").annotate(
+            size=Subquery(Blob.objects.filter(sha256=OuterRef("content_hash")).values("size")[:1])
+        )
 
-        stem = Path(meta.file_name).stem
-        base = media_root / "versions" / stem
-        items = []
-        if base.exists():
-            for p in sorted(base.glob("v*/**/*"), key=lambda x: x.as_posix()):
-                if p.is_file():
-                    rel = p.relative_to(media_root).as_posix()
-                    items.append({
-                        "version_path": rel,
-                        "version": p.parts[-3] if len(p.parts) >= 3 and p.parts[-3].startswith("v") else None,
-                        "url": f"{settings.MEDIA_URL.rstrip('/')}/{rel}",
-                    })
-        return Response({"versions": items}, status=status.HTTP_200_OK)
+        paginator = VersionCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = AssetVersionSerializer(page, many=True, context={"request": request})
+        return paginator.get_paginated_response(serializer.data)
 
     
\ No newline at end of file
@@ -14,6 +14,7 @@ INSTALLED_APPS = [  # Installed applications
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",   # search vectors, trigram lookups, GIN indexes
     "rest_framework",
     "corsheaders",
     "roles",
@@ -78,6 +79,23 @@ MEDIA_URL = "/media/"
 
 MEDIA_ROOT = r"C:\media"    # This leads to c drive media folder
 
+# Background processing of uploads (run: python manage.py run_asset_workers)
+ASSET_ASYNC_PROCESSING = True   # False -> extract metadata inside the upload request
+ASSET_JOB_MEMORY_MB = 2048      # per-job address-space limit
+ASSET_JOB_TIMEOUT = 300         # seconds per job before it is killed and retried
+ASSET_JOB_MAX_ATTEMPTS = 3
+ASSET_BATCH_WORKERS = None      # processes for batch upload extraction (None -> CPU count)
+ASSET_RENDER_BUDGET_SECONDS = 20   # CPU time per GLB thumbnail render (render.py)
+ASSET_FACET_CACHE_SECONDS = 300    # tag facet counts; also dropped on any asset write
+
+# File offload: Django checks access, the front server sends the bytes (see deploy/nginx.conf)
+MEDIA_OFFLOAD = None            # None | "nginx" (X-Accel-Redirect) | "sendfile" (X-Sendfile)
+MEDIA_OFFLOAD_PREFIX = "/protected-media/"   # nginx `internal` location aliased to MEDIA_ROOT
+
+# Signed file URLs minted by the list / preview endpoints (/api/files/<token>/<name>)
+SIGNED_URL_TTL = 3600           # seconds a link stays valid
+SIGNED_URL_BUCKET = 600         # expiries are rounded up to this, so URLs repeat and cache
+
 
 
 CORS_ALLOW_ALL_ORIGINS = True
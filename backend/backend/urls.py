@@ -1,8 +1,9 @@
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, re_path, include
 from django.shortcuts import redirect
 from django.conf import settings
-from django.conf.urls.static import static
 
 import upload_download.views as viewsUploadDownload
 # import asset_preview.views as viewsAssets
@@ -28,4 +29,9 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # development only: media with Range / ETag support (video seeking, resumable GLB
+    # downloads). Production serves files only through api/download/ and the signed
+    # api/files/ URLs, which decide access first (and offload with MEDIA_OFFLOAD).
+    urlpatterns += [
+        re_path(r"^%s(?P<path>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")), viewsUploadDownload.serve_media),
+    ]
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import UploadAsset
+from .models import UploadAsset, UploadSession
 
 @admin.register(UploadAsset)
 class UploadAssetAdmin(admin.ModelAdmin):
@@ -21,3 +21,10 @@ class UploadAssetAdmin(admin.ModelAdmin):
             return "-"
     download_link.short_description = "Download"
 
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ("file_name", "status", "total_size", "received_bytes", "created_at", "modified_at")
+    list_filter = ("status",)
+    readonly_fields = ("id", "received", "sha256", "asset", "created_at", "modified_at")
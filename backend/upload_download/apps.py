@@ -5,3 +5,6 @@ class UploadDownloadConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "upload_download"
     verbose_name = "UPLOAD & DOWNLOAD"
+
+    def ready(self):
+        import upload_download.tasks  # registers background job handlers
@@ -0,0 +1,247 @@
+# backend/upload_download/batch.py
+"""
+Batch ingest: many files in one request.
+
+    POST /api/upload/batch/   multipart: files=<f1>, files=<f2>, ...   (or)   archive=<shots.zip | .tar[.gz]>
+                              + optional shared description / tags / modified_by
+
+Archive members are streamed straight into their versioned location (no
+extraction to a temp dir). The archive is read through once first, so a
+corrupt one is rejected before any file is stored or version allocated. Metadata extraction for all items runs in a
+process pool and every row is inserted with one bulk_create in a single
+transaction; if that fails, the stored files are removed again. The response
+lists a result per item, in input order.
+"""
+import multiprocessing
+import os
+import tarfile
+import threading
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from asset_metadata import blobs, jobs
+from asset_metadata.dimensions import fill_dimensions
+from asset_metadata.models import AssetMetadata, AssetGroup, CatalogVersion
+from asset_metadata.search import refresh_search_vectors
+from .extract import probe_file, apply_probe
+from .views import UNSUPPORTED_TYPE, _parse_side_fields, _classify_upload, _version_dir, _payload
+
+
+def _iter_archive(archive):
+    """
+    Yield (file_name, readable stream) for each regular file in a ZIP or TAR,
+    reading members sequentially without extracting them anywhere.
+    """
+    if zipfile.is_zipfile(archive):
+        archive.seek(0)
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    with zf.open(info) as fh:
+                        yield info.filename, fh
+        return
+
+    archive.seek(0)
+    with tarfile.open(fileobj=archive, mode="r|*") as tf:  # stream mode: no seeking back
+        for member in tf:
+            if member.isfile():
+                yield member.name, tf.extractfile(member)
+
+
+def _check_archive(archive):
+    """
+    Read every member once (CRCs for ZIP, the whole stream for TAR).
+    Raises BadZipFile / TarError if the archive is damaged anywhere.
+    """
+    if zipfile.is_zipfile(archive):
+        archive.seek(0)
+        with zipfile.ZipFile(archive) as zf:
+            bad = zf.testzip()
+        if bad is not None:
+            raise zipfile.BadZipFile(f"bad CRC in {bad}")
+        return
+
+    archive.seek(0)
+    with tarfile.open(fileobj=archive, mode="r|*") as tf:
+        for member in tf:
+            if member.isfile():
+                fh = tf.extractfile(member)
+                while fh.read(1024 * 1024):
+                    pass
+
+
+def _skip_member(path):
+    # folders, macOS resource forks, dotfiles
+    name = os.path.basename(path)
+    return not name or name.startswith(".") or "__MACOSX/" in path
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _probe_pool():
+    """
+    The process pool shared by every batch request in this web worker,
+    started on first use (spawning interpreters per request costs more than
+    probing a handful of files).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a (possibly multi-threaded) web worker
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_size(), mp_context=multiprocessing.get_context("spawn"), max_tasks_per_child=500
+            )
+        return _pool
+
+
+def _pool_size():
+    return getattr(settings, "ASSET_BATCH_WORKERS", None) or os.cpu_count() or 2
+
+
+def _probe_all(items):
+    """
+    probe_file() for every (full_path, file_type, file_name), across a process pool.
+    """
+    if len(items) < 2:
+        return [probe_file(*it) for it in items]
+    global _pool
+    pool = _probe_pool()
+    try:
+        return list(pool.map(probe_file, *zip(*items), chunksize=max(1, len(items) // (_pool_size() * 4))))
+    except BrokenProcessPool:
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None  # a child died (e.g. OOM); the next request starts a new pool
+        raise
+
+
+def _discard_staged(staged):
+    for _, a in staged:
+        blobs.discard(a.content_hash, os.path.join(settings.MEDIA_ROOT, a.file_location))
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@authentication_classes([])
+def upload_batch(request):
+    files = request.FILES.getlist("files")
+    archive = request.FILES.get("archive")
+    if not files and not archive:
+        return Response(
+            {"detail": "Send files in field 'files' (repeatable) or one ZIP/TAR in field 'archive'."},
+            status=400,
+        )
+    shared = _parse_side_fields(request.POST, "")
+
+    if archive:
+        try:
+            _check_archive(archive)
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+            return Response({"detail": f"Unreadable archive: {e}"}, status=400)
+        entries = ((name, fh, None) for name, fh in _iter_archive(archive))
+    else:
+        entries = ((f.name, None, f) for f in files)
+
+    results = []   # one dict per input item, in order
+    staged = []    # (results index, AssetMetadata not yet saved)
+    try:
+        for path, fh, upfile in entries:
+            if archive and _skip_member(path):
+                continue
+            file_name = os.path.basename(path)
+            classified = _classify_upload(file_name, getattr(upfile, "content_type", None))
+            if classified is None:
+                results.append({"file_name": file_name, "status": "skipped", "detail": UNSUPPORTED_TYPE})
+                continue
+            ctype, base_subdir = classified
+
+            try:
+                group, version = AssetGroup.allocate_version(file_name)
+                versioned_subdir, target_dir = _version_dir(base_subdir, version)
+                if upfile is not None:
+                    sha = blobs.hash_upload(upfile)
+                    saved_name = blobs.store(sha, target_dir, file_name, upfile=upfile)
+                    size = upfile.size
+                else:
+                    saved_name, sha, size = blobs.store_stream(fh, target_dir, file_name)
+            except OSError as e:
+                results.append({"file_name": file_name, "status": "error", "detail": str(e)})
+                continue
+
+            staged.append((len(results), AssetMetadata(
+                file_name=file_name,
+                file_type=ctype,
+                file_size=round(size / (1024 * 1024), 4),
+                file_location=os.path.join(versioned_subdir, saved_name).replace("\\", "/"),
+                description=shared["description"],
+                tags=shared["tags"],
+                group=group,
+                version=version,
+                modified_by_id=shared["modified_by_id"],
+                content_hash=sha,
+            )))
+            results.append({"file_name": file_name, "status": "created"})
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        # passed _check_archive but failed now: undo what was stored so far
+        _discard_staged(staged)
+        return Response({"detail": f"Unreadable archive: {e}"}, status=400)
+
+    try:
+        # extraction for every stored file at once, in parallel
+        objs = [a for _, a in staged]
+        found = _probe_all([
+            (os.path.join(settings.MEDIA_ROOT, a.file_location.replace("/", os.sep)), a.file_type, a.file_name)
+            for a in objs
+        ])
+        for a, f in zip(objs, found):
+            apply_probe(a, f)
+            fill_dimensions(a)  # bulk_create skips save()
+
+        is_async = getattr(settings, "ASSET_ASYNC_PROCESSING", True)
+        with transaction.atomic():
+            for a in objs:
+                a.processing_status = (
+                    AssetMetadata.ProcessingStatus.PENDING if is_async else AssetMetadata.ProcessingStatus.READY
+                )
+            created = AssetMetadata.objects.bulk_create(objs)
+            refresh_search_vectors(AssetMetadata.objects.filter(pk__in=[a.pk for a in created]))  # bulk_create skips save()
+            transaction.on_commit(CatalogVersion.bump)
+
+            for sha, n in Counter(a.content_hash for a in created).items():
+                blobs.acquire(sha, n)
+
+            newest = {}
+            for a in created:
+                if a.group_id not in newest or newest[a.group_id].version < a.version:
+                    newest[a.group_id] = a
+            counts = {}
+            for a in newest.values():
+                a.group.set_latest(a)
+                counts[a.group_id] = a.group.refresh_version_count()
+            for a in created:
+                a.no_of_versions = counts[a.group_id]
+
+            if is_async:
+                jobs.enqueue_many(created, "previews")  # extraction already done above; sidecars follow (jobs.THEN)
+    except Exception:
+        _discard_staged(staged)  # nothing references these files: the rows were never committed
+        raise
+
+    for (i, _), a in zip(staged, created):
+        results[i]["asset"] = _payload(a)
+
+    return Response(
+        {"created": len(created), "results": results},
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+    )
@@ -0,0 +1,174 @@
+# backend/upload_download/bulk.py
+"""
+Bulk download: many assets as one ZIP, built while it is being sent.
+
+    GET /api/download/bulk/?ids=4,5,9            (ids may also repeat: ?ids=4&ids=5)
+    GET /api/download/bulk/?tag=shot_010&tag=approved&version=latest|all|<N>
+
+The archive is written by zipfile into a small in-memory sink that the
+response generator drains after every block, so nothing touches disk and
+memory stays at about one block however big the export is. Already
+compressed media (images, video, audio) is STORED, everything else DEFLATED.
+"""
+import logging
+import os
+import zipfile
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from asset_metadata.models import AssetMetadata
+
+COPY_BLOCK = 1024 * 1024
+STORED_PREFIXES = ("image/", "video/", "audio/")
+STORED_EXTENSIONS = (".zip", ".gz", ".7z", ".rar", ".ktx2", ".drc")
+# range of the DOS timestamps in ZIP headers; ZipInfo raises outside it
+ZIP_MIN_DATE = (1980, 1, 1, 0, 0, 0)
+ZIP_MAX_DATE = (2107, 12, 31, 23, 59, 58)
+
+logger = logging.getLogger(__name__)
+
+
+class _Sink:
+    """
+    Write-only, non-seekable file object; zipfile then writes data
+    descriptors instead of seeking back to patch local headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compress_type(a):
+    name = (a.file_name or "").lower()
+    if (a.file_type or "").startswith(STORED_PREFIXES) or name.endswith(STORED_EXTENSIONS):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _archive_names(assets):
+    """
+    One unique arcname per asset: file_name, or "<stem> (v<N>)<ext>" when
+    several versions / same-named files end up in the same archive.
+    """
+    counts = {}
+    for a in assets:
+        counts[a.file_name] = counts.get(a.file_name, 0) + 1
+    names, used = [], set()
+    for a in assets:
+        name = a.file_name or os.path.basename(a.file_location)
+        if counts[a.file_name] > 1:
+            stem, ext = os.path.splitext(name)
+            name = f"{stem} (v{a.version or a.pk}){ext}"
+        while name in used:
+            stem, ext = os.path.splitext(name)
+            name = f"{stem} ({a.pk}){ext}"
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def _zip_stream(entries):
+    """
+    Yield the ZIP for [(arcname, full_path, compress_type)], block by block.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+        for arcname, full_path, compress_type in entries:
+            try:
+                fh = open(full_path, "rb")
+            except OSError as e:
+                logger.warning("Bulk download skipped %s: %s", full_path, e)
+                continue
+            with fh:
+                st = os.fstat(fh.fileno())
+                mtime = datetime.fromtimestamp(st.st_mtime).timetuple()[:6]
+                info = zipfile.ZipInfo(arcname, date_time=min(max(mtime, ZIP_MIN_DATE), ZIP_MAX_DATE))
+                info.compress_type = compress_type
+                info.file_size = st.st_size  # lets zipfile pick zip64 headers up front
+                with zf.open(info, mode="w", force_zip64=st.st_size > zipfile.ZIP64_LIMIT) as dest:
+                    for block in iter(lambda: fh.read(COPY_BLOCK), b""):
+                        dest.write(block)
+                        if data := sink.drain():
+                            yield data
+            if data := sink.drain():  # data descriptor
+                yield data
+    yield sink.drain()  # central directory
+
+
+def _parse_ids(params):
+    ids = []
+    for value in params.getlist("ids"):
+        for part in value.split(","):
+            part = part.strip()
+            if part:
+                ids.append(int(part))
+    return ids
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def download_bulk(request):
+    params = request.query_params
+    try:
+        ids = _parse_ids(params)
+    except ValueError:
+        return Response({"detail": "ids must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+    tags = [t.strip() for t in params.getlist("tag") if t.strip()]
+    version = (params.get("version") or "latest").strip().lower()
+
+    qs = AssetMetadata.objects.exclude(file_location__isnull=True).exclude(file_location="")
+    if ids:
+        qs = qs.filter(pk__in=ids)
+        archive_name = "assets"
+    elif tags:
+        for t in tags:
+            qs = qs.filter(tags__contains=[t])
+        if version == "latest":
+            qs = qs.filter(group__latest_version=F("pk"))
+        elif version != "all":
+            if not version.isdigit():
+                return Response({"detail": "version must be 'latest', 'all' or a number."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            qs = qs.filter(version=int(version))
+        archive_name = "_".join(tags)
+    else:
+        return Response({"detail": "Pass ids=... or tag=..."}, status=status.HTTP_400_BAD_REQUEST)
+
+    assets = list(qs.only("id", "file_name", "file_type", "file_location", "version").order_by("file_name", "version"))
+    if not assets:
+        return Response({"detail": "No matching assets."}, status=status.HTTP_404_NOT_FOUND)
+
+    entries = [
+        (arcname,
+         os.path.join(settings.MEDIA_ROOT, a.file_location.replace("\\", "/").lstrip("/").replace("/", os.sep)),
+         _compress_type(a))
+        for arcname, a in zip(_archive_names(assets), assets)
+        if ".." not in a.file_location.replace("\\", "/").split("/")
+    ]
+
+    response = StreamingHttpResponse(_zip_stream(entries), content_type="application/zip")
+    stamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+    response["Content-Disposition"] = content_disposition_header(True, f"{archive_name}-{stamp}.zip")
+    response["X-Accel-Buffering"] = "no"  # nginx: pass blocks through as they are produced
+    return response
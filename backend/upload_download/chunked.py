@@ -0,0 +1,443 @@
+# backend/upload_download/chunked.py
+"""
+Resumable chunked uploads for large GLB / video files.
+
+    POST   /api/upload/chunked/                  {"file_name", "total_size", "sha256"?, + side fields}
+    GET    /api/upload/chunked/<id>/             -> received / missing byte ranges (resume)
+    PUT    /api/upload/chunked/<id>/             raw bytes + "Content-Range: bytes 0-8388607/5000000000"
+                                                 (or ?offset=N); chunks may be sent in parallel
+    DELETE /api/upload/chunked/<id>/             abort and remove the partial file
+    POST   /api/upload/chunked/<id>/complete/    -> same payload as /api/upload/
+
+Each PUT streams into its own temp file under MEDIA_ROOT/.uploads/<id>/ and,
+with the session row locked and still active, renames it to <start>-<end>.chunk.
+Completing flips the session to "completing" under the same lock, so no chunk
+can land after that; the chunks are then concatenated into one file in a single
+sequential pass that also computes the sha256 (a lone chunk covering the whole
+file is used as is), and that file is moved into <type>/<version>/ (or dropped,
+when the blob store already holds the same content).
+"""
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from asset_metadata import blobs
+from asset_metadata.models import AssetGroup
+from .models import UploadSession
+from .views import (
+    UNSUPPORTED_TYPE, _parse_side_fields, _classify_upload, _version_dir, _create_asset, _created_status,
+    _payload,
+)
+
+STREAM_BLOCK = 1024 * 1024              # bytes read from the request per write
+SUGGESTED_CHUNK_SIZE = 8 * 1024 * 1024  # what we tell clients to send per PUT
+COMPLETING_STALE_SECONDS = 3600         # a completion this old died; let a retry take over
+
+SIDE_FIELDS = (
+    "description", "tags", "duration", "polygon_count", "resolution", "modified_by", "modified_by_id",
+)
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _session_dir(session):
+    return os.path.join(settings.MEDIA_ROOT, ".uploads", str(session.pk))
+
+
+def _chunk_files(chunk_dir):
+    """
+    [(start, end, path)] of the stored chunks, by start (longest first).
+    """
+    chunks = []
+    for name in os.listdir(chunk_dir):
+        m = re.fullmatch(r"(\d+)-(\d+)\.chunk", name)
+        if m:
+            chunks.append((int(m.group(1)), int(m.group(2)), os.path.join(chunk_dir, name)))
+    return sorted(chunks, key=lambda c: (c[0], -c[1]))
+
+
+def _merge_ranges(ranges, start, end):
+    """
+    Add [start, end) to a list of [start, end) ranges and coalesce overlaps.
+    """
+    merged = []
+    for s, e in sorted([*ranges, [start, end]]):
+        if merged and s <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return merged
+
+
+def _missing_ranges(ranges, total):
+    missing, pos = [], 0
+    for s, e in ranges:
+        if s > pos:
+            missing.append([pos, s])
+        pos = max(pos, e)
+    if pos < total:
+        missing.append([pos, total])
+    return missing
+
+
+def _session_state(session):
+    return {
+        "upload_id": str(session.pk),
+        "file_name": session.file_name,
+        "status": session.status,
+        "total_size": session.total_size,
+        "received_bytes": session.received_bytes,
+        "received": session.received,
+        "missing": _missing_ranges(session.received, session.total_size),
+        "chunk_size": SUGGESTED_CHUNK_SIZE,
+        "asset_id": session.asset_id,
+    }
+
+
+def _chunk_range(request, total):
+    """
+    Byte range [start, end) this PUT writes, from Content-Range or ?offset=.
+    Returns None when the range is missing or invalid.
+    """
+    header = (request.META.get("HTTP_CONTENT_RANGE") or "").strip()
+    if header:
+        m = _CONTENT_RANGE.match(header)
+        if not m:
+            return None
+        start, end = int(m.group(1)), int(m.group(2)) + 1
+        if m.group(3) != "*" and int(m.group(3)) != total:
+            return None
+    else:
+        try:
+            start = int(request.query_params.get("offset", ""))
+        except ValueError:
+            return None
+        end = total
+    if start < 0 or start >= end or end > total:
+        return None
+    return start, end
+
+
+def _assemble(chunk_dir, total):
+    """
+    (sha256, path) of the whole file built from the chunks in one sequential
+    pass. A single chunk covering everything is hashed where it is; otherwise
+    the pieces are copied into a new file in chunk_dir.
+    Raises ValueError if the chunks on disk do not cover [0, total).
+    """
+    chunks = _chunk_files(chunk_dir)
+    h = hashlib.sha256()
+    if total and chunks and chunks[0][:2] == (0, total):
+        with open(chunks[0][2], "rb") as fh:
+            for block in iter(lambda: fh.read(STREAM_BLOCK), b""):
+                h.update(block)
+        return h.hexdigest(), chunks[0][2]
+
+    out_path = os.path.join(chunk_dir, f".assembled-{uuid.uuid4().hex}.part")
+    pos = 0
+    with open(out_path, "wb") as out:
+        for start, end, path in chunks:
+            if end <= pos:
+                continue                  # resent range already covered
+            if start > pos:
+                break
+            with open(path, "rb") as fh:
+                fh.seek(pos - start)
+                left = end - pos
+                while left:
+                    block = fh.read(min(STREAM_BLOCK, left))
+                    if not block:
+                        break
+                    out.write(block)
+                    h.update(block)
+                    left -= len(block)
+                    pos += len(block)
+            if left:
+                break
+    if pos != total:
+        os.remove(out_path)
+        raise ValueError(f"chunks cover {pos} of {total} bytes")
+    return h.hexdigest(), out_path
+
+
+class ChunkFileUploadHandler(FileUploadHandler):
+    """
+    Upload handler that writes one chunk into its own temp file, hashing it as
+    it arrives. Used directly for raw PUT bodies and as
+    request.upload_handlers for multipart bodies.
+    """
+    chunk_size = STREAM_BLOCK
+
+    def __init__(self, path, limit, request=None):
+        super().__init__(request)
+        self.path = path
+        self.limit = limit                # bytes allowed by the declared range
+        self.chunk_hash = hashlib.sha256()
+        self.written = 0
+        self.overflow = False
+        self._fh = None
+
+    def open(self):
+        self._fh = open(self.path, "wb")
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self._fh is None:
+            self.open()
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        room = self.limit - self.written
+        if len(raw_data) > room:
+            self.overflow = True
+            raw_data = raw_data[:room]
+        if raw_data:
+            self._fh.write(raw_data)
+            self.chunk_hash.update(raw_data)
+            self.written += len(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        self.close()
+        return None
+
+    def upload_interrupted(self):
+        self.close()
+
+
+# -----------------------------
+# Endpoints
+# -----------------------------
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@authentication_classes([])
+def chunked_init(request):
+    data = request.data
+    file_name = (data.get("file_name") or "").strip()
+    try:
+        total_size = int(data.get("total_size"))
+    except (TypeError, ValueError):
+        total_size = -1
+    if not file_name or total_size < 0:
+        return Response({"detail": "Send 'file_name' and 'total_size' (bytes)."}, status=400)
+
+    classified = _classify_upload(file_name, data.get("file_type") or None)
+    if classified is None:
+        return Response(
+            {"detail": UNSUPPORTED_TYPE},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
+
+    session = UploadSession.objects.create(
+        file_name=file_name,
+        file_type=classified[0],
+        total_size=total_size,
+        sha256=(data.get("sha256") or "").strip().lower(),
+        fields={k: data.get(k) for k in SIDE_FIELDS if data.get(k) not in (None, "")},
+    )
+
+    os.makedirs(_session_dir(session), exist_ok=True)
+    return Response(_session_state(session), status=201)
+
+
+@api_view(["GET", "PUT", "DELETE"])
+@permission_classes([AllowAny])
+@authentication_classes([])
+def chunked_session(request, session_id):
+    session = get_object_or_404(UploadSession, pk=session_id)
+
+    if request.method == "GET":
+        return Response(_session_state(session))
+
+    if request.method == "DELETE":
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            aborted = session.status == UploadSession.Status.ACTIVE
+            if aborted:
+                session.status = UploadSession.Status.ABORTED
+                session.save(update_fields=["status", "modified_at"])
+        if aborted:
+            shutil.rmtree(_session_dir(session), ignore_errors=True)
+        return Response(status=204)
+
+    # --- PUT one chunk ---
+    # the status is checked under the row lock before and after writing;
+    # completion flips it under the same lock, so no chunk lands after that
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+    if session.status != UploadSession.Status.ACTIVE:
+        return Response({"detail": f"Upload is {session.status}."}, status=409)
+
+    rng = _chunk_range(request, session.total_size)
+    if rng is None:
+        return Response(
+            {"detail": "Send 'Content-Range: bytes <start>-<end>/<total>' or '?offset=<n>' within total_size."},
+            status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        )
+    start, end = rng
+
+    chunk_dir = _session_dir(session)
+    tmp_path = os.path.join(chunk_dir, f".{start}-{uuid.uuid4().hex}.tmp")
+    handler = ChunkFileUploadHandler(tmp_path, end - start, request=request._request)
+    try:
+        if (request.content_type or "").startswith("multipart/form-data"):
+            request._request.upload_handlers = [handler]
+            request.FILES  # parse the body through the handler
+        else:
+            handler.open()
+            stream = request.stream
+            while stream is not None:
+                block = stream.read(STREAM_BLOCK)
+                if not block:
+                    break
+                handler.receive_data_chunk(block, handler.written)
+    except FileNotFoundError:
+        return Response({"detail": "Upload is no longer active."}, status=409)
+    finally:
+        handler.close()
+
+    # Keep what actually reached the disk, even if the body was cut short,
+    # so the client only resends what is missing.
+    try:
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.status != UploadSession.Status.ACTIVE:
+                return Response({"detail": f"Upload is {session.status}."}, status=409)
+            if handler.written:
+                os.replace(tmp_path, os.path.join(chunk_dir, f"{start}-{start + handler.written}.chunk"))
+                session.received = _merge_ranges(session.received, start, start + handler.written)
+                session.save(update_fields=["received", "modified_at"])
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    state = _session_state(session)
+    state["chunk_sha256"] = handler.chunk_hash.hexdigest()
+    if handler.overflow:
+        state["detail"] = "Body is longer than the declared Content-Range; extra bytes were dropped."
+        return Response(state, status=400)
+    return Response(state)
+
+
+def _complete_precheck(session):
+    """
+    The response to send instead of completing session, or None to go ahead.
+    """
+    # Retried completion (e.g. response lost): answer with the same asset.
+    if session.status == UploadSession.Status.COMPLETE and session.asset_id:
+        payload = _payload(session.asset)
+        payload["sha256"] = session.sha256
+        return Response(payload, status=200)
+    if session.status == UploadSession.Status.COMPLETING:
+        if timezone.now() - session.modified_at < timedelta(seconds=COMPLETING_STALE_SECONDS):
+            return Response({"detail": "Upload is already being completed."}, status=409)
+    elif session.status != UploadSession.Status.ACTIVE:
+        return Response({"detail": f"Upload is {session.status}."}, status=409)
+    if not session.is_complete:
+        state = _session_state(session)
+        state["detail"] = "Upload is missing bytes."
+        return Response(state, status=409)
+    return None
+
+
+def _reopen(session):
+    # back to active so the client can resend chunks and complete again
+    UploadSession.objects.filter(pk=session.pk, status=UploadSession.Status.COMPLETING).update(
+        status=UploadSession.Status.ACTIVE, modified_at=timezone.now()
+    )
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@authentication_classes([])
+def chunked_complete(request, session_id):
+    with transaction.atomic():
+        session = get_object_or_404(UploadSession.objects.select_for_update(), pk=session_id)
+        early = _complete_precheck(session)
+        if early is not None:
+            return early
+        # from here on chunk PUTs are refused, so the chunks on disk are final
+        session.status = UploadSession.Status.COMPLETING
+        session.save(update_fields=["status", "modified_at"])
+    started_at = session.modified_at
+
+    # Assemble and hash without holding the row lock: a multi-GB read must not hold it.
+    chunk_dir = _session_dir(session)
+    try:
+        digest, part_path = _assemble(chunk_dir, session.total_size)
+    except (OSError, ValueError) as e:
+        _reopen(session)
+        return Response({"detail": f"Upload could not be assembled ({e}); resend the missing chunks."}, status=409)
+
+    try:
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.status != UploadSession.Status.COMPLETING or session.modified_at != started_at:
+                # a stale-completion retry took over meanwhile
+                return _complete_precheck(session) or Response(
+                    {"detail": "Upload changed while completing; retry."}, status=409
+                )
+
+            if session.sha256 and session.sha256 != digest:
+                _reopen(session)
+                return Response(
+                    {"detail": "Checksum mismatch.", "expected": session.sha256, "actual": digest},
+                    status=422,
+                )
+
+            # side fields from init, overridable at completion
+            extra = {k: request.data.get(k) for k in ("file_name", *SIDE_FIELDS) if request.data.get(k) not in (None, "")}
+            fields = _parse_side_fields({**session.fields, **extra}, session.file_name)
+            classified = _classify_upload(fields["file_name"], session.file_type or None)
+            if classified is None:
+                _reopen(session)
+                return Response(
+                    {"detail": UNSUPPORTED_TYPE},
+                    status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                )
+            ctype, base_subdir = classified
+
+            group, version = AssetGroup.allocate_version(fields["file_name"])
+            versioned_subdir, target_dir = _version_dir(base_subdir, version)
+            # moves the assembled file into place, or drops it if the content is already stored
+            saved_name = blobs.store(digest, target_dir, fields["file_name"], src_path=part_path)
+            saved_rel_path = os.path.join(versioned_subdir, saved_name).replace("\\", "/")
+
+            a = _create_asset(fields, ctype, saved_rel_path, session.total_size, group, version, digest)
+
+            session.status = UploadSession.Status.COMPLETE
+            session.sha256 = digest
+            session.asset = a
+            session.save(update_fields=["status", "sha256", "asset", "modified_at"])
+    except Exception:
+        _reopen(session)
+        raise
+    finally:
+        if os.path.basename(part_path).startswith(".assembled-") and os.path.exists(part_path):
+            os.remove(part_path)
+
+    shutil.rmtree(chunk_dir, ignore_errors=True)
+    payload = _payload(a)
+    payload["sha256"] = digest
+    return Response(payload, status=_created_status(a))
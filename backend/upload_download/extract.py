@@ -0,0 +1,125 @@
+# backend/upload_download/extract.py
+"""
+Metadata extraction from stored files (polygon count, bbox, resolution,
+video duration).
+Runs inline during upload or in a background job (see tasks.py).
+"""
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from PIL import Image
+
+from .gltf import inspect_gltf, format_extents
+from .video_probe import probe_video
+
+
+def asset_path(a):
+    """
+    Absolute path of an asset's stored file (may not exist).
+    """
+    rel = (a.file_location or "").strip()
+    return os.path.join(settings.MEDIA_ROOT, rel.replace("/", os.sep))
+
+
+def glb_stats(full_path: str):
+    """
+    Polygon count, bbox and material/texture stats for a .glb in one pass
+    (header-only, see gltf.py). Falls back to a single trimesh load for
+    files the header parser cannot read.
+    """
+    try:
+        return inspect_gltf(full_path)
+    except Exception as e:
+        print("GLB header parse error, falling back to trimesh:", e)
+
+    try:
+        import trimesh
+        m = trimesh.load(full_path, force="mesh")
+        ext = m.bounding_box.extents  # [x, y, z]
+        return {
+            "polygon_count": int(len(m.faces)),
+            "vertex_count": int(len(m.vertices)),
+            "extents": [float(v) for v in ext],
+        }
+    except Exception as e:
+        print("GLB stats error:", e)
+    return {}
+
+
+def asset_resolution(full_path: str):
+    try:
+        with Image.open(full_path) as im:
+            return f"{int(im.width)}x{int(im.height)}"
+    except Exception:
+        return ""
+
+
+def probe_file(full_path, file_type, file_name):
+    """
+    Auto-detected AssetMetadata fields for a stored file (only the keys that
+    could be determined). Depends on nothing but the file, so it can run in
+    a worker process:
+      - glb / gltf -> polygon_count, resolution = bboxX x bboxY x bboxZ, media_info
+      - image  -> resolution = width x height
+      - video  -> duration, resolution = width x height, media_info (codec, fps, bitrate)
+    """
+    found = {}
+    # a MIME type, or just the category ensure_basic_info() stores ("video")
+    category = (file_type or "").split("/")[0]
+    if (file_name or "").lower().endswith((".glb", ".gltf")):
+        # 🔹 auto polygon count + bbox for .glb / .gltf (single header-only pass)
+        stats = glb_stats(full_path)
+        found["media_info"] = stats
+        if stats.get("polygon_count") is not None:
+            found["polygon_count"] = stats["polygon_count"]
+        found["resolution"] = format_extents(stats.get("extents"))
+    elif category == "image":
+        found["resolution"] = asset_resolution(full_path)
+    elif category == "video":
+        # 🔹 container header only (moov / EBML), no frame decoding
+        info = probe_video(full_path)
+        if info:
+            found["media_info"] = info
+            if info.get("duration_ms"):
+                found["duration"] = timedelta(milliseconds=info["duration_ms"])
+            if info.get("width") and info.get("height"):
+                found["resolution"] = f"{info['width']}x{info['height']}"
+    return found
+
+
+def apply_probe(a, found):
+    """
+    Merge probe_file() results into an AssetMetadata. Client-sent resolution
+    is kept; polygon_count (GLB) and duration (video) are overridden when the
+    file could be read, so the client value is only a fallback.
+    Returns the list of changed fields.
+    """
+    changed = []
+    if "media_info" in found:
+        a.media_info = {**(a.media_info or {}), **found["media_info"]}
+        changed.append("media_info")
+    if "polygon_count" in found:
+        a.polygon_count = found["polygon_count"]
+        changed.append("polygon_count")
+    if found.get("duration"):
+        a.duration = found["duration"]
+        changed.append("duration")
+    if not (a.resolution or "").strip() and found.get("resolution"):
+        a.resolution = found["resolution"]
+        changed.append("resolution")
+    return changed
+
+
+def extract_metadata(a, save=True):
+    """
+    Fill auto-detected fields on an AssetMetadata from its stored file.
+    Returns the list of changed fields.
+    """
+    found = probe_file(asset_path(a), a.file_type, a.file_name)
+    changed = apply_probe(a, found)
+    if save and "media_info" in changed:
+        a.save_media_info(found["media_info"], [f for f in changed if f != "media_info"])
+    elif save and changed:
+        a.save(update_fields=changed)
+    return changed
@@ -0,0 +1,312 @@
+# backend/upload_download/gltf.py
+"""
+Header-only glTF / GLB introspection.
+
+Everything the upload needs (polygon count, vertex count, bounding box,
+material / texture counts, texture bytes) is answered from the JSON chunk:
+accessor `count` and `min`/`max`, transformed by the node hierarchy. The
+binary chunk is only touched (through a read-only mmap, without copying)
+when an exporter left out POSITION min/max.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional
+from urllib.parse import unquote
+
+import numpy as np
+
+GLB_MAGIC = b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+COMPONENT_DTYPES = {5120: "i1", 5121: "u1", 5122: "<i2", 5123: "<u2", 5125: "<u4", 5126: "<f4"}
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+MODE_TRIANGLES, MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN = 4, 5, 6
+
+
+class GLTFError(ValueError):
+    """The file is not a glTF/GLB we can read."""
+
+
+# -----------------------------
+# File layout
+# -----------------------------
+def read_document(path: str):
+    """
+    Return (json_doc, bin_chunk) where bin_chunk is (offset, length) of the
+    GLB binary chunk inside the file, or None. Only the JSON chunk is read.
+    """
+    with open(path, "rb") as fh:
+        head = fh.read(12)
+        if len(head) == 12 and head[:4] == GLB_MAGIC:
+            _, version, total = struct.unpack("<4sII", head)
+            if version != 2:
+                raise GLTFError(f"Unsupported GLB version {version}")
+            json_len, json_type = struct.unpack("<II", fh.read(8))
+            if json_type != CHUNK_JSON:
+                raise GLTFError("First GLB chunk is not JSON")
+            doc = json.loads(fh.read(json_len))
+            bin_chunk = None
+            pos = 20 + json_len
+            if pos + 8 <= total:
+                fh.seek(pos)
+                bin_len, bin_type = struct.unpack("<II", fh.read(8))
+                if bin_type == CHUNK_BIN:
+                    bin_chunk = (pos + 8, bin_len)
+            return doc, bin_chunk
+
+        # .gltf: the whole file is the JSON document
+        fh.seek(0)
+        try:
+            return json.load(fh), None
+        except ValueError as e:
+            raise GLTFError(f"Not a glTF file: {e}") from e
+
+
+class _Buffers:
+    """
+    Lazy, zero-copy access to glTF buffers. Files are mmapped on first use;
+    nothing is opened for documents whose accessors carry min/max.
+    """
+
+    def __init__(self, path: str, doc: dict, bin_chunk):
+        self.path = path
+        self.doc = doc
+        self.bin_chunk = bin_chunk
+        self._maps = {}
+        self._views = {}
+
+    def buffer(self, index: int) -> memoryview:
+        if index in self._views:
+            return self._views[index]
+        buf = self.doc["buffers"][index]
+        uri = buf.get("uri")
+        if uri is None:
+            # GLB-stored buffer: a window onto the BIN chunk
+            if self.bin_chunk is None:
+                raise GLTFError("Buffer refers to missing GLB BIN chunk")
+            offset, length = self.bin_chunk
+            view = memoryview(self._mmap(self.path))[offset:offset + length]
+        elif uri.startswith("data:"):
+            view = memoryview(base64.b64decode(uri.split(",", 1)[1]))
+        else:
+            view = memoryview(self._mmap(_resolve_uri(self.path, uri)))
+        self._views[index] = view
+        return view
+
+    def _mmap(self, file_path: str):
+        if file_path not in self._maps:
+            with open(file_path, "rb") as fh:
+                self._maps[file_path] = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[file_path]
+
+    def accessor_array(self, index: int) -> np.ndarray:
+        """
+        numpy view (no copy) of a non-sparse accessor as shape (count, n).
+        """
+        acc = self.doc["accessors"][index]
+        if "bufferView" not in acc:
+            raise GLTFError("Accessor has no bufferView")
+        bv = self.doc["bufferViews"][acc["bufferView"]]
+        dtype = np.dtype(COMPONENT_DTYPES[acc["componentType"]])
+        ncomp = TYPE_SIZES[acc["type"]]
+        stride = bv.get("byteStride") or dtype.itemsize * ncomp
+        offset = bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
+        return np.ndarray(
+            shape=(acc["count"], ncomp),
+            dtype=dtype,
+            buffer=self.buffer(bv["buffer"]),
+            offset=offset,
+            strides=(stride, dtype.itemsize),
+        )
+
+    def close(self):
+        self._views.clear()
+        for m in self._maps.values():
+            try:
+                m.close()
+            except BufferError:
+                # a numpy view still references the map; GC will release it
+                pass
+        self._maps.clear()
+
+
+def _resolve_uri(path: str, uri: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(path)), unquote(uri))
+
+
+# -----------------------------
+# Scene graph
+# -----------------------------
+def _quat_matrix(q) -> np.ndarray:
+    x, y, z, w = q
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+
+
+def _local_matrix(node: dict) -> np.ndarray:
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=float).reshape(4, 4).T  # glTF is column-major
+    m = np.eye(4)
+    m[:3, :3] = _quat_matrix(node.get("rotation", (0, 0, 0, 1))) * np.array(node.get("scale", (1, 1, 1)))
+    m[:3, 3] = node.get("translation", (0, 0, 0))
+    return m
+
+
+def iter_mesh_instances(doc: dict):
+    """
+    Yield (mesh_index, world_matrix) for every mesh placed in the default
+    scene. Meshes used by several nodes are yielded once per node.
+    """
+    nodes = doc.get("nodes") or []
+    scenes = doc.get("scenes") or []
+    if scenes:
+        roots = scenes[doc.get("scene", 0)].get("nodes", [])
+    elif nodes:
+        children = {c for n in nodes for c in n.get("children", [])}
+        roots = [i for i in range(len(nodes)) if i not in children]
+    else:
+        for i in range(len(doc.get("meshes") or [])):
+            yield i, np.eye(4)
+        return
+
+    stack = [(i, np.eye(4)) for i in roots]
+    seen = set()
+    while stack:
+        idx, parent = stack.pop()
+        if idx in seen:  # a node has one parent; guards against cyclic (invalid) graphs
+            continue
+        seen.add(idx)
+        node = nodes[idx]
+        world = parent @ _local_matrix(node)
+        if "mesh" in node:
+            yield node["mesh"], world
+        stack.extend((c, world) for c in node.get("children", []))
+
+
+def _primitive_faces(doc: dict, prim: dict) -> int:
+    accessors = doc.get("accessors") or []
+    mode = prim.get("mode", MODE_TRIANGLES)
+    if "indices" in prim:
+        count = accessors[prim["indices"]]["count"]
+    elif "POSITION" in prim.get("attributes", {}):
+        count = accessors[prim["attributes"]["POSITION"]]["count"]
+    else:
+        return 0
+    if mode == MODE_TRIANGLES:
+        return count // 3
+    if mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+        return max(count - 2, 0)
+    return 0  # points / lines
+
+
+def _position_bounds(doc: dict, acc_index: int, buffers: _Buffers):
+    acc = doc["accessors"][acc_index]
+    if acc.get("min") and acc.get("max") and len(acc["min"]) >= 3:
+        return np.array(acc["min"][:3], dtype=float), np.array(acc["max"][:3], dtype=float)
+    pos = buffers.accessor_array(acc_index)
+    if not len(pos):
+        return None
+    return pos[:, :3].min(axis=0).astype(float), pos[:, :3].max(axis=0).astype(float)
+
+
+def _corners(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    return np.array([[x, y, z, 1.0] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+
+
+# -----------------------------
+# Public API
+# -----------------------------
+def inspect_gltf(path: str) -> Dict[str, Any]:
+    """
+    Single-pass summary of a .glb / .gltf:
+      polygon_count, vertex_count, bbox_min, bbox_max, extents,
+      mesh_count, material_count, texture_count, image_count, texture_bytes
+    Counts follow the scene graph (an instanced mesh counts once per node),
+    the same way trimesh.load(..., force="mesh") concatenates a scene.
+    """
+    doc, bin_chunk = read_document(path)
+    buffers = _Buffers(path, doc, bin_chunk)
+    meshes = doc.get("meshes") or []
+    accessors = doc.get("accessors") or []
+
+    polygons = vertices = 0
+    lo = np.full(3, np.inf)
+    hi = np.full(3, -np.inf)
+    mesh_bounds = {}  # mesh index -> (lo, hi) in mesh space, computed once per mesh
+
+    try:
+        for mesh_index, world in iter_mesh_instances(doc):
+            prims = meshes[mesh_index].get("primitives", [])
+            for prim in prims:
+                polygons += _primitive_faces(doc, prim)
+                pos = prim.get("attributes", {}).get("POSITION")
+                if pos is not None:
+                    vertices += accessors[pos]["count"]
+
+            if mesh_index not in mesh_bounds:
+                b_lo, b_hi = np.full(3, np.inf), np.full(3, -np.inf)
+                for prim in prims:
+                    pos = prim.get("attributes", {}).get("POSITION")
+                    bounds = _position_bounds(doc, pos, buffers) if pos is not None else None
+                    if bounds is not None:
+                        b_lo, b_hi = np.minimum(b_lo, bounds[0]), np.maximum(b_hi, bounds[1])
+                mesh_bounds[mesh_index] = (b_lo, b_hi) if np.all(np.isfinite(b_lo)) else None
+
+            if mesh_bounds[mesh_index] is not None:
+                pts = (_corners(*mesh_bounds[mesh_index]) @ world.T)[:, :3]
+                lo, hi = np.minimum(lo, pts.min(axis=0)), np.maximum(hi, pts.max(axis=0))
+    finally:
+        buffers.close()
+
+    has_bbox = bool(np.all(np.isfinite(lo)))
+    return {
+        "polygon_count": int(polygons),
+        "vertex_count": int(vertices),
+        "bbox_min": lo.tolist() if has_bbox else None,
+        "bbox_max": hi.tolist() if has_bbox else None,
+        "extents": (hi - lo).tolist() if has_bbox else None,
+        "mesh_count": len(meshes),
+        "material_count": len(doc.get("materials") or []),
+        "texture_count": len(doc.get("textures") or []),
+        "image_count": len(doc.get("images") or []),
+        "texture_bytes": _texture_bytes(path, doc),
+    }
+
+
+def _texture_bytes(path: str, doc: dict) -> int:
+    """
+    Encoded size of all images, from bufferView lengths / data URIs / file sizes.
+    """
+    views = doc.get("bufferViews") or []
+    total = 0
+    for img in doc.get("images") or []:
+        if "bufferView" in img:
+            total += views[img["bufferView"]].get("byteLength", 0)
+        elif img.get("uri", "").startswith("data:"):
+            payload = img["uri"].split(",", 1)[-1]
+            total += len(payload) * 3 // 4 - payload.count("=", -2)
+        elif img.get("uri"):
+            try:
+                total += os.path.getsize(_resolve_uri(path, img["uri"]))
+            except OSError:
+                pass
+    return int(total)
+
+
+def format_extents(extents: Optional[list]) -> str:
+    """
+    "148.0x5.6x140.5" style string stored in AssetMetadata.resolution.
+    """
+    if not extents:
+        return ""
+    return f"{extents[0]:.1f}x{extents[1]:.1f}x{extents[2]:.1f}"
@@ -1,4 +1,6 @@
 # backend/upload_download/models.py
+import uuid
+
 from django.db import models
 from asset_metadata.models import AssetMetadata as _Base
 
@@ -12,3 +14,44 @@ class UploadAsset(_Base):
         app_label = "upload_download"
         verbose_name = "Upload/Download Asset"
         verbose_name_plural = "Upload/Download Assets"
+
+
+class UploadSession(models.Model):
+    """
+    State of one resumable chunked upload (see chunked.py).
+    Chunks are written into MEDIA_ROOT/.uploads/<id>/ and assembled into
+    <type>/<version>/ when the session is finalized.
+    """
+    class Status(models.TextChoices):
+        ACTIVE = "active", "Active"
+        COMPLETING = "completing", "Completing"
+        COMPLETE = "complete", "Complete"
+        ABORTED = "aborted", "Aborted"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=50, blank=True)
+    total_size = models.BigIntegerField()                  # bytes
+    received = models.JSONField(default=list, blank=True)  # merged [start, end) byte ranges on disk
+    sha256 = models.CharField(max_length=64, blank=True)    # expected (from client) or final hash
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.ACTIVE)
+    fields = models.JSONField(default=dict, blank=True)     # side fields sent at init (description, tags, ...)
+    asset = models.ForeignKey(
+        _Base, on_delete=models.SET_NULL, null=True, blank=True, related_name="upload_sessions"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = "upload_download"
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+    @property
+    def received_bytes(self):
+        return sum(end - start for start, end in self.received)
+
+    @property
+    def is_complete(self):
+        return self.total_size == 0 or self.received == [[0, self.total_size]]
@@ -20,6 +20,11 @@ class AssetSerializer(serializers.ModelSerializer):
             "modified_at",
             "modified_by",
             "polygon_count",
+            "media_info",
+            "processing_status",
+            "content_hash",
+            "group",
+            "version",
         )
         
 
@@ -31,6 +36,6 @@ class AssetSerializer(serializers.ModelSerializer):
 
         if "duration" in attrs and "video" not in ftype:
             raise serializers.ValidationError({"duration": "Duration only applies to video files."})
-        if "polygon_count" in attrs and not ftype.endswith("model/gltf-binary") and not ftype.endswith("/glb"):
-            raise serializers.ValidationError({"polygon_count": "Polygon count only applies to .glb files."})
+        if "polygon_count" in attrs and not ftype.endswith(("model/gltf-binary", "model/gltf+json", "/glb")):
+            raise serializers.ValidationError({"polygon_count": "Polygon count only applies to .glb / .gltf files."})
         return attrs
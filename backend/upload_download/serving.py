@@ -0,0 +1,245 @@
+# backend/upload_download/serving.py
+"""
+Serving stored files with HTTP caching and byte ranges.
+
+serve_file() answers GET/HEAD for one file on disk:
+  - ETag / If-None-Match and Last-Modified / If-Modified-Since -> 304
+  - Range (single or multiple) / If-Range                       -> 206
+  - unsatisfiable Range                                         -> 416
+  - Accept-Encoding br / gzip -> precompressed sidecar (see sidecars.py)
+Validators come from stored metadata (content hash, file stat), never from
+reading the file, so a 304 or a seek into a multi-GB video is cheap.
+
+With settings.MEDIA_OFFLOAD set, Django still decides *whether* a file may be
+served, but the bytes are moved by the front web server:
+  "nginx"    -> X-Accel-Redirect: MEDIA_OFFLOAD_PREFIX + <path under MEDIA_ROOT>
+  "sendfile" -> X-Sendfile: <absolute path>   (Apache mod_xsendfile, lighttpd)
+and that server answers Range / conditional requests itself.
+See deploy/nginx.conf.
+"""
+import mimetypes
+import os
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from . import sidecars
+
+STREAM_BLOCK = 64 * 1024
+MAX_RANGES = 16  # more than this (after merging) is served as a plain 200
+
+
+def stat_etag(st):
+    """
+    Strong ETag from size + mtime; for files we have no content hash for.
+    """
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _etag_matches(header, etag, weak=True):
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    norm = (lambda t: t.strip().removeprefix("W/")) if weak else (lambda t: t.strip())
+    return any(norm(t) == norm(etag) for t in header.split(","))
+
+
+def _not_modified(request, etag, mtime):
+    inm = request.headers.get("If-None-Match")
+    if inm is not None:
+        return _etag_matches(inm, etag)  # If-None-Match wins over If-Modified-Since
+    ims = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+    return ims is not None and int(mtime) <= ims
+
+
+def parse_range(header, size):
+    """
+    Parse a `Range: bytes=...` header into merged, sorted [(start, end)]
+    (inclusive). Returns None if the header should be ignored (absent,
+    malformed, not bytes) and [] if no range is satisfiable.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    ranges = []
+    for spec in header[6:].split(","):
+        spec = spec.strip()
+        if not spec:
+            continue
+        first, sep, last = spec.partition("-")
+        if not sep:
+            return None
+        try:
+            if first == "":                 # suffix: last N bytes
+                n = int(last)
+                if n <= 0:
+                    continue
+                start, end = max(size - n, 0), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and end < start:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, end))
+
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _read_range(fh, start, end):
+    fh.seek(start)
+    left = end - start + 1
+    while left > 0:
+        block = fh.read(min(STREAM_BLOCK, left))
+        if not block:
+            break
+        left -= len(block)
+        yield block
+
+
+def _single_range_body(path, start, end):
+    with open(path, "rb") as fh:
+        yield from _read_range(fh, start, end)
+
+
+def _multipart_parts(ranges, size, content_type, boundary):
+    heads = [
+        (f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+         f"Content-Range: bytes {s}-{e}/{size}\r\n\r\n").encode("latin-1")
+        for s, e in ranges
+    ]
+    tail = f"\r\n--{boundary}--\r\n".encode("latin-1")
+    length = sum(len(h) + (e - s + 1) + 2 for h, (s, e) in zip(heads, ranges)) + len(tail) - 2
+    return heads, tail, length
+
+
+def _multipart_body(path, ranges, heads, tail):
+    with open(path, "rb") as fh:
+        for i, (head, (start, end)) in enumerate(zip(heads, ranges)):
+            yield (b"\r\n" if i else b"") + head
+            yield from _read_range(fh, start, end)
+        yield tail
+
+
+def offload_response(full_path, content_type):
+    """
+    Empty response telling the front server to send full_path, or None when
+    offloading is off.
+    """
+    mode = getattr(settings, "MEDIA_OFFLOAD", None)
+    if not mode:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if mode == "nginx":
+        rel = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, "/")
+        prefix = getattr(settings, "MEDIA_OFFLOAD_PREFIX", "/protected-media/")
+        response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(rel)
+    elif mode == "sendfile":
+        response["X-Sendfile"] = os.path.abspath(full_path)
+    else:
+        raise ImproperlyConfigured(f"Unknown MEDIA_OFFLOAD mode {mode!r} (use 'nginx', 'sendfile' or None).")
+    return response
+
+
+def serve_file(request, full_path, *, etag=None, content_type=None, as_attachment=False, filename=None):
+    """
+    Response for GET/HEAD of full_path honouring conditional, Range and
+    Accept-Encoding headers. `etag` (quoted) defaults to a stat-based one.
+    Raises FileNotFoundError if the file is gone.
+    """
+    if not content_type:
+        content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+    offloaded = offload_response(full_path, content_type)
+    if offloaded is not None:
+        # the front server's own ETag / Last-Modified apply (it sees the same file)
+        if as_attachment or filename:
+            offloaded["Content-Disposition"] = content_disposition_header(
+                as_attachment, filename or os.path.basename(full_path)
+            )
+        return offloaded
+
+    negotiated = sidecars.is_compressible(full_path, content_type)
+    picked = sidecars.pick(full_path, request.headers.get("Accept-Encoding"), content_type) if negotiated else None
+    display_name = filename or os.path.basename(full_path)
+    encoding = None
+    if picked:
+        # same content type and name, but a different representation -> own ETag
+        full_path, encoding = picked
+        etag = f'"{etag.strip(chr(34))}-{encoding}"' if etag else None
+
+    st = os.stat(full_path)
+    size = st.st_size
+    etag = etag or stat_etag(st)
+    last_modified = http_date(st.st_mtime)
+
+    def finish(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = last_modified
+        response["Accept-Ranges"] = "bytes"
+        if negotiated:
+            patch_vary_headers(response, ["Accept-Encoding"])
+        if encoding and response.status_code != 304:
+            response["Content-Encoding"] = encoding
+        if as_attachment or filename:
+            response["Content-Disposition"] = content_disposition_header(as_attachment, display_name)
+        return response
+
+    if _not_modified(request, etag, st.st_mtime):
+        return finish(HttpResponseNotModified())
+
+    ranges = None
+    if request.method == "GET":
+        ranges = parse_range(request.headers.get("Range"), size)
+        if_range = request.headers.get("If-Range")
+        if ranges is not None and if_range:
+            # only partial content of the *same* representation; otherwise send it all
+            if if_range.strip().startswith(('"', 'W/"')):
+                valid = not if_range.strip().startswith("W/") and _etag_matches(if_range, etag, weak=False)
+            else:
+                valid = parse_http_date_safe(if_range) == int(st.st_mtime)
+            if not valid:
+                ranges = None
+
+    if ranges == []:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return finish(response)
+
+    if ranges is None or len(ranges) > MAX_RANGES:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+        return finish(response)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(
+            _single_range_body(full_path, start, end), status=206, content_type=content_type
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+        return finish(response)
+
+    boundary = uuid.uuid4().hex
+    heads, tail, length = _multipart_parts(ranges, size, content_type, boundary)
+    response = StreamingHttpResponse(
+        _multipart_body(full_path, ranges, heads, tail),
+        status=206,
+        content_type=f"multipart/byteranges; boundary={boundary}",
+    )
+    response["Content-Length"] = str(length)
+    return finish(response)
@@ -0,0 +1,197 @@
+# backend/upload_download/sidecars.py
+"""
+Precompressed copies of text-heavy files, stored next to them:
+
+    model/3/scene.gltf      original
+    model/3/scene.gltf.br   brotli   (only if the `brotli` package is installed)
+    model/3/scene.gltf.gz   gzip
+
+They are made by the "sidecars" job, at ingest or queued by the first request
+that finds them missing (that request gets the original bytes), and served
+by serve_file() when the client's Accept-Encoding allows. The names match
+nginx gzip_static / brotli_static, so the same files work with MEDIA_OFFLOAD.
+Already compressed payloads (JPEG, PNG, MP4, GLB with its embedded textures,
+...) are skipped by type, and a sidecar that would not save at least
+MIN_SAVING is not kept. The job records the encodings it kept in
+media_info["sidecars"], so a file that did not compress is not queued again.
+"""
+import gzip
+import mimetypes
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Optional brotli support
+try:
+    import brotli  # type: ignore
+    _HAS_BROTLI = True
+except Exception:
+    _HAS_BROTLI = False
+
+BLOCK = 1024 * 1024
+MIN_SAVING = 0.10
+
+# best first
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "model/gltf+json",
+    "model/obj",
+    "model/stl",
+    "image/svg+xml",
+}
+COMPRESSIBLE_EXTENSIONS = (".gltf", ".bin", ".obj", ".mtl", ".ply", ".stl", ".usda", ".dae", ".fbx")
+
+REQUEST_TTL = 3600   # seconds before a miss on the same file may queue the job again
+
+
+def is_compressible(full_path, content_type=None):
+    content_type = content_type or mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES:
+        return True
+    return full_path.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def available_encodings():
+    return [(enc, ext) for enc, ext in ENCODINGS if enc != "br" or _HAS_BROTLI]
+
+
+def accepted(header):
+    """
+    Encodings from an Accept-Encoding header with q > 0.
+    """
+    result = set()
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for p in params.split(";"):
+            key, _, value = p.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            result.add(name)
+    if "*" in result:
+        result.update(enc for enc, _ in ENCODINGS)
+    return result
+
+
+def _compress_to(full_path, dest, encoding, size):
+    tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(full_path, "rb") as src, open(tmp, "wb") as out:
+            if encoding == "gzip":
+                with gzip.GzipFile(filename="", mode="wb", fileobj=out, compresslevel=9, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, BLOCK)
+            else:
+                # quality 11 is slow on big files; 9 is close in size
+                comp = brotli.Compressor(quality=11 if size < 16 * 1024 * 1024 else 9)
+                for block in iter(lambda: src.read(BLOCK), b""):
+                    out.write(comp.process(block))
+                out.write(comp.finish())
+        if os.path.getsize(tmp) > size * (1 - MIN_SAVING):
+            os.remove(tmp)
+            return False
+        os.replace(tmp, dest)
+        return True
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def build_sidecars(full_path, content_type=None):
+    """
+    (Re)write the .br / .gz files for full_path. Returns the encodings kept.
+    """
+    if not is_compressible(full_path, content_type):
+        return []
+    st = os.stat(full_path)
+    kept = []
+    for encoding, ext in available_encodings():
+        if _compress_to(full_path, full_path + ext, encoding, st.st_size):
+            kept.append(encoding)
+        else:
+            _remove(full_path + ext)
+    return kept
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def remove_sidecars(full_path):
+    for _, ext in ENCODINGS:
+        _remove(full_path + ext)
+
+
+def move_sidecars(old_path, new_path):
+    """
+    Follow a rename of the original (mtimes are kept, so they stay fresh).
+    """
+    for _, ext in ENCODINGS:
+        if os.path.exists(old_path + ext):
+            try:
+                os.replace(old_path + ext, new_path + ext)
+            except OSError:
+                _remove(old_path + ext)
+
+
+def _fresh(sidecar, src_mtime_ns):
+    try:
+        return os.stat(sidecar).st_mtime_ns >= src_mtime_ns
+    except OSError:
+        return False
+
+
+def _request_build(full_path, mtime_ns):
+    """
+    Queue the sidecars job for the asset stored at full_path, unless it ran
+    already or was asked for recently. Never compresses in the request.
+    """
+    if not cache.add(f"sidecars-requested:{full_path}:{mtime_ns}", 1, REQUEST_TTL):
+        return
+    from asset_metadata import jobs
+    from asset_metadata.models import AssetMetadata, AssetJob
+
+    rel = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, "/")
+    asset = AssetMetadata.objects.filter(file_location=rel).only("pk", "media_info").first()
+    if asset is None or "sidecars" in (asset.media_info or {}):
+        return  # not an asset, or the job found it not worth compressing
+    pending = AssetJob.objects.filter(
+        asset=asset, kind="sidecars", status__in=[AssetJob.Status.QUEUED, AssetJob.Status.RUNNING]
+    )
+    if not pending.exists():
+        jobs.enqueue_many([asset], "sidecars")
+
+
+def pick(full_path, accept_encoding, content_type=None):
+    """
+    (sidecar_path, encoding) to send for this Accept-Encoding, or None for
+    the original bytes. A miss queues the sidecars job for next time.
+    """
+    if not is_compressible(full_path, content_type):
+        return None
+    wanted = accepted(accept_encoding)
+    choices = [(enc, ext) for enc, ext in available_encodings() if enc in wanted]
+    if not choices:
+        return None
+
+    st = os.stat(full_path)
+    for encoding, ext in choices:
+        if _fresh(full_path + ext, st.st_mtime_ns):
+            return full_path + ext, encoding
+    _request_build(full_path, st.st_mtime_ns)
+    return None
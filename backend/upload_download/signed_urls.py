@@ -0,0 +1,140 @@
+# backend/upload_download/signed_urls.py
+"""
+Signed, expiring file URLs.
+
+    /api/files/<token>/<file name>
+
+The token is an HMAC-signed (django.core.signing, keyed by SECRET_KEY)
+payload holding the storage path under MEDIA_ROOT, its expiry and what it
+allows (inline view or attachment download). List / preview endpoints mint
+them; serve_signed() checks the signature and serves the file without any
+database or session lookup, so download traffic never touches Postgres.
+
+Expiries are rounded up to SIGNED_URL_BUCKET so the same file gets the same
+URL for a while and browsers can cache thumbnails.
+"""
+import math
+import os
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponseForbidden
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+from .serving import serve_file
+
+SALT = "upload_download.signed-file"
+
+
+def _normalise(rel_path):
+    rel = (rel_path or "").replace("\\", "/").lstrip("/")
+    if not rel or ".." in rel.split("/"):
+        return None
+    return rel
+
+
+def url_epoch(ttl=None):
+    """
+    The expiry written into tokens minted now; every URL changes when it does
+    (once per SIGNED_URL_BUCKET), so response validators include it.
+    """
+    ttl = ttl or getattr(settings, "SIGNED_URL_TTL", 3600)
+    bucket = getattr(settings, "SIGNED_URL_BUCKET", 600)
+    return math.ceil((time.time() + ttl) / bucket) * bucket
+
+
+def make_token(rel_path, *, attachment=False, name=None, content_hash="", ttl=None, directory=False):
+    payload = {"p": rel_path, "x": url_epoch(ttl)}
+    if directory:
+        payload["dir"] = 1  # any file directly inside rel_path, picked by the URL's name
+    if attachment:
+        payload["d"] = 1
+        if name and name != os.path.basename(rel_path):
+            payload["n"] = name
+    if content_hash:
+        payload["h"] = content_hash  # ETag without a DB read
+    # plain Signer (no timestamp): identical payloads give identical tokens
+    return signing.Signer(salt=SALT).sign_object(payload, compress=True)
+
+
+def signed_url(rel_path, *, name=None, attachment=False, content_hash="", ttl=None):
+    """
+    Relative URL for a file under MEDIA_ROOT, or None if there is no usable path.
+    """
+    rel = _normalise(rel_path)
+    if rel is None:
+        return None
+    token = make_token(rel, attachment=attachment, name=name, content_hash=content_hash, ttl=ttl)
+    # the trailing name is only cosmetic (saved file name in browsers); it is not trusted
+    name = (name or os.path.basename(rel)).replace("/", "_")
+    return reverse("signed_file", kwargs={"token": token, "name": name})
+
+
+def asset_download_url(asset):
+    return signed_url(
+        asset.file_location, name=asset.file_name, attachment=True, content_hash=asset.content_hash
+    )
+
+
+def media_url(abs_or_rel_path, dir_scoped=False):
+    """
+    Signed inline URL for a path (absolute under MEDIA_ROOT, or relative to it).
+    dir_scoped: the token covers the file's whole directory, so sibling files
+    (e.g. the sprite a WebVTT track refers to) resolve as relative URLs and
+    all derivatives of one preview dir share a token.
+    """
+    if not abs_or_rel_path:
+        return None
+    path = str(abs_or_rel_path)
+    if os.path.isabs(path):
+        path = os.path.relpath(path, settings.MEDIA_ROOT)
+    if not dir_scoped:
+        return signed_url(path)
+    rel = _normalise(path)
+    if rel is None or "/" not in rel:
+        return None
+    folder, name = rel.rsplit("/", 1)
+    token = make_token(folder, directory=True)
+    return reverse("signed_file", kwargs={"token": token, "name": name})
+
+
+@require_safe
+def serve_signed(request, token, name=None):
+    """
+    Plain Django view (no DRF auth, no session, no ORM): the token is the permission.
+    """
+    try:
+        payload = signing.Signer(salt=SALT).unsign_object(token)
+    except signing.BadSignature:
+        return HttpResponseForbidden("Invalid link.")
+    if payload.get("x", 0) < time.time():
+        return HttpResponseForbidden("Link expired.")
+
+    rel = _normalise(payload.get("p"))
+    if rel is not None and payload.get("dir"):
+        if not name or name.startswith(".") or "/" in name or "\\" in name:
+            return HttpResponseForbidden("Invalid link.")
+        rel = f"{rel}/{name}"
+    if rel is None:
+        return HttpResponseForbidden("Invalid link.")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, rel)
+    except (SuspiciousFileOperation, ValueError):
+        return HttpResponseForbidden("Invalid link.")
+
+    etag = f'"{payload["h"]}"' if payload.get("h") else None
+    try:
+        response = serve_file(
+            request, full_path, etag=etag,
+            as_attachment=bool(payload.get("d")),
+            filename=(payload.get("n") or os.path.basename(rel)) if payload.get("d") else None,
+        )
+    except (FileNotFoundError, IsADirectoryError):
+        raise Http404("File not found on server")
+    # shared caches must not keep it past the link's lifetime
+    response["Cache-Control"] = f"private, max-age={max(0, int(payload['x'] - time.time()))}"
+    return response
@@ -0,0 +1,21 @@
+# backend/upload_download/tasks.py
+# Background job handlers (run by manage.py run_asset_workers)
+from asset_metadata import jobs
+from .extract import extract_metadata, asset_path
+from .sidecars import build_sidecars, is_compressible
+
+
+@jobs.register("extract")
+def extract(asset):
+    extract_metadata(asset)
+
+
+@jobs.register("sidecars")
+def sidecars(asset):
+    # .br / .gz next to text-heavy files (gltf, obj, json); no-op for media types
+    path = asset_path(asset)
+    if not is_compressible(path, asset.file_type) or "sidecars" in (asset.media_info or {}):
+        return  # nothing to do, or already built (a re-run previews job chains this again)
+    kept = build_sidecars(path, asset.file_type)
+    # recorded even when empty: serve-time misses then know not to queue it again
+    asset.save_media_info({"sidecars": kept})
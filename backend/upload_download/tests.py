@@ -0,0 +1,817 @@
+# backend/upload_download/tests.py
+import gzip
+import hashlib
+import http.client
+import importlib
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import Resolver404, URLResolver, re_path
+from django.urls.resolvers import RegexPattern
+
+from asset_metadata import blobs
+from asset_metadata.models import AssetMetadata, Blob
+from backend.urls import urlpatterns as project_urlpatterns
+from . import views
+from . import batch, bulk, serving, signed_urls, tasks, video_probe
+from .chunked import ChunkFileUploadHandler
+from .gltf import GLTFError, format_extents, inspect_gltf
+from .models import UploadSession
+
+OFFLOAD_PREFIX = "/protected-media/"
+
+# project URLs + /media/ (which backend/urls.py only mounts when DEBUG is on
+# at import time)
+urlpatterns = project_urlpatterns + [re_path(r"^media/(?P<path>.*)$", views.serve_media)]
+
+
+class NginxStandIn:
+    """
+    Minimal stand-in for deploy/nginx.conf: proxies every request to the
+    Django live server and, when the upstream answers with X-Accel-Redirect,
+    replaces the (empty) body with the file from the `internal` location.
+    """
+
+    def __init__(self, upstream_url, media_root):
+        upstream = urlsplit(upstream_url)
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith(OFFLOAD_PREFIX):
+                    return self._send(404, {}, b"")  # `internal;`: not reachable directly
+
+                conn = http.client.HTTPConnection(upstream.hostname, upstream.port, timeout=10)
+                conn.request("GET", self.path, headers={"Host": self.headers.get("Host", "localhost")})
+                resp = conn.getresponse()
+                body = resp.read()
+                headers = {k: v for k, v in resp.getheaders() if k.lower() not in ("content-length", "connection")}
+                conn.close()
+
+                redirect = headers.pop("X-Accel-Redirect", None)
+                if redirect is None:
+                    return self._send(resp.status, headers, body)
+                stand_in.redirects.append((redirect, body))
+                rel = unquote(redirect[len(OFFLOAD_PREFIX):])
+                with open(os.path.join(media_root, rel), "rb") as fh:
+                    self._send(200, headers, fh.read())
+
+            def _send(self, code, headers, body):
+                self.send_response(code)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.redirects = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get(self, path):
+        conn = http.client.HTTPConnection(*self.server.server_address, timeout=10)
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        body = resp.read()
+        conn.close()
+        return resp, body
+
+
+@override_settings(
+    # the live server answers MEDIA_URL by itself: move it out of the way of /media/
+    ROOT_URLCONF=__name__, MEDIA_URL="/live-server-media/", MEDIA_OFFLOAD="nginx", MEDIA_OFFLOAD_PREFIX=OFFLOAD_PREFIX
+)
+class MediaOffloadTests(LiveServerTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.data = os.urandom(64 * 1024)
+        os.makedirs(os.path.join(self.media_root, "video", "1"))
+        with open(os.path.join(self.media_root, "video", "1", "clip one.mp4"), "wb") as fh:
+            fh.write(self.data)
+        self.asset = AssetMetadata.objects.create(
+            file_name="clip one.mp4", file_type="video/mp4", file_location="video/1/clip one.mp4"
+        )
+
+    def test_download_is_sent_by_front_server(self):
+        with NginxStandIn(self.live_server_url, settings.MEDIA_ROOT) as nginx:
+            resp, body = nginx.get(f"/api/download/{self.asset.pk}/")
+
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(body, self.data)
+        self.assertIn("attachment", resp.getheader("Content-Disposition"))
+        self.assertEqual(resp.getheader("Content-Type"), "video/mp4")
+        # Django only named the file; it did not stream it
+        self.assertEqual(nginx.redirects, [(f"{OFFLOAD_PREFIX}video/1/clip%20one.mp4", b"")])
+
+    def test_media_url_is_sent_by_front_server(self):
+        with NginxStandIn(self.live_server_url, settings.MEDIA_ROOT) as nginx:
+            resp, body = nginx.get("/media/video/1/clip%20one.mp4")
+            missing, _ = nginx.get("/media/video/1/nope.mp4")
+            direct, _ = nginx.get(f"{OFFLOAD_PREFIX}video/1/clip%20one.mp4")
+
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(body, self.data)
+        self.assertEqual(len(nginx.redirects), 1)
+        self.assertEqual(missing.status, 404)   # Django still decides what exists / is allowed
+        self.assertEqual(direct.status, 404)
+
+    def test_media_url_never_serves_upload_scratch_or_blobs(self):
+        for rel in (".uploads/0f1e/0-10.chunk", ".uploads/0f1e.part", "blobs/ab/cd/" + "ab" * 32):
+            os.makedirs(os.path.join(self.media_root, os.path.dirname(rel)), exist_ok=True)
+            with open(os.path.join(self.media_root, rel), "wb") as fh:
+                fh.write(b"private")
+        with NginxStandIn(self.live_server_url, settings.MEDIA_ROOT) as nginx:
+            statuses = [nginx.get(f"/media/{rel}")[0].status for rel in (
+                ".uploads/0f1e/0-10.chunk", ".uploads/0f1e.part", "video/1/../../.uploads/0f1e.part",
+                "blobs/ab/cd/" + "ab" * 32,
+            )]
+        self.assertEqual(statuses, [404] * 4)
+        self.assertEqual(nginx.redirects, [])
+
+    def test_media_url_is_not_mounted_outside_debug(self):
+        import backend.urls
+        with override_settings(DEBUG=False):
+            patterns = importlib.reload(backend.urls).urlpatterns
+        self.addCleanup(importlib.reload, backend.urls)
+        with self.assertRaises(Resolver404):
+            URLResolver(RegexPattern(r"^/"), patterns).resolve("/media/.uploads/0f1e.part")
+
+    def test_offload_off_streams_from_django(self):
+        with override_settings(MEDIA_OFFLOAD=None), NginxStandIn(self.live_server_url, settings.MEDIA_ROOT) as nginx:
+            resp, body = nginx.get(f"/api/download/{self.asset.pk}/")
+
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(body, self.data)
+        self.assertEqual(nginx.redirects, [])
+
+
+def write_glb(path, doc, binary=b""):
+    """
+    Minimal GLB 2.0 writer for test fixtures (JSON chunk + optional BIN chunk).
+    """
+    js = json.dumps(doc).encode()
+    js += b" " * (-len(js) % 4)
+    binary += b"\0" * (-len(binary) % 4)
+    chunks = struct.pack("<II", len(js), 0x4E4F534A) + js
+    if binary:
+        chunks += struct.pack("<II", len(binary), 0x004E4942) + binary
+    with open(path, "wb") as fh:
+        fh.write(struct.pack("<4sII", b"glTF", 2, 12 + len(chunks)) + chunks)
+
+
+def triangle_doc(positions, with_bounds=True, nodes=None):
+    """
+    glTF document for one mesh holding one triangle, placed by `nodes`.
+    """
+    accessor = {"bufferView": 0, "componentType": 5126, "count": 3, "type": "VEC3"}
+    if with_bounds:
+        accessor["min"] = positions.min(axis=0).tolist()
+        accessor["max"] = positions.max(axis=0).tolist()
+    nodes = nodes or [{"mesh": 0}]
+    return {
+        "asset": {"version": "2.0"},
+        "scene": 0,
+        "scenes": [{"nodes": list(range(len(nodes)))}],
+        "nodes": nodes,
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0}}]}],
+        "accessors": [accessor],
+        "bufferViews": [{"buffer": 0, "byteLength": positions.nbytes}],
+        "buffers": [{"byteLength": positions.nbytes}],
+    }
+
+
+class GLTFInspectTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.path = os.path.join(self.dir, "m.glb")
+        self.tri = np.array([[0, 0, 0], [1, 0, 0], [0, 2, 0]], dtype="<f4")
+
+    def test_matches_trimesh_for_exported_scene(self):
+        import trimesh
+        box = trimesh.creation.box(extents=(2.0, 3.0, 4.0))
+        box.export(self.path)
+
+        stats = inspect_gltf(self.path)
+        loaded = trimesh.load(self.path, force="mesh")
+        self.assertEqual(stats["polygon_count"], len(loaded.faces))
+        self.assertEqual(stats["vertex_count"], len(loaded.vertices))
+        np.testing.assert_allclose(stats["extents"], loaded.bounding_box.extents, atol=1e-5)
+
+    def test_instanced_mesh_counts_once_per_node(self):
+        nodes = [{"mesh": 0}, {"mesh": 0, "translation": [10, 0, 0], "scale": [2, 2, 2]}]
+        write_glb(self.path, triangle_doc(self.tri, nodes=nodes), self.tri.tobytes())
+
+        stats = inspect_gltf(self.path)
+        self.assertEqual((stats["polygon_count"], stats["vertex_count"], stats["mesh_count"]), (2, 6, 1))
+        self.assertEqual(stats["bbox_min"], [0.0, 0.0, 0.0])
+        self.assertEqual(stats["bbox_max"], [12.0, 4.0, 0.0])
+
+    def test_bounds_read_from_buffer_without_min_max(self):
+        write_glb(self.path, triangle_doc(self.tri, with_bounds=False), self.tri.tobytes())
+        self.assertEqual(inspect_gltf(self.path)["extents"], [1.0, 2.0, 0.0])
+
+    def test_not_a_gltf(self):
+        with open(self.path, "wb") as fh:
+            fh.write(b"definitely not json")
+        with self.assertRaises(GLTFError):
+            inspect_gltf(self.path)
+
+    def test_format_extents(self):
+        self.assertEqual(format_extents([148.04, 5.6, 140.5]), "148.0x5.6x140.5")
+        self.assertEqual(format_extents(None), "")
+
+
+def mp4_box(kind, *payload):
+    body = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def write_mp4(path, seconds=10, fps=25, size=(1280, 720), moov_last=True):
+    """
+    ISO BMFF file with just the boxes the header probe reads (no media data).
+    """
+    w, h = size
+    mvhd = mp4_box(b"mvhd", struct.pack(">IIIII", 0, 0, 0, 1000, seconds * 1000), bytes(80))
+    tkhd = mp4_box(b"tkhd", bytes(76), struct.pack(">II", w << 16, h << 16))
+    mdhd = mp4_box(b"mdhd", struct.pack(">IIIII", 0, 0, 0, 12800, seconds * 12800), bytes(4))
+    hdlr = mp4_box(b"hdlr", bytes(8), b"vide", bytes(13))
+    stsd = mp4_box(b"stsd", struct.pack(">II", 0, 1), struct.pack(">I4s", 86, b"avc1"), bytes(78))
+    stts = mp4_box(b"stts", struct.pack(">IIII", 0, 1, seconds * fps, 512))
+    trak = mp4_box(b"trak", tkhd, mp4_box(b"mdia", mdhd, hdlr, mp4_box(b"minf", mp4_box(b"stbl", stsd, stts))))
+    moov = mp4_box(b"moov", mvhd, trak)
+    ftyp = mp4_box(b"ftyp", b"isom", bytes(4), b"isomavc1")
+    mdat = mp4_box(b"mdat", bytes(4096))
+    with open(path, "wb") as fh:
+        fh.write(ftyp + (mdat + moov if moov_last else moov + mdat))
+
+
+def ebml(eid, *payload):
+    body = b"".join(payload)
+    id_bytes = eid.to_bytes((eid.bit_length() + 7) // 8, "big")
+    size = (0x80 | len(body)).to_bytes(1, "big") if len(body) < 127 else (0x4000 | len(body)).to_bytes(2, "big")
+    return id_bytes + size + body
+
+
+def write_webm(path):
+    """
+    EBML header + Segment(Info, Tracks) for a 2 s, 24 fps, 640x360 VP9 track.
+    """
+    header = ebml(video_probe.EBML_HEADER, ebml(video_probe.DOC_TYPE, b"webm"))
+    info = ebml(video_probe.INFO,
+                ebml(video_probe.TIMECODE_SCALE, (1_000_000).to_bytes(3, "big")),
+                ebml(video_probe.DURATION, struct.pack(">d", 2000.0)))
+    track = ebml(video_probe.TRACK_ENTRY,
+                 ebml(video_probe.TRACK_TYPE, b"\x01"),
+                 ebml(video_probe.CODEC_ID, b"V_VP9"),
+                 ebml(video_probe.DEFAULT_DURATION, (41_666_667).to_bytes(4, "big")),
+                 ebml(video_probe.VIDEO, ebml(video_probe.PIXEL_WIDTH, (640).to_bytes(2, "big")),
+                      ebml(video_probe.PIXEL_HEIGHT, (360).to_bytes(2, "big"))))
+    segment = ebml(video_probe.SEGMENT, info, ebml(video_probe.TRACKS, track))
+    with open(path, "wb") as fh:
+        fh.write(header + segment)
+
+
+class VideoProbeTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def test_mp4_header(self):
+        path = os.path.join(self.dir, "clip.mp4")
+        write_mp4(path)
+        info = video_probe.probe_mp4(path)
+        self.assertEqual(
+            {k: info[k] for k in ("container", "duration_ms", "width", "height", "video_codec", "frame_rate")},
+            {"container": "mp4", "duration_ms": 10000, "width": 1280, "height": 720,
+             "video_codec": "avc1", "frame_rate": 25.0},
+        )
+        self.assertEqual(info["bitrate"], os.path.getsize(path) * 8 // 10)
+
+    def test_mp4_moov_before_mdat(self):
+        path = os.path.join(self.dir, "fast.mp4")
+        write_mp4(path, seconds=3, fps=30, moov_last=False)
+        info = video_probe.probe_mp4(path)
+        self.assertEqual((info["duration_ms"], info["frame_rate"]), (3000, 30.0))
+
+    def test_webm_header(self):
+        path = os.path.join(self.dir, "clip.webm")
+        write_webm(path)
+        info = video_probe.probe_matroska(path)
+        self.assertEqual(
+            (info["container"], info["duration_ms"], info["width"], info["height"], info["video_codec"]),
+            ("webm", 2000, 640, 360, "V_VP9"),
+        )
+        self.assertAlmostEqual(info["frame_rate"], 24.0, places=2)
+
+    def test_probe_video_skips_ffmpeg_when_header_has_duration(self):
+        path = os.path.join(self.dir, "clip.webm")
+        write_webm(path)
+        with mock.patch.object(video_probe, "probe_ffmpeg") as ffmpeg:
+            self.assertEqual(video_probe.probe_video(path)["duration_ms"], 2000)
+        ffmpeg.assert_not_called()
+
+    def test_unreadable_header_raises(self):
+        path = os.path.join(self.dir, "junk.mp4")
+        with open(path, "wb") as fh:
+            fh.write(b"\0" * 256)
+        with self.assertRaises(video_probe.ProbeError):
+            video_probe.probe_matroska(path)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        cases = [
+            (None, None),
+            ("items=0-1", None),
+            ("bytes=abc", None),
+            ("bytes=5-2", None),
+            ("bytes=0-99", [(0, 99)]),
+            ("bytes=900-", [(900, 999)]),
+            ("bytes=-100", [(900, 999)]),
+            ("bytes=-5000", [(0, 999)]),
+            ("bytes=950-2000", [(950, 999)]),
+            ("bytes=0-9, 10-19, 50-59", [(0, 19), (50, 59)]),   # adjacent ranges merge
+            ("bytes=50-59, 0-9", [(0, 9), (50, 59)]),
+            ("bytes=1000-", []),                                   # nothing satisfiable
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(serving.parse_range(header, 1000), expected)
+
+
+@override_settings(MEDIA_OFFLOAD=None)
+class ServeFileTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.path = os.path.join(self.dir, "data.bin")
+        self.data = bytes(range(256)) * 40
+        with open(self.path, "wb") as fh:
+            fh.write(self.data)
+        self.factory = RequestFactory()
+
+    def get(self, **headers):
+        response = serving.serve_file(self.factory.get("/f", headers=headers), self.path)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_full_body_with_validators(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, self.data))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertTrue(response["ETag"].startswith('"'))
+
+    def test_not_modified(self):
+        first, _ = self.get()
+        self.assertEqual(self.get(If_None_Match=first["ETag"])[0].status_code, 304)
+        self.assertEqual(self.get(If_None_Match=f'"other", W/{first["ETag"]}')[0].status_code, 304)
+        self.assertEqual(self.get(If_Modified_Since=first["Last-Modified"])[0].status_code, 304)
+        # If-None-Match takes precedence over If-Modified-Since
+        response, _ = self.get(If_None_Match='"other"', If_Modified_Since=first["Last-Modified"])
+        self.assertEqual(response.status_code, 200)
+
+    def test_single_range(self):
+        response, body = self.get(Range="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.data[100:200])
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.data)}")
+        self.assertEqual(response["Content-Length"], "100")
+
+    def test_multiple_ranges(self):
+        response, body = self.get(Range="bytes=0-9,-10")
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response["Content-Type"].startswith("multipart/byteranges; boundary="))
+        self.assertEqual(int(response["Content-Length"]), len(body))
+        self.assertIn(self.data[:10], body)
+        self.assertIn(f"Content-Range: bytes {len(self.data) - 10}-{len(self.data) - 1}/{len(self.data)}".encode(), body)
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(Range=f"bytes={len(self.data)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_if_range(self):
+        etag = self.get()[0]["ETag"]
+        self.assertEqual(self.get(Range="bytes=0-9", If_Range=etag)[0].status_code, 206)
+        response, body = self.get(Range="bytes=0-9", If_Range='"stale"')
+        self.assertEqual((response.status_code, body), (200, self.data))
+        self.assertEqual(self.get(Range="bytes=0-9", If_Range=f"W/{etag}")[0].status_code, 200)
+
+
+class ZipStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as fh:
+            fh.write(data)
+        return path
+
+    def test_round_trip(self):
+        video = os.urandom(20000)
+        text = b"model data " * 2000
+        entries = [
+            ("clip.mp4", self.write("clip.mp4", video), zipfile.ZIP_STORED),
+            ("missing.glb", os.path.join(self.dir, "missing.glb"), zipfile.ZIP_DEFLATED),   # skipped
+            ("m.gltf", self.write("m.gltf", text), zipfile.ZIP_DEFLATED),
+        ]
+        with mock.patch.object(bulk, "COPY_BLOCK", 1024), self.assertLogs("upload_download.bulk", "WARNING") as logs:
+            chunks = list(bulk._zip_stream(entries))
+        self.assertIn("missing.glb", logs.output[0])
+
+        # streamed a block at a time, never the whole archive at once
+        self.assertGreater(len(chunks), 10)
+        self.assertLess(max(len(c) for c in chunks), 4096)
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), ["clip.mp4", "m.gltf"])
+            self.assertEqual(zf.read("clip.mp4"), video)
+            self.assertEqual(zf.read("m.gltf"), text)
+            self.assertEqual(zf.getinfo("clip.mp4").compress_type, zipfile.ZIP_STORED)
+            self.assertLess(zf.getinfo("m.gltf").compress_size, len(text) // 10)
+
+    def test_mtimes_outside_the_zip_range_are_clamped(self):
+        old, new = self.write("old.txt", b"1969"), self.write("new.txt", b"2200")
+        os.utime(old, (0, -86400 * 365))
+        os.utime(new, (0, 7258118400))  # 2200-01-01
+        with zipfile.ZipFile(io.BytesIO(b"".join(bulk._zip_stream([
+            ("old.txt", old, zipfile.ZIP_STORED), ("new.txt", new, zipfile.ZIP_STORED),
+        ])))) as zf:
+            self.assertEqual(zf.getinfo("old.txt").date_time, (1980, 1, 1, 0, 0, 0))
+            self.assertEqual(zf.getinfo("new.txt").date_time, (2107, 12, 31, 23, 59, 58))
+            self.assertEqual(zf.read("old.txt"), b"1969")
+
+    def test_archive_names_are_unique(self):
+        assets = [
+            SimpleNamespace(pk=1, file_name="a.png", file_location="image/1/a.png", version=1),
+            SimpleNamespace(pk=2, file_name="a.png", file_location="image/2/a.png", version=2),
+            SimpleNamespace(pk=3, file_name="b.png", file_location="image/1/b.png", version=1),
+        ]
+        self.assertEqual(bulk._archive_names(assets), ["a (v1).png", "a (v2).png", "b.png"])
+
+    def test_compress_type(self):
+        self.assertEqual(bulk._compress_type(SimpleNamespace(file_name="a.jpg", file_type="image/jpeg")),
+                         zipfile.ZIP_STORED)
+        self.assertEqual(bulk._compress_type(SimpleNamespace(file_name="a.glb", file_type="model/gltf-binary")),
+                         zipfile.ZIP_DEFLATED)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.data = os.urandom(300_000)
+
+    def start(self, **extra):
+        r = self.client.post("/api/upload/chunked/", {"file_name": "clip.mp4", "total_size": len(self.data), **extra},
+                             content_type="application/json")
+        self.assertEqual(r.status_code, 201, r.content)
+        return r.json()["upload_id"]
+
+    def put(self, uid, start, end):
+        return self.client.put(f"/api/upload/chunked/{uid}/", self.data[start:end], content_type="application/octet-stream",
+                               HTTP_CONTENT_RANGE=f"bytes {start}-{end - 1}/{len(self.data)}")
+
+    def complete(self, uid):
+        return self.client.post(f"/api/upload/chunked/{uid}/complete/", {}, content_type="application/json")
+
+    def stored(self, payload):
+        with open(os.path.join(self.media_root, payload["file_location"]), "rb") as fh:
+            return fh.read()
+
+    def test_resume_out_of_order_and_complete(self):
+        uid = self.start()
+        self.assertEqual(self.put(uid, 200_000, 300_000).status_code, 200)
+        self.assertEqual(self.put(uid, 0, 120_000).status_code, 200)
+        state = self.client.get(f"/api/upload/chunked/{uid}/").json()
+        self.assertEqual(state["missing"], [[120_000, 200_000]])
+        self.assertEqual(self.complete(uid).status_code, 409)
+
+        self.put(uid, 100_000, 250_000)     # overlaps both neighbours
+        r = self.complete(uid)
+        self.assertEqual(r.status_code, 202, r.content)   # 202: metadata extraction is queued
+        self.assertEqual(r.json()["sha256"], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(self.stored(r.json()), self.data)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, ".uploads", uid)))
+        # a retried completion answers with the same asset
+        self.assertEqual(self.complete(uid).json()["id"], r.json()["id"])
+
+    def test_single_chunk_is_used_in_place(self):
+        uid = self.start(sha256=hashlib.sha256(self.data).hexdigest())
+        self.put(uid, 0, len(self.data))
+        r = self.complete(uid)
+        self.assertEqual(r.status_code, 202, r.content)
+        self.assertEqual(self.stored(r.json()), self.data)
+
+    def test_checksum_mismatch_reopens_the_session(self):
+        uid = self.start(sha256="0" * 64)
+        self.put(uid, 0, len(self.data))
+        self.assertEqual(self.complete(uid).status_code, 422)
+        self.assertEqual(UploadSession.objects.get(pk=uid).status, UploadSession.Status.ACTIVE)
+        self.assertFalse(AssetMetadata.objects.exists())
+
+    def test_chunks_are_refused_once_completing(self):
+        uid = self.start()
+        self.put(uid, 0, len(self.data))
+        UploadSession.objects.filter(pk=uid).update(status=UploadSession.Status.COMPLETING)
+        self.assertEqual(self.put(uid, 0, 10).status_code, 409)
+        self.assertEqual(self.complete(uid).status_code, 409)   # someone else is completing it
+
+    def test_chunk_finishing_after_completion_started_is_dropped(self):
+        uid = self.start()
+        self.put(uid, 0, len(self.data))
+        receive = ChunkFileUploadHandler.receive_data_chunk
+
+        def complete_meanwhile(handler, raw_data, start):
+            UploadSession.objects.filter(pk=uid).update(status=UploadSession.Status.COMPLETING)
+            return receive(handler, raw_data, start)
+
+        with mock.patch.object(ChunkFileUploadHandler, "receive_data_chunk", complete_meanwhile):
+            self.assertEqual(self.put(uid, 0, 1000).status_code, 409)
+        chunk_dir = os.path.join(self.media_root, ".uploads", uid)
+        self.assertEqual(sorted(os.listdir(chunk_dir)), [f"0-{len(self.data)}.chunk"])
+
+    def test_abort_removes_chunks(self):
+        uid = self.start()
+        self.put(uid, 0, 1000)
+        self.assertEqual(self.client.delete(f"/api/upload/chunked/{uid}/").status_code, 204)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, ".uploads", uid)))
+        self.assertEqual(self.put(uid, 1000, 2000).status_code, 409)
+
+
+class BlobExistsTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.sha = hashlib.sha256(b"stored").hexdigest()
+        os.makedirs(os.path.dirname(blobs.blob_path(self.sha)))
+        with open(blobs.blob_path(self.sha), "wb") as fh:
+            fh.write(b"stored")
+        Blob.objects.create(sha256=self.sha, size=6, ref_count=1)
+        self.owner = User.objects.create_user("owner", password="pw")
+        self.other = User.objects.create_user("other", password="pw")
+        AssetMetadata.objects.create(
+            file_name="a.png", file_location="image/1/a.png", content_hash=self.sha, modified_by=self.owner, tags=[]
+        )
+
+    def check(self, user):
+        self.client.force_login(user)
+        return self.client.get(f"/api/upload/blobs/{self.sha}/").status_code
+
+    def test_anonymous_callers_are_refused(self):
+        self.assertIn(self.client.get(f"/api/upload/blobs/{self.sha}/").status_code, (401, 403))
+
+    def test_only_the_owner_learns_the_content_is_stored(self):
+        self.assertEqual(self.check(self.owner), 200)
+        self.assertEqual(self.check(self.other), 404)   # same answer as for unknown content
+        self.other.is_staff = True
+        self.other.save()
+        self.assertEqual(self.check(self.other), 200)
+
+    def test_upload_by_hash_is_scoped_the_same_way(self):
+        data = {"content_hash": self.sha, "file_name": "b.png"}
+        self.assertEqual(self.client.post("/api/upload/", data).status_code, 404)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.post("/api/upload/", data).status_code, 404)
+        self.client.force_login(self.owner)
+        self.assertIn(self.client.post("/api/upload/", data).status_code, (201, 202))
+        self.assertEqual(AssetMetadata.objects.get(file_name="b.png").modified_by, self.owner)
+
+
+class BlobRefCountTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def upload(self, name):
+        r = self.client.post("/api/upload/", {"file": SimpleUploadedFile(name, b"same bytes", "application/octet-stream")})
+        self.assertEqual(r.status_code, 202, r.content)
+        return AssetMetadata.objects.get(pk=r.json()["id"])
+
+    def test_blob_outlives_every_asset_but_the_last(self):
+        first, second = self.upload("a.bin"), self.upload("b.bin")
+        sha = first.content_hash
+        self.assertEqual(second.content_hash, sha)
+        self.assertEqual(Blob.objects.get(sha256=sha).ref_count, 2)
+
+        first.delete()
+        self.assertEqual(Blob.objects.get(sha256=sha).ref_count, 1)
+        self.assertTrue(os.path.exists(blobs.blob_path(sha)))
+        with open(os.path.join(self.media_root, second.file_location), "rb") as fh:
+            self.assertEqual(fh.read(), b"same bytes")
+
+        second.delete()
+        self.assertFalse(Blob.objects.filter(sha256=sha).exists())
+        self.assertFalse(os.path.exists(blobs.blob_path(sha)))
+
+
+class SignedUrlTests(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        os.makedirs(os.path.join(self.media_root, "image", "1"))
+        for name in ("a.png", "b.png"):
+            with open(os.path.join(self.media_root, "image", "1", name), "wb") as fh:
+                fh.write(name.encode())
+
+    def get(self, url):
+        r = self.client.get(url)
+        body = b"".join(r.streaming_content) if r.streaming else r.content
+        return r.status_code, body
+
+    def test_valid_link_serves_the_file(self):
+        self.assertEqual(self.get(signed_urls.signed_url("image/1/a.png")), (200, b"a.png"))
+
+    def test_tampered_token_is_refused(self):
+        url = signed_urls.signed_url("image/1/a.png")
+        token = url.split("/")[-2]
+        value, sig = token.rsplit(":", 1)
+        forged = signing.Signer(salt="another-salt").sign_object({"p": "image/1/b.png", "x": time.time() + 60})
+        for bad in (f"{value}:{sig[:-1]}{'A' if sig[-1] != 'A' else 'B'}", f"{value[:-1]}x:{sig}", forged):
+            self.assertEqual(self.get(url.replace(token, bad)), (403, b"Invalid link."), bad)
+
+    def test_the_trailing_name_is_not_trusted(self):
+        url = signed_urls.signed_url("image/1/a.png")
+        self.assertEqual(self.get(url.rsplit("/", 1)[0] + "/b.png"), (200, b"a.png"))
+
+    def test_expired_link_is_refused(self):
+        url = signed_urls.signed_url("image/1/a.png", ttl=60)
+        with mock.patch.object(signed_urls.time, "time", return_value=time.time() + 3600):
+            self.assertEqual(self.get(url), (403, b"Link expired."))
+
+    def test_directory_token_stays_in_its_directory(self):
+        url = signed_urls.media_url("image/1/a.png", dir_scoped=True)
+        self.assertEqual(self.get(url.rsplit("/", 1)[0] + "/b.png"), (200, b"b.png"))
+        self.assertEqual(self.get(url.rsplit("/", 1)[0] + "/.hidden")[0], 403)
+        self.assertEqual(self.get(url.rsplit("/", 1)[0] + "/..%2Fsecret")[0], 404)   # no route for a "/"
+
+    def test_signed_path_outside_media_root_is_refused(self):
+        token = signed_urls.make_token("../outside.txt")
+        self.assertEqual(self.get(f"/api/files/{token}/outside.txt")[0], 403)
+
+
+class AssetRenameTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def upload(self, name, data):
+        r = self.client.post("/api/upload/", {"file": SimpleUploadedFile(name, data, "image/png")})
+        return AssetMetadata.objects.get(pk=r.json()["id"])
+
+    def rename(self, asset, name):
+        return self.client.patch(f"/api/upload/{asset.pk}/", json.dumps({"file_name": name}), content_type="application/json")
+
+    def test_rename_moves_the_asset_to_the_new_names_group(self):
+        v1, v2 = self.upload("a.png", b"one"), self.upload("a.png", b"two")
+        other = self.upload("b.png", b"other")
+
+        r = self.rename(v2, "b.png")
+        self.assertEqual(r.status_code, 200, r.content)
+        v2.refresh_from_db()
+        self.assertEqual((v2.group_id, v2.version, v2.file_location), (other.group_id, 2, "image/2/b.png"))
+        with open(os.path.join(self.media_root, "image", "2", "b.png"), "rb") as fh:
+            self.assertEqual(fh.read(), b"two")
+        self.assertEqual(r.json()["no_of_versions"], 2)
+
+        # the old group is back to one version, which is its latest again
+        v1.refresh_from_db()
+        self.assertEqual(v1.no_of_versions, 1)
+        self.assertEqual(v1.group.latest_version_id, v1.pk)
+        self.assertEqual(v2.group.latest_version_id, v2.pk)
+        self.assertTrue(v2.jobs.filter(kind="previews", status="queued").exists())   # its previews were dropped
+
+    def test_rename_errors_are_reported(self):
+        asset = self.upload("a.png", b"one")
+        self.assertEqual(self.rename(asset, "../b.png").status_code, 400)
+        os.remove(os.path.join(self.media_root, asset.file_location))
+        r = self.rename(asset, "c.png")
+        self.assertEqual(r.status_code, 409)
+        asset.refresh_from_db()
+        self.assertEqual((asset.file_name, asset.file_location), ("a.png", "image/1/a.png"))
+
+
+class BatchUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def post(self, *names):
+        files = [SimpleUploadedFile(n, n.encode() * 10, "image/png") for n in names]
+        return self.client.post("/api/upload/batch/", {"files": files})
+
+    def stored_files(self):
+        return [f for _, _, files in os.walk(self.media_root) for f in files]
+
+    def test_failed_insert_removes_stored_files(self):
+        with mock.patch.object(batch, "refresh_search_vectors", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                self.post("a.png", "b.png")
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(AssetMetadata.objects.exists())
+
+    def test_requests_share_one_probe_pool(self):
+        with mock.patch.object(batch, "_pool", None), mock.patch.object(batch, "ProcessPoolExecutor") as executor:
+            executor.return_value.map.side_effect = lambda fn, *cols, **kw: map(fn, *cols)
+            self.assertEqual(self.post("a.png", "b.png").status_code, 201)
+            self.assertEqual(self.post("c.png", "d.png").status_code, 201)
+        executor.assert_called_once()
+
+
+class GLTFUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def test_gltf_with_buffer_is_accepted_probed_and_served_precompressed(self):
+        tri = np.array([[0, 0, 0], [1, 0, 0], [0, 2, 0]], dtype="<f4")
+        doc = triangle_doc(tri)
+        doc["buffers"][0]["uri"] = "scene.bin"
+        doc["extras"] = {"notes": ["exported from the layout scene"] * 200}
+        gltf = json.dumps(doc, indent=2).encode()
+
+        ids = []
+        for name, data in (("scene.bin", tri.tobytes()), ("scene.gltf", gltf)):
+            r = self.client.post("/api/upload/", {"file": SimpleUploadedFile(name, data, "application/octet-stream")})
+            self.assertEqual(r.status_code, 202, r.content)
+            ids.append(r.json()["id"])
+        buffer, asset = AssetMetadata.objects.get(pk=ids[0]), AssetMetadata.objects.get(pk=ids[1])
+        self.assertEqual((buffer.file_location, asset.file_location), ("model/1/scene.bin", "model/1/scene.gltf"))
+        self.assertEqual(asset.file_type, "model/gltf+json")
+
+        tasks.extract(asset)
+        tasks.sidecars(asset)
+        asset.refresh_from_db()
+        self.assertEqual((asset.polygon_count, asset.resolution), (1, "1.0x2.0x0.0"))   # buffer found next to it
+        self.assertIn("gzip", asset.media_info["sidecars"])
+
+        r = self.client.get(f"/api/download/{asset.pk}/", HTTP_ACCEPT_ENCODING="gzip")
+        body = b"".join(r.streaming_content) if r.streaming else r.content
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(body), gltf)
+        self.assertLess(len(body), len(gltf))
+
+    def test_other_types_are_still_refused(self):
+        r = self.client.post("/api/upload/", {"file": SimpleUploadedFile("notes.txt", b"hi", "text/plain")})
+        self.assertEqual(r.status_code, 415)
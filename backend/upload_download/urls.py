@@ -1,8 +1,18 @@
 from django.urls import path
-from . import views
+from . import views, chunked, batch, bulk, signed_urls
 
 urlpatterns = [
     path("upload/", views.upload, name="asset_upload"),                 # POST
     path("upload/<int:pk>/", views.update_asset, name="asset_update"),  # PATCH
     path("download/<int:pk>/", views.download, name="asset_download"),  # GET (optional)
+    path("download/bulk/", bulk.download_bulk, name="asset_download_bulk"),  # GET: ?ids=... or ?tag=...&version=
+    path("files/<str:token>/<str:name>", signed_urls.serve_signed, name="signed_file"),  # GET: signed URL, no DB
+
+    path("upload/batch/", batch.upload_batch, name="asset_upload_batch"),  # POST: many files or one ZIP/TAR
+    path("upload/blobs/<str:sha256>/", views.blob_exists, name="asset_blob_exists"),  # GET: pre-flight dedup check
+
+    # resumable chunked upload: init -> PUT chunks -> complete
+    path("upload/chunked/", chunked.chunked_init, name="asset_upload_chunked"),                                # POST
+    path("upload/chunked/<uuid:session_id>/", chunked.chunked_session, name="asset_upload_chunk"),             # GET / PUT / DELETE
+    path("upload/chunked/<uuid:session_id>/complete/", chunked.chunked_complete, name="asset_upload_complete"),  # POST
 ]
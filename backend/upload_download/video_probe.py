@@ -0,0 +1,341 @@
+# backend/upload_download/video_probe.py
+"""
+Container-header video probing (no frame decoding).
+
+MP4 / MOV: walk the ISO-BMFF box tree to `moov` (seeking over `mdat`, so the
+media payload is never read) and take duration from mvhd/mdhd, size from
+tkhd, codec from stsd and frame rate from stts.
+WebM / Matroska: parse the EBML header, Segment/Info (TimecodeScale,
+Duration) and Tracks (CodecID, PixelWidth/Height, DefaultDuration) from the
+first few MB, stopping at the first Cluster.
+
+If neither parser can read the file, fall back to asking the ffmpeg binary
+shipped with imageio-ffmpeg for the stream header.
+"""
+from __future__ import annotations
+
+import os
+import struct
+from typing import Any, Dict, Optional
+
+MAX_MOOV_BYTES = 64 * 1024 * 1024    # sanity cap on the metadata box we load
+MKV_HEAD_BYTES = 4 * 1024 * 1024     # Info + Tracks live at the start of a Segment
+
+
+class ProbeError(ValueError):
+    """The container header could not be parsed."""
+
+
+def _result(container, duration_s, width, height, codec, frame_rate, file_size):
+    duration_ms = int(round(duration_s * 1000)) if duration_s else None
+    return {
+        "container": container,
+        "duration_ms": duration_ms,
+        "width": int(width) if width else None,
+        "height": int(height) if height else None,
+        "video_codec": codec or None,
+        "frame_rate": round(frame_rate, 3) if frame_rate else None,
+        # overall bitrate (all streams), bits per second
+        "bitrate": int(file_size * 8 * 1000 / duration_ms) if duration_ms else None,
+    }
+
+
+# -----------------------------
+# MP4 / MOV (ISO base media)
+# -----------------------------
+def _iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None):
+    """
+    Yield (type, payload_start, payload_end) for the boxes in data[start:end].
+    """
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, btype = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield btype, pos + header, pos + size
+        pos += size
+
+
+def _find_box(data, path, start=0, end=None):
+    for btype, s, e in _iter_boxes(data, start, end):
+        if btype == path[0]:
+            return (s, e) if len(path) == 1 else _find_box(data, path[1:], s, e)
+    return None
+
+
+def _read_moov(fh, file_size):
+    """
+    Locate the top-level moov box by reading only box headers, and return its bytes.
+    """
+    pos = 0
+    brand = None
+    while pos + 8 <= file_size:
+        fh.seek(pos)
+        head = fh.read(16)
+        size, btype = struct.unpack(">I4s", head[:8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", head[8:16])[0]
+            header = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header:
+            break
+        if btype == b"ftyp":
+            brand = head[8:12]
+        if btype == b"moov":
+            if size > MAX_MOOV_BYTES:
+                raise ProbeError("moov box too large")
+            fh.seek(pos + header)
+            return fh.read(size - header), brand
+        pos += size
+    raise ProbeError("no moov box")
+
+
+def _full_box_times(data, s):
+    """
+    (timescale, duration) from a version 0/1 mvhd or mdhd payload.
+    """
+    version = data[s]
+    if version == 1:
+        timescale, duration = struct.unpack(">IQ", data[s + 20:s + 32])
+    else:
+        timescale, duration = struct.unpack(">II", data[s + 12:s + 20])
+    return timescale, duration
+
+
+def probe_mp4(path: str) -> Dict[str, Any]:
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as fh:
+        moov, brand = _read_moov(fh, file_size)
+
+    duration_s = None
+    mvhd = _find_box(moov, [b"mvhd"])
+    if mvhd:
+        timescale, duration = _full_box_times(moov, mvhd[0])
+        if timescale and duration and duration != 0xFFFFFFFF:
+            duration_s = duration / timescale
+    if not duration_s:
+        # fragmented MP4: total length is in mvex/mehd
+        mehd = _find_box(moov, [b"mvex", b"mehd"])
+        if mehd and mvhd:
+            version = moov[mehd[0]]
+            frag = struct.unpack(">Q" if version == 1 else ">I",
+                                 moov[mehd[0] + 4:mehd[0] + (12 if version == 1 else 8)])[0]
+            timescale = _full_box_times(moov, mvhd[0])[0]
+            duration_s = frag / timescale if timescale else None
+
+    width = height = codec = frame_rate = None
+    for btype, s, e in _iter_boxes(moov):
+        if btype != b"trak":
+            continue
+        hdlr = _find_box(moov, [b"mdia", b"hdlr"], s, e)
+        if not hdlr or moov[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+            continue
+
+        tkhd = _find_box(moov, [b"tkhd"], s, e)
+        if tkhd:
+            # width / height are 16.16 fixed point in the last 8 bytes
+            w, h = struct.unpack(">II", moov[tkhd[1] - 8:tkhd[1]])
+            width, height = w >> 16, h >> 16
+
+        stbl = _find_box(moov, [b"mdia", b"minf", b"stbl"], s, e)
+        if stbl:
+            stsd = _find_box(moov, [b"stsd"], *stbl)
+            if stsd and stsd[1] - stsd[0] >= 16:
+                # full box (4) + entry count (4) + first entry size (4) + format (4)
+                codec = moov[stsd[0] + 12:stsd[0] + 16].decode("latin-1").strip()
+                if not width and stsd[1] - stsd[0] >= 44:
+                    width, height = struct.unpack(">HH", moov[stsd[0] + 40:stsd[0] + 44])
+            stts = _find_box(moov, [b"stts"], *stbl)
+            mdhd = _find_box(moov, [b"mdia", b"mdhd"], s, e)
+            if stts and mdhd:
+                count = struct.unpack(">I", moov[stts[0] + 4:stts[0] + 8])[0]
+                entries = moov[stts[0] + 8:stts[0] + 8 + count * 8]
+                samples = sum(struct.unpack(">I", entries[i:i + 4])[0] for i in range(0, len(entries), 8))
+                timescale, media_duration = _full_box_times(moov, mdhd[0])
+                if timescale and media_duration:
+                    frame_rate = samples / (media_duration / timescale)
+                    duration_s = duration_s or media_duration / timescale
+        break  # first video track
+
+    container = "mov" if brand in (None, b"qt  ") else "mp4"
+    return _result(container, duration_s, width, height, codec, frame_rate, file_size)
+
+
+# -----------------------------
+# WebM / Matroska (EBML)
+# -----------------------------
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+DEFAULT_DURATION = 0x23E383
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CLUSTER = 0x1F43B675
+DOC_TYPE = 0x4282
+
+
+def _vint(data, pos, keep_marker):
+    """
+    Decode an EBML variable-length integer. Returns (value, length, is_unknown_size).
+    """
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8 or pos + length > len(data):
+        raise ProbeError("bad EBML vint")
+    value = first if keep_marker else first & (mask - 1)
+    for b in data[pos + 1:pos + length]:
+        value = (value << 8) | b
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _iter_elements(data, start, end):
+    """
+    Yield (id, payload_start, payload_end) for EBML elements in data[start:end].
+    Unknown-size elements (live streams) extend to `end`.
+    """
+    pos = start
+    while pos < end:
+        eid, id_len, _ = _vint(data, pos, keep_marker=True)
+        size, size_len, unknown = _vint(data, pos + id_len, keep_marker=False)
+        s = pos + id_len + size_len
+        e = end if unknown else min(s + size, end)
+        yield eid, s, e
+        if e <= pos:
+            return
+        pos = e
+
+
+def _uint(data, s, e):
+    return int.from_bytes(data[s:e], "big") if e > s else 0
+
+
+def probe_matroska(path: str) -> Dict[str, Any]:
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as fh:
+        data = fh.read(MKV_HEAD_BYTES)
+
+    elements = _iter_elements(data, 0, len(data))
+    eid, s, e = next(elements, (None, 0, 0))
+    if eid != EBML_HEADER:
+        raise ProbeError("not an EBML file")
+    container = "matroska"
+    for cid, cs, ce in _iter_elements(data, s, e):
+        if cid == DOC_TYPE:
+            container = data[cs:ce].decode("ascii", "ignore").strip("\x00") or container
+
+    segment = next((el for el in _iter_elements(data, e, len(data)) if el[0] == SEGMENT), None)
+    if segment is None:
+        raise ProbeError("no Segment")
+
+    timecode_scale, duration_ticks = 1_000_000, None
+    width = height = codec = frame_rate = None
+    found_info = found_tracks = False
+    try:
+        for eid, s, e in _iter_elements(data, segment[1], segment[2]):
+            if eid == INFO:
+                found_info = True
+                for cid, cs, ce in _iter_elements(data, s, e):
+                    if cid == TIMECODE_SCALE:
+                        timecode_scale = _uint(data, cs, ce)
+                    elif cid == DURATION:
+                        duration_ticks = struct.unpack(">f" if ce - cs == 4 else ">d", data[cs:ce])[0]
+            elif eid == TRACKS:
+                found_tracks = True
+                for tid, ts, te in _iter_elements(data, s, e):
+                    if tid != TRACK_ENTRY:
+                        continue
+                    track = {cid: (cs, ce) for cid, cs, ce in _iter_elements(data, ts, te)}
+                    if TRACK_TYPE not in track or _uint(data, *track[TRACK_TYPE]) != 1:
+                        continue  # not video
+                    if CODEC_ID in track:
+                        codec = data[slice(*track[CODEC_ID])].decode("ascii", "ignore").strip("\x00")
+                    if DEFAULT_DURATION in track:
+                        ns = _uint(data, *track[DEFAULT_DURATION])
+                        frame_rate = 1e9 / ns if ns else None
+                    if VIDEO in track:
+                        for vid, vs, ve in _iter_elements(data, *track[VIDEO]):
+                            if vid == PIXEL_WIDTH:
+                                width = _uint(data, vs, ve)
+                            elif vid == PIXEL_HEIGHT:
+                                height = _uint(data, vs, ve)
+                    break
+            elif eid == CLUSTER or (found_info and found_tracks):
+                break
+    except (ProbeError, IndexError, struct.error):
+        if not (found_info and found_tracks):
+            raise ProbeError("truncated Matroska header")
+
+    if not found_tracks:
+        raise ProbeError("no Tracks in the first bytes")
+    duration_s = duration_ticks * timecode_scale / 1e9 if duration_ticks else None
+    return _result(container, duration_s, width, height, codec, frame_rate, file_size)
+
+
+# -----------------------------
+# Fallback + public API
+# -----------------------------
+def probe_ffmpeg(path: str) -> Dict[str, Any]:
+    """
+    Ask ffmpeg (imageio-ffmpeg) for the stream header. Slower: starts a process.
+    """
+    import imageio_ffmpeg
+
+    gen = imageio_ffmpeg.read_frames(path)
+    try:
+        meta = next(gen)
+    finally:
+        gen.close()  # stops ffmpeg before it decodes anything we'd read
+    width, height = (meta.get("source_size") or meta.get("size") or (None, None))[:2]
+    return _result(
+        "ffmpeg", meta.get("duration"), width, height, meta.get("codec"), meta.get("fps"), os.path.getsize(path)
+    )
+
+
+def probe_video(path: str) -> Dict[str, Any]:
+    """
+    Duration (ms), dimensions, codec, frame rate and bitrate of a video,
+    from the container header when possible. Returns {} if nothing worked.
+    ffmpeg is only started when the header lacks a duration (e.g. fragmented
+    MP4 written with an empty moov) or cannot be parsed at all.
+    """
+    with open(path, "rb") as fh:
+        head = fh.read(12)
+    parsers = [probe_matroska, probe_mp4] if head[:4] == b"\x1a\x45\xdf\xa3" else [probe_mp4, probe_matroska]
+    info = {}
+    for parse in parsers:
+        try:
+            info = parse(path)
+            break
+        except (ProbeError, OSError, IndexError, struct.error, UnicodeDecodeError):
+            continue
+    if info.get("duration_ms"):
+        return info
+
+    try:
+        fallback = probe_ffmpeg(path)
+    except Exception as e:
+        print("Video probe error:", str(e).splitlines()[0] if str(e) else e)
+        return info
+    # keep what the header did give us (container, codec id)
+    return {**fallback, **{k: v for k, v in info.items() if v is not None}}
@@ -1,20 +1,26 @@
 # upload_download/views.py
-import os, mimetypes
-import trimesh
+import errno, os, mimetypes
 from datetime import datetime, timedelta
 from django.conf import settings
-from django.core.files.storage import FileSystemStorage
-from django.http import FileResponse, Http404
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.http import Http404
+from django.utils._os import safe_join
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser
-from PIL import Image
 
-from asset_metadata.models import AssetMetadata
+from asset_metadata.models import AssetMetadata, AssetGroup, Blob
+from asset_metadata import blobs
 from .serializers import AssetSerializer
+from asset_metadata import jobs
+from .extract import extract_metadata
+from .serving import serve_file
+from . import sidecars
+from asset_preview.utils import invalidate_previews
 
 # ✅ Ensure Python knows the proper MIME types for GLB/GLTF
 mimetypes.add_type("model/gltf-binary", ".glb")
@@ -22,44 +28,6 @@ mimetypes.add_type("model/gltf+json", ".gltf")
 
 
 
-def glb_polygon_count(full_path: str):
-    try:
-        m = trimesh.load(full_path, force="mesh")
-        if hasattr(m, "faces"):
-            return int(len(m.faces))
-        # GLB with multiple meshes
-        if hasattr(m, "geometry"):
-            total = 0
-            for g in m.geometry.values():
-                if hasattr(g, "faces"):
-                    total += len(g.faces)
-            return int(total)
-    except Exception as e:
-        print("GLB polygon count error:", e)
-    return None
-
-
-# 🔹 NEW: use bounding box to create a “3D resolution” string for GLB
-def glb_bbox_resolution(full_path: str):
-    try:
-        m = trimesh.load(full_path, force="mesh")
-        if hasattr(m, "bounding_box"):
-            ext = m.bounding_box.extents  # [x, y, z]
-            # format like: "148.0x5.6x140.5"
-            return f"{ext[0]:.1f}x{ext[1]:.1f}x{ext[2]:.1f}"
-    except Exception as e:
-        print("GLB bbox resolution error:", e)
-    return ""
-
-
-def asset_resolution(full_path: str):
-    try:
-        with Image.open(full_path) as im:
-            return f"{int(im.width)}x{int(im.height)}"
-    except Exception:
-        return ""
-
-
 def _to_timedelta(value):
     if value is None or value == "":  # blank
         return None
@@ -103,6 +71,11 @@ def _payload(a: AssetMetadata):
         # DurationField -> "HH:MM:SS" string for UI
         "duration": (str(a.duration) if a.duration is not None else None),
         "no_of_versions": a.no_of_versions,
+        "group_id": a.group_id,
+        "version": a.version,
+        "media_info": a.media_info or {},
+        "content_hash": a.content_hash or "",
+        "processing_status": a.processing_status,
         "created_at": a.created_at.isoformat() if a.created_at else None,
         "modified_at": a.modified_at.isoformat() if a.modified_at else None,
         "modified_by_id": a.modified_by_id,
@@ -110,25 +83,21 @@ def _payload(a: AssetMetadata):
     }
 
 
-@api_view(["POST"])  # upload
-@permission_classes([AllowAny])
-@authentication_classes([])
-def upload(request):
-    upfile = request.FILES.get("file")
-    if not upfile:
-        return Response({"detail": "No file. Send single file in field 'file'."}, status=400)
-
-    # side fields
-    file_name = request.POST.get("file_name") or upfile.name
-    description = (request.POST.get("description") or "").strip()
-    tags_raw = request.POST.get("tags", "")
-    duration_raw = request.POST.get("duration", "")
-    polygon_count_raw = request.POST.get("polygon_count", None)
-    resolution_in = request.POST.get("resolution", "")
+def _parse_side_fields(data, default_name):
+    """
+    Normalise the optional form fields sent alongside an upload
+    (file_name, description, tags, duration, polygon_count, resolution, modified_by).
+    """
+    file_name = data.get("file_name") or default_name
+    description = (data.get("description") or "").strip()
+    tags_raw = data.get("tags", "")
+    polygon_count_raw = data.get("polygon_count", None)
 
     # tags normalize
     tags = []
-    if tags_raw:
+    if isinstance(tags_raw, (list, tuple)):  # JSON clients send a real list
+        tags = [str(t).strip() for t in tags_raw if str(t).strip()]
+    elif tags_raw:
         try:
             import json
             tags = json.loads(tags_raw)
@@ -144,8 +113,36 @@ def upload(request):
         except ValueError:
             polygon_count = None
 
-    # mime + size
-    ctype = getattr(upfile, "content_type", None) or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+    # optional: modified_by from form-data (frontend can send it)
+    modified_by_id = None
+    modified_by_raw = data.get("modified_by") or data.get("modified_by_id")
+    if modified_by_raw not in (None, ""):
+        try:
+            modified_by_id = int(str(modified_by_raw))
+        except ValueError:
+            modified_by_id = None
+
+    return {
+        "file_name": file_name,
+        "description": description,
+        "tags": tags,
+        "polygon_count": polygon_count,
+        "resolution": data.get("resolution", "") or "",
+        "duration": data.get("duration", "") or "",
+        "modified_by_id": modified_by_id,
+    }
+
+
+MODEL_EXTENSIONS = (".glb", ".gltf", ".bin")
+UNSUPPORTED_TYPE = "Unsupported file type. Only images, videos, .glb, .gltf and .bin are allowed."
+
+
+def _classify_upload(file_name, content_type=None):
+    """
+    Decide MIME type and storage subdir for an upload.
+    Returns (ctype, base_subdir) or None if the type is not allowed.
+    """
+    ctype = content_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
 
     # ✅ Force correct MIME for .glb / .gltf based on extension
     lower_name = file_name.lower()
@@ -154,108 +151,147 @@ def upload(request):
     elif lower_name.endswith(".gltf"):
         ctype = "model/gltf+json"
 
-    size_mb = round((getattr(upfile, "size", 0) or 0) / (1024 * 1024), 4)
+    elif lower_name.endswith(".bin"):
+        ctype = "application/octet-stream"
 
-    # decide subdir once (by type)
+    # HARD CHECK: only images, videos, or models (.glb, or .gltf + its .bin buffers).
+    # A .gltf refers to its buffers / textures by relative path: they resolve when
+    # uploaded together as first versions (same model/<N>/ folder) or embedded.
     if ctype.startswith("image/"):
-        base_subdir = "image"
-    elif ctype.startswith("video/"):
-        base_subdir = "video"
-    elif "gltf" in ctype or "glb" in ctype or lower_name.endswith((".glb", ".gltf")):
-        base_subdir = "model"
-    else:
-        base_subdir = "other"
+        return ctype, "image"
+    if ctype.startswith("video/"):
+        return ctype, "video"
+    if lower_name.endswith(MODEL_EXTENSIONS):
+        return ctype, "model"
+    return None
 
-    # HARD CHECK: only images, videos, or .glb
-    is_image = ctype.startswith("image/")
-    is_video = ctype.startswith("video/")
-    is_glb = lower_name.endswith(".glb")
 
-    if not (is_image or is_video or is_glb):
-        return Response(
-            {"detail": "Unsupported file type. Only images, videos, .glb are allowed."},
-            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-        )
-
-    # === VERSIONING LOGIC ===
-    existing_qs = AssetMetadata.objects.filter(file_name=file_name)
-    existing_valid = []
-    for a in existing_qs:
-        rel = (a.file_location or "").strip()
-        if not rel:
-            continue
-        full = os.path.join(settings.MEDIA_ROOT, rel.replace("/", os.sep))
-        if os.path.exists(full):
-            existing_valid.append(a)
-
-    existing_count = len(existing_valid)          # how many real files already exist
-    new_version_index = existing_count + 1        # this upload will be version N
-    total_versions = new_version_index            # total number of versions for this name
-
-    # store file as: <type>/<version>/filename
-    versioned_subdir = os.path.join(base_subdir, str(new_version_index))
+def _version_dir(base_subdir, version):
+    """
+    Create and return (relative, absolute) paths of <type>/<version>/ under MEDIA_ROOT.
+    """
+    versioned_subdir = os.path.join(base_subdir, str(version))
     target_dir = os.path.join(settings.MEDIA_ROOT, versioned_subdir)
     os.makedirs(target_dir, exist_ok=True)
+    return versioned_subdir, target_dir
 
-    storage = FileSystemStorage(location=target_dir)
-    saved_name = storage.save(file_name, upfile)
-    saved_rel_path = os.path.join(versioned_subdir, saved_name).replace("\\", "/")
-    full_path = os.path.join(settings.MEDIA_ROOT, saved_rel_path.replace("/", os.sep))
-
-    # 🔹 auto polygon count for .glb
-    if is_glb:
-        auto_poly = glb_polygon_count(full_path)
-        if auto_poly is not None:
-            polygon_count = auto_poly
-
-    # 🔹 resolution:
-    #  - image  -> width x height
-    #  - glb    -> bboxX x bboxY x bboxZ
-    #  - video  -> (optional)
-    resolution = (resolution_in.strip() if resolution_in else "")
-    if not resolution and is_image:
-        resolution = asset_resolution(full_path) or None
-    elif not resolution and is_glb:
-        res3d = glb_bbox_resolution(full_path)
-        resolution = res3d or None
-    elif not resolution:
-        resolution = None
+
+def _create_asset(fields, ctype, saved_rel_path, size_bytes, group, version, content_hash=""):
+    """
+    Create the AssetMetadata row for a file already stored at
+    MEDIA_ROOT/<saved_rel_path>. Type-specific extraction (polygon count,
+    resolution, previews) is queued for the background workers, or run
+    inline when ASSET_ASYNC_PROCESSING is off.
+    """
+    file_name = fields["file_name"]
+    resolution = fields["resolution"].strip() or None
 
     # duration
+    duration_raw = fields["duration"]
     duration_td = _to_timedelta(duration_raw) if duration_raw else None
 
-    # optional: modified_by from form-data (frontend can send it)
-    modified_by_id = None
-    modified_by_raw = request.POST.get("modified_by") or request.POST.get("modified_by_id")
-    if modified_by_raw not in (None, ""):
-        try:
-            modified_by_id = int(str(modified_by_raw))
-        except ValueError:
-            modified_by_id = None
-
+    is_async = getattr(settings, "ASSET_ASYNC_PROCESSING", True)
     a = AssetMetadata.objects.create(
         file_name=file_name,
         file_type=ctype,
-        file_size=size_mb,
+        file_size=round((size_bytes or 0) / (1024 * 1024), 4),
         file_location=saved_rel_path,   # e.g. "image/1/mylogo.png"
-        description=description,
-        tags=tags,
+        description=fields["description"],
+        tags=fields["tags"],
         resolution=resolution,
-        polygon_count=polygon_count,
+        polygon_count=fields["polygon_count"],
         duration=duration_td,
-        no_of_versions=total_versions,
-        modified_by_id=modified_by_id,
+        group=group,
+        version=version,
+        modified_by_id=fields["modified_by_id"],
+        content_hash=content_hash,
+        processing_status=(
+            AssetMetadata.ProcessingStatus.PENDING if is_async else AssetMetadata.ProcessingStatus.READY
+        ),
     )
 
-    AssetMetadata.objects.filter(file_name=file_name).update(no_of_versions=total_versions)
+    group.set_latest(a)
+    a.no_of_versions = group.refresh_version_count()
+    blobs.acquire(content_hash)
+
+    if is_async:
+        jobs.enqueue(a, *jobs.INGEST_JOBS)
+    else:
+        extract_metadata(a)
+    return a
+
+
+def _created_status(a):
+    # 202 while background processing is still pending, 201 when done inline
+    return 202 if a.processing_status == AssetMetadata.ProcessingStatus.PENDING else 201
+
+
+@api_view(["POST"])  # upload
+@permission_classes([AllowAny])  # authenticated callers may also upload by content_hash
+def upload(request):
+    upfile = request.FILES.get("file")
+    content_hash = (request.POST.get("content_hash") or "").strip().lower()
+
+    # No bytes sent: allowed when the client already checked (GET api/upload/blobs/<sha256>/)
+    # that it holds this content on the server.
+    if not upfile:
+        if not content_hash:
+            return Response({"detail": "No file. Send single file in field 'file'."}, status=400)
+        if not blobs.user_has_blob(request.user, content_hash):
+            return Response({"detail": "Unknown content_hash. Send the file instead."}, status=404)
+        if not request.POST.get("file_name"):
+            return Response({"detail": "'file_name' is required when uploading by content_hash."}, status=400)
+
+    # side fields
+    fields = _parse_side_fields(request.POST, getattr(upfile, "name", ""))
+    if fields["modified_by_id"] is None and request.user.is_authenticated:
+        fields["modified_by_id"] = request.user.pk  # so user_has_blob() finds this content later
+    file_name = fields["file_name"]
+
+    # mime + storage subdir
+    classified = _classify_upload(file_name, getattr(upfile, "content_type", None))
+    if classified is None:
+        return Response(
+            {"detail": UNSUPPORTED_TYPE},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
+    ctype, base_subdir = classified
 
-    return Response(_payload(a), status=201)
+    # === VERSIONING LOGIC ===
+    group, new_version_index = AssetGroup.allocate_version(file_name)  # this upload will be version N
+
+    # store file as: <type>/<version>/filename (hard link to the blob store)
+    versioned_subdir, target_dir = _version_dir(base_subdir, new_version_index)
+    if upfile:
+        content_hash = blobs.hash_upload(upfile)
+    saved_name = blobs.store(content_hash, target_dir, file_name, upfile=upfile)
+    saved_rel_path = os.path.join(versioned_subdir, saved_name).replace("\\", "/")
+    size_bytes = upfile.size if upfile else Blob.objects.get(pk=content_hash).size
+
+    a = _create_asset(fields, ctype, saved_rel_path, size_bytes, group, new_version_index, content_hash)
+    return Response(_payload(a), status=_created_status(a))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def blob_exists(request, sha256: str):
+    """
+    Pre-flight: does the server already hold this content for the caller
+    (see blobs.user_has_blob)? If so, the client can POST api/upload/ with
+    content_hash instead of the file bytes.
+    """
+    sha256 = sha256.lower()
+    if blobs.user_has_blob(request.user, sha256):
+        return Response({"exists": True, "sha256": sha256, "size": Blob.objects.get(pk=sha256).size})
+    return Response({"exists": False, "sha256": sha256}, status=404)
 
 def _remove_physical_file(asset):
     rel = (asset.file_location or "").strip()
     if not rel:
         return False
     full = os.path.join(settings.MEDIA_ROOT, rel.replace("/", os.sep))
+    sidecars.remove_sidecars(full)
+    invalidate_previews(asset)
     if os.path.exists(full):
         try:
             os.remove(full)
@@ -294,8 +330,9 @@ def update_asset(request, pk: int):
                     os.remove(full)
                 except Exception as e:
                     print("File delete error:", e)
+            sidecars.remove_sidecars(full)
 
-        asset.delete()
+        asset.delete()  # cached previews go with it (asset_preview/signals.py)
         return Response(status=204)
 
     # --- Normalise tags (string -> list) ---
@@ -304,53 +341,78 @@ def update_asset(request, pk: int):
         tags = [t.strip() for t in tags_in.split(",") if t.strip()]
         data["tags"] = tags
 
-    # ---------- rename physical file if file_name changed ----------
-    new_file_name = data.get("file_name")
-    if new_file_name:
-        new_file_name = new_file_name.strip()
-        old_file_name = (asset.file_name or "").strip()
-
-        if new_file_name and new_file_name != old_file_name:
-            rel = (asset.file_location or "").strip()
-            if rel:
-                old_full = os.path.join(
-                    settings.MEDIA_ROOT,
-                    rel.replace("/", os.sep)
-                )
-                folder = os.path.dirname(old_full)
-
-                _, old_ext = os.path.splitext(old_full)
-                base_new, ext_new = os.path.splitext(new_file_name)
-                if not ext_new:
-                    ext_new = old_ext
-                new_basename = base_new + ext_new
-
-                new_full = os.path.join(folder, new_basename)
-
-                try:
-                    os.rename(old_full, new_full)
-
-                    rel_dir = os.path.dirname(rel).replace("\\", "/")
-                    if rel_dir:
-                        asset.file_location = f"{rel_dir}/{new_basename}"
-                    else:
-                        asset.file_location = new_basename
-                except Exception as e:
-                    print("File rename error:", e)
-    # -------------------------------------------------------------------
-
     allowed_keys = ["file_name", "description", "tags"]
     cleaned = {k: v for k, v in data.items() if k in allowed_keys}
 
     serializer = AssetSerializer(asset, data=cleaned, partial=True)
-    if serializer.is_valid():
-        asset = serializer.save()
-        if modified_by_id is not None:
-            asset.modified_by_id = modified_by_id
-            asset.save(update_fields=["modified_by"])
-        return Response(serializer.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+
+    # ---------- a new file_name moves the asset to that name's group ----------
+    old_group = asset.group
+    new_file_name = (serializer.validated_data.get("file_name") or "").strip()
+    renamed, moved = False, None
+    if new_file_name and new_file_name != (asset.file_name or "").strip():
+        if "/" in new_file_name or "\\" in new_file_name or new_file_name in (".", ".."):
+            return Response({"file_name": ["Must not contain path separators."]}, status=400)
+        serializer.validated_data["file_name"] = new_file_name
+        try:
+            renamed, moved = True, _rehome(asset, new_file_name)
+        except OSError as e:
+            return Response({"detail": f"Could not rename the file: {e.strerror or e}"}, status=409)
+    # -------------------------------------------------------------------
 
-    return Response(serializer.errors, status=400)
+    try:
+        with transaction.atomic():
+            asset = serializer.save()
+            if modified_by_id is not None:
+                asset.modified_by_id = modified_by_id
+                asset.save(update_fields=["modified_by"])
+            if renamed:
+                asset.group.set_latest(asset)
+                asset.no_of_versions = asset.group.refresh_version_count()
+                if old_group is not None:
+                    old_group.repoint_latest()
+                    old_group.refresh_version_count()
+    except Exception:
+        if moved is not None:
+            old_full, new_full = moved
+            os.rename(new_full, old_full)  # the row still points at the old path
+            sidecars.move_sidecars(new_full, old_full)
+        raise
+    if renamed:
+        invalidate_previews(asset)
+        jobs.enqueue(asset, "previews")  # the preview endpoint only queues it for never-processed files
+    return Response(AssetSerializer(asset).data)
+
+
+def _rehome(asset, new_file_name):
+    """
+    Give `asset` the next version of `new_file_name`'s group and move its file
+    to <type>/<that version>/<new name>, keeping the old extension when the
+    new name has none. Only the instance is updated; the caller saves it.
+    Returns (old_full, new_full) so a failed save can move the file back,
+    or None when the asset has no file.
+    """
+    group, version = AssetGroup.allocate_version(new_file_name)
+    asset.group, asset.version = group, version
+
+    rel = (asset.file_location or "").strip().replace("\\", "/")
+    if not rel:
+        return None
+    old_full = os.path.join(settings.MEDIA_ROOT, rel.replace("/", os.sep))
+    base_new, ext_new = os.path.splitext(new_file_name)
+    new_basename = base_new + (ext_new or os.path.splitext(rel)[1])
+
+    base_subdir = rel.split("/")[0] if "/" in rel else ""
+    versioned_subdir, target_dir = _version_dir(base_subdir, version)
+    new_full = os.path.join(target_dir, new_basename)
+    if os.path.exists(new_full):
+        raise FileExistsError(errno.EEXIST, "a file with that name already exists", new_basename)
+    os.rename(old_full, new_full)
+    sidecars.move_sidecars(old_full, new_full)
+    asset.file_location = os.path.join(versioned_subdir, new_basename).replace("\\", "/")
+    return old_full, new_full
 
 
 @api_view(["GET"])
@@ -392,13 +454,38 @@ def download(request, pk: int):
     if not ctype:
         ctype = "application/octet-stream"
 
-    # 6) Open and stream file as attachment (download)
+    # 6) Stream file as attachment (download); Range / ETag / If-Modified-Since
+    #    are handled so resumed downloads and video seeking only send what's missing
     file_name = asset.file_name or os.path.basename(full_path)
-    f = open(full_path, "rb")
-    response = FileResponse(
-        f,
-        as_attachment=True,
-        filename=file_name,
-        content_type=ctype,
-    )
-    return response
+    etag = f'"{asset.content_hash}"' if asset.content_hash else None  # no file read needed
+    try:
+        return serve_file(
+            request, full_path, etag=etag, content_type=ctype, as_attachment=True, filename=file_name
+        )
+    except FileNotFoundError:
+        raise Http404("File not found on server")
+
+
+# under MEDIA_ROOT but never served by path: upload scratch (.uploads/, .part
+# files) and the blob store, whose names are content hashes
+PRIVATE_MEDIA_DIRS = ("blobs",)
+
+
+def serve_media(request, path):
+    """
+    Files under MEDIA_URL (DEBUG only, see backend/urls.py), with the same
+    conditional / Range handling as download.
+    """
+    parts = path.replace("\\", "/").split("/")
+    if parts[0] in PRIVATE_MEDIA_DIRS or any(p.startswith(".") for p in parts):
+        raise Http404("File not found on server")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404("File not found on server")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found on server")
+    try:
+        return serve_file(request, full_path)
+    except FileNotFoundError:
+        raise Http404("File not found on server")
@@ -5,12 +5,25 @@ export async function GET(req) {
   const url = new URL(req.url);
   // Map /api/asset_preview  ->  http://127.0.0.1:8000/api/preview/assets/
   // /api/asset_preview?id=5  ->  http://127.0.0.1:8000/api/preview/assets/5/
+  // other params (cursor, page_size, latest, ...) are passed through to the list
   const id = url.searchParams.get("id");
+  url.searchParams.delete("id");
+  const query = url.searchParams.toString();
   const target = id
     ? `${DJANGO}/api/preview/assets/${id}/`
-    : `${DJANGO}/api/preview/assets/`;
-  const resp = await fetch(target, { credentials: "include", headers: { cookie: req.headers.get("cookie") || "" } });
-  return new Response(await resp.text(), { status: resp.status, headers: { "content-type": resp.headers.get("content-type") || "application/json" } });
+    : `${DJANGO}/api/preview/assets/${query ? `?${query}` : ""}`;
+  // pass the browser's validators through so an unchanged list comes back as 304
+  const headers = { cookie: req.headers.get("cookie") || "" };
+  for (const h of ["if-none-match", "if-modified-since"]) {
+    if (req.headers.get(h)) headers[h] = req.headers.get(h);
+  }
+  const resp = await fetch(target, { credentials: "include", headers, cache: "no-store" });
+  const out = { "content-type": resp.headers.get("content-type") || "application/json" };
+  for (const h of ["etag", "last-modified", "cache-control"]) {
+    if (resp.headers.get(h)) out[h] = resp.headers.get(h);
+  }
+  if (resp.status === 304) return new Response(null, { status: 304, headers: out });
+  return new Response(await resp.text(), { status: resp.status, headers: out });
 }
 
 // Optional helpers for preview/download endpoints
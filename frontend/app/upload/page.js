@@ -460,31 +460,39 @@ export default function UploadPage() {
 
   // Keep localEdits in sync when async probes finish (images/videos)
   useEffect(() => {
+    // version count per picked name: one ?file_name= lookup (exact, indexed)
+    // per name we haven't asked about yet, instead of reading the whole list
+    const names = [...new Set(files.map((f) => (primedFrom(f).file_name || "").trim() || f.name))]
+      .filter((name) => !(name in existingVersions));
+    if (!names.length) return;
+
     async function loadExistingVersions() {
-      try {
-        const res = await fetch("/api/asset_preview"); // same endpoint main page uses
-        if (!res.ok) return;
-        const rows = await res.json();
-
-        const map = {};
-        rows.forEach((row) => {
-          const name = (row.file_name || "").trim();
-          if (!name) return;
-          const v = row.no_of_versions || 0;
-          // keep highest version we see for that file_name
-          if (!map[name] || v > map[name]) {
-            map[name] = v;
+      const found = {};
+      await Promise.all(
+        names.map(async (name) => {
+          found[name] = 0;
+          try {
+            const qs = new URLSearchParams({
+              file_name: name,
+              latest: "1",
+              fields: "file_name,no_of_versions",
+              page_size: "1",
+            });
+            const res = await fetch(`/api/asset_preview?${qs}`);
+            if (!res.ok) return;
+            const data = await res.json();
+            const rows = Array.isArray(data) ? data : data.results || [];
+            if (rows.length) found[name] = rows[0].no_of_versions || 0;
+          } catch (e) {
+            console.error("Failed to load existing versions", e);
           }
-        });
-
-        setExistingVersions(map);
-      } catch (e) {
-        console.error("Failed to load existing versions", e);
-      }
+        })
+      );
+      setExistingVersions((prev) => ({ ...prev, ...found }));
     }
 
     loadExistingVersions();
-  }, []);
+  }, [files, existingVersions]);
 
   // Per-file Save
   async function saveOneNew(file) {
@@ -98,6 +98,12 @@ export function initCMS() {
 
     // === DOM structure (NO upload button/zone) ===
     const grid = el('div', { class: 'cms-grid', id: 'cmsGrid' });
+    const loadMore = el('button', {
+      class: 'btn',
+      id: 'cmsLoadMore',
+      style: { display: 'none', justifySelf: 'center' },
+      onclick: () => loadMoreAssets(),
+    }, ['Load more']);
 
     const filterBar = el('div', { class: 'filter-bar' }, [
       el('input', {
@@ -140,7 +146,7 @@ export function initCMS() {
           el('button',{class:'btn',style:{backgroundColor:'#ff4d4d',color:'white',fontWeight:'600'},onclick:()=>{localStorage.removeItem('token');
             sessionStorage.removeItem('user');window.location.replace('/login');}},['Logout'])])
       ]),
-      el('div',{class:'cms-body'},[filterBar,grid])
+      el('div',{class:'cms-body'},[filterBar,grid,loadMore])
     ]);
 
 
@@ -354,48 +360,80 @@ export function initCMS() {
     }
 
     // === Refresh: fetch real data from API (no dummy data, no upload) ===
-    async function refreshAssets() {
+    // The list is cursor-paginated: load the first page, then the next one
+    // (from the page's `next` link) when "Load more" is clicked or scrolled into view.
+    function toAsset(r) {
+      const ext = fileExtFromName(r.file_name);
+      const webPath = r.file_location
+        ? (MEDIA_BASE + String(r.file_location).replace(/^\/+/, ''))
+        : null;
+
+      const imgExts = ['jpg','jpeg','png','gif','webp'];
+      const isImg = imgExts.includes(ext);
+
+      return {
+        id: r.id,
+        name: r.file_name || '',
+        type: r.file_type || (isImg ? 'image' : ''),
+        extension: ext,
+        size: (typeof r.file_size === 'number' ? r.file_size * 1048576 : 0),
+        location: r.file_location || '',
+        description: r.description || '',
+        tags: Array.isArray(r.tags) ? r.tags : [],
+        versionCount: r.no_of_versions ?? null,
+        createdAt: r.created_at || null,
+        modifiedAt: r.modified_at || null,
+        resolution: r.resolution || null,
+        modifiedBy: r.modified_by_username || '',  
+
+        url: webPath,
+        thumbnail_url: isImg ? webPath : null,
+      };
+    }
+
+    let nextCursor = null;
+    let loadingPage = false;
+
+    async function loadPage(cursor) {
+      if (loadingPage) return;
+      loadingPage = true;
       try {
-        const res = await fetch(API.list, { credentials: API.credentials });
+        const url = cursor ? `${API.list}?cursor=${encodeURIComponent(cursor)}` : API.list;
+        const res = await fetch(url, { credentials: API.credentials });
         if (!res.ok) throw new Error(`List failed: ${res.status}`);
         const items = await res.json();
         const results = Array.isArray(items) ? items : items.results || [];
 
-        allAssets = results.map(r => {
-          const ext = fileExtFromName(r.file_name);
-          const webPath = r.file_location
-            ? (MEDIA_BASE + String(r.file_location).replace(/^\/+/, ''))
-            : null;
-
-          const imgExts = ['jpg','jpeg','png','gif','webp'];
-          const isImg = imgExts.includes(ext);
-
-          return {
-            id: r.id,
-            name: r.file_name || '',
-            type: r.file_type || (isImg ? 'image' : ''),
-            extension: ext,
-            size: (typeof r.file_size === 'number' ? r.file_size * 1048576 : 0),
-            location: r.file_location || '',
-            description: r.description || '',
-            tags: Array.isArray(r.tags) ? r.tags : [],
-            versionCount: r.no_of_versions ?? null,
-            createdAt: r.created_at || null,
-            modifiedAt: r.modified_at || null,
-            resolution: r.resolution || null,
-            modifiedBy: r.modified_by_username || '',  
-
-            url: webPath,
-            thumbnail_url: isImg ? webPath : null,
-          };
-        });
-
+        allAssets = (cursor ? allAssets : []).concat(results.map(toAsset));
         applyFilters();
+
+        nextCursor = !Array.isArray(items) && items.next
+          ? new URL(items.next, window.location.origin).searchParams.get('cursor')
+          : null;
       } catch (err) {
         console.error('❌ Failed to fetch assets:', err);
+      } finally {
+        loadingPage = false;
+        loadMore.style.display = nextCursor ? '' : 'none';
       }
     }
 
+    function refreshAssets() {
+      return loadPage(null);
+    }
+
+    function loadMoreAssets() {
+      if (nextCursor) return loadPage(nextCursor);
+    }
+
+    // fetch the next page once the "Load more" button comes near the viewport
+    if ('IntersectionObserver' in window) {
+      new IntersectionObserver(
+        (entries) => { if (entries.some((e) => e.isIntersecting)) loadMoreAssets(); },
+        { rootMargin: '400px' }
+      ).observe(loadMore);
+    }
+
     // === Initialize ===
     refreshAssets();
   })();